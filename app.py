@@ -1,61 +1,430 @@
-from src.data_management import DataFrameBuilder
-from src.report_generator import CotaCapital
-from src.file_management import FileManager
-from src.email_sender import EmailSender
-from src.log import Logs
 import src.global_vars as gv
+from src.log import Logs
 
+import argparse
 import os
 import time
 
-def main():
+# Ponto de entrada em linha de comando para a geração dos extratos de cota capital.
+# Cada etapa (fetch, render, zip, mail) pode ser executada isoladamente ou em sequência (all).
+# As etapas shard, worker e collect distribuem a geração por agência e administradora entre várias máquinas.
+# A etapa serve mantém um serviço local que gera extratos individuais sob demanda.
+# As etapas buscar e reconstruir consultam o repositório indexado de extratos já gerados.
+# A etapa validar executa a pré-validação da base em cache (também executada antes do render).
+# A etapa teste gera uma amostra estratificada da base e projeta o tempo e o tamanho da execução completa.
+# A etapa perfis compara o tamanho e o tempo de geração dos perfis de saída dos PDFs.
+# As bibliotecas pesadas (pandas, reportlab, requests, win32com) são importadas apenas dentro
+# da etapa que as utiliza, para que execuções curtas como reenviar e-mails ou recompactar
+# pastas iniciem rapidamente e possam rodar em máquinas Linux.
 
-    logger = Logs.load_log(__name__)
+logger = Logs.load_log(__name__)
 
-    start_time = time.time()
-    logger.info("Iniciando geração dos extratos de cota capital.")
 
-    # Gerar base de dados
+def etapa_fetch(mes_emissao=None, completo=False):
+    """
+    Gera a base consolidada (Databricks + índice Excel) e salva em cache local,
+    junto com o diretório de destinatários dos e-mails.
+    """
+    from src.data_management import DataFrameBuilder
+    from src.recipients import DiretorioDestinatarios
+
     logger.info("Gerando base de dados consolidada.")
-    contas = DataFrameBuilder.create_cota_capital()
+    contas = DataFrameBuilder.create_cota_capital(mes_emissao, completo=completo)
     logger.info(f"Base de dados gerada com {len(contas)} registros.")
+    DataFrameBuilder.salvar_base(contas)
+    DiretorioDestinatarios.obter(contas)
+    return contas
+
+
+def etapa_validar(contas=None, saida=None):
+    """
+    Executa a pré-validação da base informada ou do cache local e grava o relatório em JSON
+    (padrão: PATH_RELATORIO_VALIDACAO).
+    """
+    from src.preflight import ValidacaoBase
+
+    if contas is None:
+        from src.data_management import DataFrameBuilder
+        contas = DataFrameBuilder.carregar_base()
+    return ValidacaoBase.validar(contas, saida=saida)
+
 
-    # Realiza geração do extratos
-    logger.info("Iniciando geração dos PDFs de extrato.")
-    CotaCapital.gerar_extratos_mensal(contas)
-    logger.info("Geração dos PDFs concluída.")
+def etapa_render(contas=None, reprocessar_falhas=False, modo=None, periodo=None, validar=True):
+    """
+    Gera os PDFs dos extratos a partir da base informada ou do cache local.
+    Com reprocessar_falhas=True, gera apenas as contas registradas no arquivo de falhas (no modo
+    consolidado, os PDFs das administradoras com falhas são gerados novamente por inteiro).
+    O modo ('individual' ou 'consolidado') segue a variável global MODO_SAIDA se não for informado.
+    Com periodo ('AAAA-MM:AAAA-MM'), gera um extrato por conta e mês do intervalo, em uma pasta por mês.
+    Antes da geração, a base passa pela pré-validação (exceto com validar=False); com
+    BLOQUEAR_RENDER_COM_ERROS, erros na base interrompem a etapa.
+    """
+    from src.report_generator import CotaCapital
+
+    modo = modo or gv.MODO_SAIDA
+    logger.info(f"Iniciando geração dos PDFs de extrato (modo: {modo}{f', período {periodo}' if periodo else ''}).")
+    if reprocessar_falhas and periodo:
+        from src.period_range import ExtratosPeriodo
+        totais = {"gerados": 0, "falhas": 0, "arquivo_falhas": None}
+        base_mensal = None
+        if modo == "consolidado":
+            # Os consolidados de cada mês são refeitos a partir da base mensal do período
+            if contas is None:
+                from src.data_management import DataFrameBuilder
+                contas = DataFrameBuilder.carregar_base()
+            base_mensal = ExtratosPeriodo.montar_base_mensal(contas, periodo)
+        for mes in ExtratosPeriodo.meses(periodo):
+            contas_mes = base_mensal[base_mensal['mes_emissao'] == str(mes)] if base_mensal is not None else None
+            parcial = CotaCapital.reprocessar_falhas(os.path.join(gv.PATH_BASES, str(mes)), modo=modo, contas=contas_mes)
+            totais["gerados"] += parcial["gerados"]
+            totais["falhas"] += parcial["falhas"]
+    elif reprocessar_falhas:
+        totais = CotaCapital.reprocessar_falhas(modo=modo, contas=contas)
+    elif periodo:
+        from src.period_range import ExtratosPeriodo
+        if contas is None:
+            from src.data_management import DataFrameBuilder
+            contas = DataFrameBuilder.carregar_base()
+        if validar:
+            from src.preflight import ValidacaoBase
+            ValidacaoBase.bloquear_se_necessario(etapa_validar(contas))
+        totais = ExtratosPeriodo.gerar(contas, periodo, modo=modo)
+        for mes, parcial in totais["meses"].items():
+            if parcial["falhas"]:
+                logger.warning(f"Mês {mes}: contas com falha registradas em {parcial['arquivo_falhas']}.")
+    else:
+        if contas is None:
+            from src.data_management import DataFrameBuilder
+            contas = DataFrameBuilder.carregar_base()
+        if validar:
+            from src.preflight import ValidacaoBase
+            ValidacaoBase.bloquear_se_necessario(etapa_validar(contas))
+        if modo == "consolidado":
+            totais = CotaCapital.gerar_extratos_consolidados(contas)
+        else:
+            totais = CotaCapital.gerar_extratos_mensal(contas)
+        from src.run_summary import ResumoExecucao
+        ResumoExecucao.salvar(totais['resumo'])
+
+    logger.info(f"Geração dos PDFs concluída: {totais['gerados']} gerados, {totais['falhas']} com falha.")
+    if totais['falhas']:
+        logger.warning(f"Contas com falha registradas em {totais['arquivo_falhas']}.")
+    return totais
+
+
+def etapa_zip(delete_original=False, periodo=None):
+    """
+    Compacta as pastas de extratos de cada agência/administradora (no modo consolidado, o PDF
+    '<administradora>.pdf' de cada administradora).
+    Com periodo ('AAAA-MM:AAAA-MM'), compacta as pastas de cada mês do intervalo.
+    """
+    from src.storage import Armazenamento
 
-    # Realiza tratativa nos arquivos
     logger.info("Compactando pastas de extratos.")
-    FileManager.zip_all_folders(gv.PATH_BASES)
+    if periodo:
+        from src.period_range import ExtratosPeriodo
+        for mes in ExtratosPeriodo.meses(periodo):
+            Armazenamento.criar(os.path.join(gv.PATH_BASES, str(mes))).compactar_todas(delete_original=delete_original)
+    else:
+        Armazenamento.criar(gv.PATH_BASES).compactar_todas(delete_original=delete_original)
     logger.info("Compactação concluída.")
 
-    # Mandar os emails
-    SMTP_SERVER = gv.SMTP_SERVER
-    SMTP_PORT = int(gv.SMTP_PORT)
-    SMTP_USERNAME = gv.SMTP_USERNAME
-    SMTP_PASSWORD = gv.SMTP_PASSWORD
-    EMAIL_FROM = gv.EMAIL_FROM
+
+def etapa_mail(contas=None, subject='teste extrato', por_agencia=False):
+    """
+    Envia o e-mail de aviso para os destinatários da base informada ou do cache local.
+    O corpo inclui os extratos disponibilizados por agência, a partir do resumo da última geração.
+    Com por_agencia=True, cada agência recebe uma mensagem própria (em lotes de até
+    LIMITE_DESTINATARIOS_EMAIL destinatários), com apenas as suas administradoras no resumo.
+    """
+    from src.email_sender import EmailSender
+    from src.recipients import DiretorioDestinatarios
+    from src.run_summary import ResumoExecucao
+
+    if contas is not None:
+        diretorio = DiretorioDestinatarios.obter(contas)
+    else:
+        # Com o diretório e o resumo em cache, o envio não precisa da base nem do pandas
+        diretorio = DiretorioDestinatarios.carregar_linhas()
+        if diretorio is None:
+            from src.data_management import DataFrameBuilder
+            diretorio = DiretorioDestinatarios.obter(DataFrameBuilder.carregar_base())
 
     logger.info("Preparando envio de e-mail.")
     email_sender = EmailSender(
-        smtp_server=SMTP_SERVER,
-        smtp_port=SMTP_PORT,
-        username=SMTP_USERNAME,
-        password=SMTP_PASSWORD
+        smtp_server=gv.SMTP_SERVER,
+        smtp_port=int(gv.SMTP_PORT),
+        username=gv.SMTP_USERNAME,
+        password=gv.SMTP_PASSWORD
     )
 
-    body = email_sender.get_body_format()
-    email_to = email_sender.get_email_list_to(contas)
+    resumo = ResumoExecucao.carregar_linhas()
+    if not por_agencia:
+        body = email_sender.get_body_format(ResumoExecucao.corpo_email(resumo) if resumo is not None else "")
+        envios = [("", DiretorioDestinatarios.destinatarios(diretorio), body)]
+    else:
+        envios = []
+        for lote in DiretorioDestinatarios.lotes(diretorio):
+            tabela = ""
+            if resumo is not None:
+                tabela = ResumoExecucao.corpo_email([r for r in resumo if r['agencia'] == lote['agencia']])
+            envios.append((f"UA{lote['agencia']}: ", lote['destinatarios'], email_sender.get_body_format(tabela)))
+
+    for prefixo, email_to, body in envios:
+        try:
+            email_sender.send_email(email_to, gv.EMAIL_FROM, subject, body, True)
+            logger.info(f"{prefixo}E-mail enviado com sucesso para {len(email_to)} destinatários.")
+        except Exception as e:
+            logger.error(f"{prefixo}Erro ao enviar e-mail: {e}")
+
+
+def etapa_shard(workers=0, previstos=None):
+    """
+    Divide a base em cache em shards por agência e administradora, distribuídos entre os workers
+    previstos pela estimativa de custo (LPT), após a pré-validação da base. Com workers > 0,
+    executa também os workers como processos locais e coleta os resultados.
+    """
+    from src.data_management import DataFrameBuilder
+    from src.preflight import ValidacaoBase
+    from src.sharding import Sharding
+
+    contas = DataFrameBuilder.carregar_base()
+    ValidacaoBase.bloquear_se_necessario(etapa_validar(contas))
+    if workers > 0:
+        return Sharding.executar_local(contas, workers)
+    Sharding.criar_shards(contas, workers=previstos)
+
+
+def etapa_worker(worker_id=None, slot=None):
+    """
+    Processa shards da fila compartilhada até que não haja mais shards disponíveis,
+    começando pela parte (slot) atribuída ao worker na distribuição LPT.
+    """
+    from src.sharding import Sharding
+
+    Sharding.executar_worker(worker_id=worker_id, slot=slot)
+
+
+def etapa_collect():
+    """
+    Consolida os totais e as falhas de todos os shards.
+    """
+    from src.sharding import Sharding
+
+    totais = Sharding.coletar()
+    if totais['shards_pendentes']:
+        logger.warning(f"Shards não concluídos: {', '.join(totais['shards_pendentes'])}")
+    return totais
+
+
+def etapa_serve(porta=None):
+    """
+    Inicia o serviço local de geração sob demanda e aguarda até ser interrompido (Ctrl+C).
+    """
+    import threading
+    from src.render_service import ServicoExtratos
+
+    servico = ServicoExtratos()
+    servico.iniciar(porta)
     try:
-        email_sender.send_email(email_to, EMAIL_FROM, 'teste extrato', body, True)
-        logger.info("E-mail enviado com sucesso.")
-    except Exception as e:
-        logger.error(f"Erro ao enviar e-mail: {e}")
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servico.parar()
+
+
+def etapa_buscar(conta, mes_emissao=None, saida=None):
+    """
+    Localiza no repositório os extratos de uma conta. Com saida, copia o extrato
+    mais recente (ou do mês informado) para o arquivo indicado.
+    """
+    from src.statement_store import RepositorioExtratos
+
+    repositorio = RepositorioExtratos()
+    registros = repositorio.buscar(conta, mes_emissao)
+    for registro in registros:
+        logger.info(f"{registro['conta']} UA{registro['agencia']}/{registro['administradora']} "
+                    f"{registro['mes_emissao']}: {registro['arquivo']}")
+    if not registros:
+        logger.warning(f"Nenhum extrato da conta {conta} no repositório.")
+    elif saida:
+        conteudo = repositorio.obter(conta, registros[0]['mes_emissao'], registros[0]['agencia'], registros[0]['administradora'])
+        with open(saida, 'wb') as f:
+            f.write(conteudo)
+        logger.info(f"Extrato de {registros[0]['mes_emissao']} gravado em {saida}.")
+    return registros
+
+
+def etapa_reconstruir(agencia, administradora, mes_emissao, destino=None):
+    """
+    Recria o ZIP de uma agência/administradora a partir do repositório, sem gerar os PDFs.
+    """
+    from src.statement_store import RepositorioExtratos
+
+    return RepositorioExtratos().reconstruir_arquivo(str(agencia).zfill(2), administradora, mes_emissao, destino)
+
+
+def etapa_perfis(amostra=20, saida=None):
+    """
+    Gera uma amostra da base em cache em cada perfil de saída e registra bytes, tempo de geração
+    e a validação do texto de cada perfil.
+    """
+    from src.data_management import DataFrameBuilder
+    from src.pdf_profiles import PerfisPdf
+
+    contas = DataFrameBuilder.carregar_base()
+    return PerfisPdf.medir(contas, amostra=amostra, saida=saida)
+
+
+def etapa_teste(contas=None, por_estrato=None, em_memoria=False, saida=None):
+    """
+    Execução de teste: pré-valida a base informada ou do cache local (sem interromper), gera apenas
+    uma amostra estratificada por agência, administradora e faixa de movimentações e projeta o tempo
+    e o tamanho da execução completa. Não compacta as pastas nem envia e-mails.
+    """
+    from src.dry_run import ExecucaoTeste
+
+    if contas is None:
+        from src.data_management import DataFrameBuilder
+        contas = DataFrameBuilder.carregar_base()
+    validacao = etapa_validar(contas)
+    relatorio = ExecucaoTeste.executar(contas, por_estrato=por_estrato, em_memoria=em_memoria, saida=saida)
+    relatorio['validacao'] = {'contas_com_erro': validacao['contas_com_erro'], 'bloqueante': validacao['bloqueante']}
+    if validacao['bloqueante']:
+        logger.warning(f"A execução completa seria interrompida pela pré-validação: "
+                       f"{validacao['contas_com_erro']} contas com erro.")
+    return relatorio
+
+
+def etapa_all(teste=False):
+    """
+    Executa o fluxo completo: fetch, render, zip e mail.
+    Com teste=True, executa fetch e a execução de teste, sem render completo, zip e mail.
+    """
+    contas = etapa_fetch()
+    if teste:
+        return etapa_teste(contas)
+    etapa_render(contas)
+    etapa_zip()
+    etapa_mail(contas)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Geração dos extratos de cota capital.")
+    subparsers = parser.add_subparsers(dest="comando")
+
+    fetch = subparsers.add_parser("fetch", help="Gera a base consolidada e salva em cache local.")
+    fetch.add_argument("--mes-emissao", help="Mês de emissão 'AAAA-MM' (ou intervalo 'AAAA-MM:AAAA-MM') "
+                                             "filtrado na consulta (padrão: MES_EMISSAO).")
+    fetch.add_argument("--completo", action="store_true",
+                       help="Com EXTRACAO_DELTA, ignora o cache e refaz a extração completa das contas.")
+
+    render = subparsers.add_parser("render", help="Gera os PDFs a partir da base em cache.")
+    render.add_argument("--reprocessar-falhas", action="store_true",
+                        help="Gera apenas as contas registradas no arquivo de falhas.")
+    render.add_argument("--modo", choices=["individual", "consolidado"],
+                        help="Um PDF por conta ou um PDF por administradora (padrão: MODO_SAIDA).")
+    render.add_argument("--periodo", help="Intervalo de meses de emissão 'AAAA-MM:AAAA-MM': um extrato por conta e mês, "
+                                          "em PATH_BASES/AAAA-MM.")
+    render.add_argument("--sem-validacao", action="store_true",
+                        help="Não executa a pré-validação da base antes da geração.")
+
+    zip_parser = subparsers.add_parser("zip", help="Compacta as pastas de extratos.")
+    zip_parser.add_argument("--delete-original", action="store_true",
+                            help="Remove as pastas originais após compactar.")
+    zip_parser.add_argument("--periodo", help="Compacta as pastas de cada mês do intervalo 'AAAA-MM:AAAA-MM'.")
+
+    mail = subparsers.add_parser("mail", help="Envia o e-mail de aviso aos destinatários.")
+    mail.add_argument("--por-agencia", action="store_true",
+                      help="Envia uma mensagem por agência, apenas aos destinatários e ao resumo da agência.")
+
+    validar = subparsers.add_parser("validar", help="Executa a pré-validação da base em cache e grava o relatório.")
+    validar.add_argument("--saida", help="Caminho do relatório em JSON (padrão: PATH_RELATORIO_VALIDACAO).")
+    all_parser = subparsers.add_parser("all", help="Executa fetch, render, zip e mail em sequência (padrão).")
+    all_parser.add_argument("--teste", action="store_true",
+                            help="Após o fetch, executa apenas a execução de teste (sem render completo, zip e mail).")
+
+    teste = subparsers.add_parser("teste", help="Gera uma amostra estratificada da base em cache e projeta a execução "
+                                                "completa, sem compactar nem enviar e-mails.")
+    teste.add_argument("--por-estrato", type=int,
+                       help="Contas sorteadas por agência/administradora/faixa de movimentações (padrão: AMOSTRA_POR_ESTRATO).")
+    teste.add_argument("--em-memoria", action="store_true",
+                       help="Gera a amostra apenas em memória, sem gravar os PDFs em PATH_TESTE.")
+    teste.add_argument("--saida", help="Caminho do relatório em JSON (padrão: PATH_RELATORIO_TESTE).")
+
+    shard = subparsers.add_parser("shard", help="Divide a base em cache em shards por agência.")
+    shard.add_argument("--workers", type=int, default=0,
+                       help="Executa também N workers locais e coleta os resultados.")
+    shard.add_argument("--previstos", type=int,
+                       help="Workers remotos previstos na distribuição LPT (padrão: SHARD_WORKERS_PREVISTOS).")
+
+    worker = subparsers.add_parser("worker", help="Processa shards da fila compartilhada (render + zip).")
+    worker.add_argument("--worker-id", help="Identificador do worker (padrão: <hostname>-<pid>).")
+    worker.add_argument("--slot", type=int,
+                        help="Parte da distribuição LPT deste worker (0 a N-1); sem slot, apenas rouba dos demais.")
+
+    subparsers.add_parser("collect", help="Consolida os resultados de todos os shards.")
+
+    serve = subparsers.add_parser("serve", help="Inicia o serviço local de geração de extratos sob demanda.")
+    serve.add_argument("--porta", type=int, help="Porta local do serviço (padrão: RENDER_PORTA).")
+
+    buscar = subparsers.add_parser("buscar", help="Localiza os extratos de uma conta no repositório.")
+    buscar.add_argument("conta")
+    buscar.add_argument("--mes-emissao", help="Mês de emissão 'AAAA-MM'.")
+    buscar.add_argument("--saida", help="Copia o extrato encontrado para este arquivo.")
+
+    reconstruir = subparsers.add_parser("reconstruir", help="Recria o ZIP de uma agência/administradora a partir do repositório.")
+    reconstruir.add_argument("agencia", help="Agência (ex: 01).")
+    reconstruir.add_argument("administradora")
+    reconstruir.add_argument("mes_emissao", help="Mês de emissão 'AAAA-MM'.")
+    reconstruir.add_argument("--destino", help="Caminho do ZIP (padrão: pasta da administradora em PATH_BASES).")
+
+    perfis = subparsers.add_parser("perfis", help="Compara tamanho e tempo de geração dos perfis de saída dos PDFs.")
+    perfis.add_argument("--amostra", type=int, default=20, help="Contas geradas em cada perfil (padrão: 20).")
+    perfis.add_argument("--saida", help="Grava o relatório em JSON neste arquivo.")
+    return parser
+
+
+def main(argv=None):
+
+    args = build_parser().parse_args(argv)
+    comando = args.comando or "all"
+
+    start_time = time.time()
+    logger.info(f"Iniciando geração dos extratos de cota capital (etapa: {comando}).")
+
+    if comando == "fetch":
+        etapa_fetch(mes_emissao=args.mes_emissao, completo=args.completo)
+    elif comando == "render":
+        etapa_render(reprocessar_falhas=args.reprocessar_falhas, modo=args.modo, periodo=args.periodo,
+                     validar=not args.sem_validacao)
+    elif comando == "zip":
+        etapa_zip(delete_original=args.delete_original, periodo=args.periodo)
+    elif comando == "mail":
+        etapa_mail(por_agencia=args.por_agencia)
+    elif comando == "validar":
+        etapa_validar(saida=args.saida)
+    elif comando == "shard":
+        etapa_shard(workers=args.workers, previstos=args.previstos)
+    elif comando == "worker":
+        etapa_worker(worker_id=args.worker_id, slot=args.slot)
+    elif comando == "collect":
+        etapa_collect()
+    elif comando == "serve":
+        etapa_serve(porta=args.porta)
+    elif comando == "buscar":
+        etapa_buscar(args.conta, mes_emissao=args.mes_emissao, saida=args.saida)
+    elif comando == "reconstruir":
+        etapa_reconstruir(args.agencia, args.administradora, args.mes_emissao, destino=args.destino)
+    elif comando == "perfis":
+        etapa_perfis(amostra=args.amostra, saida=args.saida)
+    elif comando == "teste":
+        etapa_teste(por_estrato=args.por_estrato, em_memoria=args.em_memoria, saida=args.saida)
+    else:
+        etapa_all(teste=getattr(args, "teste", False))
 
-    logger.info("Geração de extratos concluída.")
+    logger.info(f"Etapa '{comando}' concluída.")
     logger.info(f"Tempo total de execução: {round(time.time() - start_time)} segundos.")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,7 +1,11 @@
 from src.data_management import DataFrameBuilder
 from src.report_generator import CotaCapital
-from src.file_management import FileManager
+from src.preflight import ValidacaoBase
+from src.run_summary import ResumoExecucao
+from src.dry_run import ExecucaoTeste
+from src.storage import Armazenamento
 from src.email_sender import EmailSender
+from src.recipients import DiretorioDestinatarios
 import time
 import src.global_vars as gv
 from src.log import initialize_logger, get_logger
@@ -31,14 +35,42 @@ def main():
         contas = DataFrameBuilder.create_cota_capital()
         logger.message(__name__, f"Base de dados gerada com {len(contas)} registros.")
 
+        # Pré-validação da base (interrompe a execução com BLOQUEAR_RENDER_COM_ERROS)
+        relatorio = ValidacaoBase.validar(contas)
+        logger.message(__name__, f"Pré-validação concluída: {relatorio['contas_com_erro']} contas com erro.")
+
+        # Execução de teste: gera apenas a amostra estratificada e projeta a execução completa (sem zip e e-mail)
+        if gv.EXECUCAO_TESTE:
+            teste = ExecucaoTeste.executar(contas)
+            projecao = teste['projecao']
+            logger.message(__name__, f"Execução de teste: {teste['amostra']} contas na amostra, {teste['medido']['falhas']} com falha. "
+                                     f"Projeção: {projecao['minutos']} min, {projecao['mb']} MB, {projecao['falhas']} falhas.")
+            maestro.finish_task(
+                task_id=execution.task_id,
+                status=AutomationTaskFinishStatus.SUCCESS,
+                message="Execução de teste concluída.",
+                total_items=teste['amostra'],
+                processed_items=teste['amostra'] - teste['medido']['falhas'],
+                failed_items=teste['medido']['falhas']
+            )
+            return
+
+        ValidacaoBase.bloquear_se_necessario(relatorio)
+
         # Realiza geração do extratos
-        logger.message(__name__, "Iniciando geração dos PDFs de extrato.")
-        CotaCapital.gerar_extratos_mensal(contas)
-        logger.message(__name__, "Geração dos PDFs concluída.")
+        logger.message(__name__, f"Iniciando geração dos PDFs de extrato (modo: {gv.MODO_SAIDA}).")
+        if gv.MODO_SAIDA == "consolidado":
+            totais = CotaCapital.gerar_extratos_consolidados(contas)
+        else:
+            totais = CotaCapital.gerar_extratos_mensal(contas)
+        logger.message(__name__, f"Geração dos PDFs concluída: {totais['gerados']} gerados, {totais['falhas']} com falha.")
+        if totais['falhas']:
+            logger.message(__name__, f"Contas com falha registradas em {totais['arquivo_falhas']}.")
+        ResumoExecucao.salvar(totais['resumo'])
 
         # Realiza tratativa nos arquivos
         logger.message(__name__, "Compactando pastas de extratos.")
-        FileManager.zip_all_folders(gv.PATH_BASES, delete_original=False)
+        Armazenamento.criar(gv.PATH_BASES).compactar_todas(delete_original=False)
         logger.message(__name__, "Compactação concluída.")
 
         # Mandar os emails
@@ -56,8 +88,8 @@ def main():
             password=SMTP_PASSWORD
         )
 
-        body = email_sender.get_body_format()
-        email_to = email_sender.get_email_list_to(contas)
+        body = email_sender.get_body_format(ResumoExecucao.corpo_email(totais['resumo']))
+        email_to = DiretorioDestinatarios.destinatarios(DiretorioDestinatarios.obter(contas))
         try:
             email_sender.send_email(email_to, EMAIL_FROM, 'teste extrato', body, True)
             logger.message(__name__, "E-mail enviado com sucesso.")
@@ -72,9 +104,9 @@ def main():
             task_id=execution.task_id,
             status=AutomationTaskFinishStatus.SUCCESS,
             message="Task Finished OK.",
-            total_items=0,
-            processed_items=0,
-            failed_items=0
+            total_items=totais['gerados'] + totais['falhas'],
+            processed_items=totais['gerados'],
+            failed_items=totais['falhas']
         )
 
     except Exception as e:
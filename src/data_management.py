@@ -1,6 +1,8 @@
-import os, requests, json, time
+import os, requests, json, time, threading
+import ijson
 import pandas as pd
-from src.navigations import DSSheets
+from src.schema import BaseSchema, COLUNAS_DATABRICKS
+from src.preflight import ValidacaoBase
 from src.log import Logs
 import src.global_vars as gvars
 
@@ -18,7 +20,7 @@ class Databricks:
     -------
     __init__():
         Inicializa a classe, buscando o token de autenticação do ambiente.
-    sql_statements(statement: str, tries: int, warehouse_id: str = ''):
+    sql_statements(statement: str, tries: int, warehouse_id: str = '', parameters: list = None, cancelar: threading.Event = None):
         Executa uma instrução SQL no Databricks SQL Warehouse.
         Caso a instrução seja um SELECT e o status retorne como PENDING, realiza novas tentativas até o sucesso ou atingir o número máximo de tentativas.
         Parâmetros
@@ -29,49 +31,274 @@ class Databricks:
             Número máximo de tentativas em caso de status PENDING.
         warehouse_id : str, opcional
             ID do SQL Warehouse a ser utilizado (padrão: '').
+        parameters : list, opcional
+            Parâmetros nomeados da instrução, no formato da API ({'name', 'value', 'type'}).
+        cancelar : threading.Event, opcional
+            Evento que, quando sinalizado, cancela o statement pendente.
         Retorna
         -------
-        response : requests.Response
-            Objeto de resposta da requisição HTTP.
+        dict
+            Resposta da API decodificada, com as linhas de result.data_array transpostas em result.colunas.
+    decodificar_resposta(response: requests.Response) -> dict:
+        Decodifica a resposta da API em uma única passada, transpondo as linhas do resultado em colunas.
     """
     def __init__(self):
-        self.token = ''
+        self.token = gvars.TOKEN
+        self.endpoint = gvars.DATABRICKS_ENDPOINT
 
-    def sql_statements(self, statement: str, tries : int, warehouse_id: str = ''):
+    def sql_statements(self, statement: str, tries : int, warehouse_id: str = '', parameters: list = None, cancelar: threading.Event = None):
         """
         Executa uma instrução SQL no Databricks SQL Warehouse e trata estados pendentes para consultas SELECT.
         Parâmetros:
             statement (str): Instrução SQL a ser executada.
             tries (int): Número máximo de tentativas caso a consulta fique pendente.
-            warehouse_id (str, opcional): ID do SQL Warehouse do Databricks. Padrão: ''.
+            warehouse_id (str, opcional): ID do SQL Warehouse do Databricks. Padrão: variável global DATABRICKS_WAREHOUSE_ID.
+            parameters (list, opcional): Parâmetros nomeados da instrução ({'name', 'value', 'type'}), referenciados como :nome.
+            cancelar (threading.Event, opcional): Quando sinalizado durante a espera, cancela o statement no Databricks e interrompe a execução.
         Retorna:
-            requests.Response: Objeto de resposta HTTP da API do Databricks.
+            dict: Resposta da API decodificada por decodificar_resposta (status, manifest e result.colunas).
         Observações:
-            - Para instruções SELECT, se o status inicial for 'PENDING', o método irá tentar novamente até o limite de `tries`,
-              aguardando um tempo crescente entre as tentativas.
+            - Para instruções SELECT, se o status inicial for 'PENDING' ou 'RUNNING', o método consulta o status do
+              statement (GET) até o limite de `tries`, aguardando um tempo crescente entre as tentativas.
             - Requer que `self.token` esteja definido com um token válido da API do Databricks.
         """
         #logger.info(f"Enviando statement para o Databricks: {statement[:80]}...")
         
-        endpoint = ''
         header = {'Authorization': f'Bearer {self.token}'}
         body = {
             "statement": statement,
-            "warehouse_id": warehouse_id
+            "warehouse_id": warehouse_id or gvars.DATABRICKS_WAREHOUSE_ID
         }
+        if parameters:
+            body["parameters"] = parameters
 
-        response = requests.post(url=endpoint, headers=header, json=body)
-        response_text_json = json.loads(response.text)
+        response = requests.post(url=self.endpoint, headers=header, json=body, stream=True)
+        response.raise_for_status()
+        response_text_json = self.decodificar_resposta(response)
         
         if statement.split(maxsplit=1)[0] == 'SELECT':
             current_try = 0
-            while current_try < tries and response_text_json['status']["state"] != "SUCCEEDED":
+            while current_try < tries and response_text_json['status']["state"] in ("PENDING", "RUNNING"):
                 current_try += 1
-                time.sleep(current_try * tries * 10)
-                response = requests.post(url=endpoint, headers=header, json=body)
+                espera = current_try * tries * gvars.DATABRICKS_ESPERA_SEGUNDOS
+                if cancelar is not None and cancelar.wait(espera):
+                    requests.post(url=f"{self.endpoint}/{response_text_json['statement_id']}/cancel", headers=header)
+                    raise Exception("Statement cancelado no Databricks.")
+                elif cancelar is None:
+                    time.sleep(espera)
+                response = requests.get(url=f"{self.endpoint}/{response_text_json['statement_id']}", headers=header, stream=True)
+                response.raise_for_status()
+                response_text_json = self.decodificar_resposta(response)
+
+            estado = response_text_json['status']["state"]
+            if estado != "SUCCEEDED":
+                erro = response_text_json['status'].get('error', {}).get('message', '')
+                raise Exception(f"Statement não concluído no Databricks (estado: {estado}). {erro}".strip())
 
         logger.info("Statement executado no Databricks com sucesso.")
-        return response
+        return response_text_json
+
+    @staticmethod
+    def decodificar_resposta(response: requests.Response) -> dict:
+        """
+        Decodifica a resposta da API de statements uma única vez, a partir dos bytes.
+
+        O corpo é lido em fluxo com ijson e cada valor de result.data_array é acrescentado
+        diretamente ao buffer da sua coluna, sem montar a lista de linhas nem manter o corpo
+        inteiro em memória. Cada linha deve ter um valor por coluna de manifest.schema.columns.
+
+        Parâmetros:
+        -----------
+        response : requests.Response
+            Resposta da API (preferencialmente obtida com stream=True).
+
+        Retorna:
+        --------
+        dict
+            Resposta decodificada. Quando há resultado, result.data_array é substituído por
+            result.colunas: uma lista por coluna, na ordem de manifest.schema.columns.
+        """
+        response.raw.decode_content = True
+        construtor = ijson.ObjectBuilder()
+        colunas = []
+        total_linhas = 0
+        posicao = 0
+        # Tamanho de linha -> primeira linha com esse tamanho, conferidos com o schema ao final
+        # (o manifest pode vir depois de result no corpo)
+        tamanhos = {}
+        for prefixo, evento, valor in ijson.parse(response.raw, use_float=True):
+            if prefixo == 'result.data_array.item.item':
+                if posicao == len(colunas):
+                    colunas.append([None] * (total_linhas - 1))
+                colunas[posicao].append(valor)
+                posicao += 1
+            elif prefixo == 'result.data_array.item':
+                if evento == 'start_array':
+                    total_linhas += 1
+                    posicao = 0
+                else:
+                    tamanhos.setdefault(posicao, total_linhas - 1)
+            elif prefixo == 'result.data_array':
+                continue
+            else:
+                construtor.event(evento, valor)
+
+        resposta = construtor.value
+        resultado = resposta.get('result')
+        if resultado is not None:
+            esperado = len(resposta.get('manifest', {}).get('schema', {}).get('columns', [])) or len(colunas)
+            invalidos = {tamanho: linha for tamanho, linha in tamanhos.items() if tamanho != esperado}
+            if invalidos:
+                tamanho, linha = min(invalidos.items(), key=lambda item: item[1])
+                raise ValueError(
+                    f"Resposta do Databricks com linhas fora do schema: a linha {linha} tem {tamanho} valores "
+                    f"e o schema tem {esperado} colunas."
+                )
+            resultado['colunas'] = colunas
+        return resposta
+
+class ConsultaContas:
+    """
+    Monta as consultas da base de contas com projeção das colunas utilizadas e filtros
+    parametrizados (mês de emissão, contas, agências e data de atualização), evitando que linhas descartadas
+    pelo merge com o índice sejam transferidas do Databricks.
+
+    Listas grandes de contas ou agências são divididas em lotes, gerando uma consulta por lote.
+
+    Métodos
+    -------
+    montar() -> list
+        Retorna a lista de (statement, parameters) a serem executados.
+    dias_emissao(mes_emissao: str) -> list
+        Retorna os dias ('dd/MM/yyyy') de um mês ou intervalo de meses de emissão.
+    por_agencia(index: pd.DataFrame, mes_emissao: str, filtrar_contas: bool) -> list
+        Divide a consulta em uma partição (ConsultaContas) por agência do índice.
+    """
+
+    def __init__(self, tabela: str = None, colunas: list = None, mes_emissao: str = None,
+                 contas: list = None, agencias: list = None, tamanho_lote: int = None,
+                 atualizado_apos: str = None):
+        """
+        Parâmetros:
+        -----------
+        tabela : str, opcional
+            Tabela de contas no Databricks. Por padrão, utiliza a variável global TABELA_DATABRICKS.
+        colunas : list, opcional
+            Colunas a serem projetadas. Por padrão, as colunas utilizadas pelos extratos.
+        mes_emissao : str, opcional
+            Mês de emissão no formato 'AAAA-MM', ou intervalo de meses 'AAAA-MM:AAAA-MM'. Se None, não filtra por mês.
+        contas : list, opcional
+            Contas a serem buscadas (formato 'NNNNN-D'). Se None, não filtra por conta.
+        agencias : list, opcional
+            Agências a serem buscadas (coluna 'agencia' do Databricks). Se None, não filtra por agência.
+        tamanho_lote : int, opcional
+            Quantidade máxima de valores por lista IN. Por padrão, utiliza a variável global TAMANHO_LOTE_CONSULTA.
+        atualizado_apos : str, opcional
+            Timestamp ISO; busca apenas linhas com COLUNA_ATUALIZACAO posterior a ele. Se None, não filtra.
+        """
+        self.tabela = tabela or gvars.TABELA_DATABRICKS
+        self.colunas = colunas or COLUNAS_DATABRICKS
+        self.mes_emissao = mes_emissao
+        self.contas = sorted(set(contas)) if contas is not None else None
+        self.agencias = sorted(set(agencias)) if agencias is not None else None
+        self.tamanho_lote = tamanho_lote or gvars.TAMANHO_LOTE_CONSULTA
+        self.atualizado_apos = atualizado_apos
+
+    @staticmethod
+    def dias_emissao(mes_emissao: str) -> list:
+        """
+        Retorna todos os dias ('dd/MM/yyyy', formato da coluna data_emissao) do mês de emissão
+        'AAAA-MM' ou do intervalo de meses 'AAAA-MM:AAAA-MM'.
+        """
+        inicio, _, fim = mes_emissao.partition(':')
+        dias = pd.date_range(pd.Period(inicio, 'M').start_time, pd.Period(fim or inicio, 'M').end_time.normalize(), freq='D')
+        if dias.empty:
+            raise ValueError(f"Intervalo de meses inválido: {mes_emissao}")
+        return dias.strftime('%d/%m/%Y').tolist()
+
+    @staticmethod
+    def _lista_in(coluna: str, prefixo: str, valores: list):
+        nomes = [f"{prefixo}{i}" for i in range(len(valores))]
+        condicao = f"{coluna} IN ({', '.join(':' + n for n in nomes)})"
+        parametros = [{"name": n, "value": str(v), "type": "STRING"} for n, v in zip(nomes, valores)]
+        return condicao, parametros
+
+    def montar(self) -> list:
+        """
+        Monta as consultas parametrizadas.
+
+        Retorna:
+        --------
+        list
+            Lista de tuplas (statement, parameters). Vazia se a lista de contas ou agências for vazia.
+        """
+        condicoes = []
+        parametros = []
+        if self.mes_emissao:
+            # A coluna é comparada sem funções (to_date/date_format), para que o filtro seja aplicado
+            # na leitura e permita descartar arquivos e partições. Como data_emissao é texto
+            # 'dd/MM/yyyy', sem ordem cronológica, o mês (ou intervalo) vira a lista dos seus dias
+            condicao, parametros_in = ConsultaContas._lista_in('data_emissao', 'e', ConsultaContas.dias_emissao(self.mes_emissao))
+            condicoes.append(condicao)
+            parametros.extend(parametros_in)
+        if self.atualizado_apos:
+            condicoes.append(f"{gvars.COLUNA_ATUALIZACAO} > :atualizado_apos")
+            parametros.append({"name": "atualizado_apos", "value": self.atualizado_apos, "type": "TIMESTAMP"})
+
+        if self.agencias is not None:
+            if not self.agencias:
+                return []
+            condicao, parametros_in = ConsultaContas._lista_in('agencia', 'a', self.agencias)
+            condicoes.append(condicao)
+            parametros.extend(parametros_in)
+
+        lotes = [None]
+        if self.contas is not None:
+            lotes = [self.contas[i:i + self.tamanho_lote] for i in range(0, len(self.contas), self.tamanho_lote)]
+
+        consultas = []
+        for lote in lotes:
+            condicoes_lote = list(condicoes)
+            parametros_lote = list(parametros)
+            if lote is not None:
+                condicao, parametros_in = ConsultaContas._lista_in('conta', 'c', lote)
+                condicoes_lote.append(condicao)
+                parametros_lote.extend(parametros_in)
+
+            statement = f"SELECT {', '.join(self.colunas)} FROM {self.tabela}"
+            if condicoes_lote:
+                statement += " WHERE " + " AND ".join(condicoes_lote)
+            consultas.append((statement, parametros_lote))
+        return consultas
+
+    @staticmethod
+    def por_agencia(index: pd.DataFrame, mes_emissao: str = None, filtrar_contas: bool = True) -> list:
+        """
+        Divide a consulta em uma partição por agência do índice, para execução concorrente.
+
+        Parâmetros:
+        -----------
+        index : pd.DataFrame
+            Base de índices, com as colunas 'conta' e 'agência'.
+        mes_emissao : str, opcional
+            Mês de emissão no formato 'AAAA-MM'. Se None, não filtra por mês.
+        filtrar_contas : bool, opcional
+            Se True, cada partição busca apenas as contas da agência no índice; caso contrário,
+            filtra pela coluna 'agencia' do Databricks. Padrão: True.
+
+        Retorna:
+        --------
+        list
+            Lista de ConsultaContas, uma por agência.
+        """
+        particoes = []
+        for ag_valor, grupo in index.groupby('agência', sort=True, observed=True):
+            if filtrar_contas:
+                particoes.append(ConsultaContas(mes_emissao=mes_emissao, contas=grupo['conta'].dropna().tolist()))
+            else:
+                agencia = str(int(float(ag_valor))).zfill(2)
+                particoes.append(ConsultaContas(mes_emissao=mes_emissao, agencias=[agencia]))
+        return particoes
 
 class DataFrameBuilder:
     """
@@ -81,19 +308,31 @@ class DataFrameBuilder:
 
     Métodos
     -------
-    get_accounts_data(statement: str, tries: int) -> pd.DataFrame
+    get_accounts_data(statement: str, tries: int, parameters: list, cancelar) -> pd.DataFrame
         Executa uma consulta SQL no Databricks e retorna os dados como DataFrame.
-    get_index_data(path: str) -> pd.DataFrame
+    get_accounts_data_filtrado(consulta: ConsultaContas, tries: int, cancelar) -> pd.DataFrame
+        Executa os lotes de uma ConsultaContas e concatena os resultados.
+    get_accounts_data_particionado(particoes: list, max_paralelo: int, ao_concluir, tries: int, cancelar) -> pd.DataFrame
+        Executa partições da consulta concorrentemente e monta o resultado à medida que terminam.
+    get_accounts_data_delta(mes_emissao: str, completo: bool, cancelar, contas: list) -> pd.DataFrame
+        Busca apenas as contas alteradas desde a última extração e as aplica sobre o cache local.
+    get_index_data(path: str, cancelar) -> pd.DataFrame
         Atualiza e lê uma base Excel, tratando o número da conta, e retorna como DataFrame.
-    create_cota_capital() -> pd.DataFrame
+    create_cota_capital(mes_emissao: str, prazo_segundos: float, completo: bool) -> pd.DataFrame
         Realiza o merge entre a base de contas e o índice, retornando o DataFrame consolidado.
+    carregar_fontes_em_paralelo(mes_emissao: str, prazo_segundos: float, completo: bool) -> tuple
+        Carrega índice e contas ao mesmo tempo, com prazo compartilhado e cancelamento mútuo.
+    salvar_base(df: pd.DataFrame, path: str) -> str
+        Salva a base consolidada em cache local.
+    carregar_base(path: str) -> pd.DataFrame
+        Carrega a base consolidada do cache local.
     """
     path_databricks = gvars.PATH_DATABRICKS
     path_index_accounts = gvars.PATH_INDEX_ACCOUNTS
 
 
     @staticmethod
-    def get_accounts_data(statement: str = path_databricks, tries: int = 3) -> pd.DataFrame:
+    def get_accounts_data(statement: str = path_databricks, tries: int = 3, parameters: list = None, cancelar: threading.Event = None) -> pd.DataFrame:
         """
         Executa uma consulta SQL no Databricks e retorna os dados como um DataFrame do pandas.
 
@@ -103,6 +342,10 @@ class DataFrameBuilder:
             Consulta SQL a ser executada no Databricks. Por padrão, utiliza o valor da variável de ambiente 'PATH_DATABRICKS'.
         tries : int, opcional
             Número máximo de tentativas caso a consulta fique pendente. Padrão: 3.
+        parameters : list, opcional
+            Parâmetros nomeados da consulta, no formato da API do Databricks.
+        cancelar : threading.Event, opcional
+            Evento que, quando sinalizado, cancela a consulta pendente.
 
         Retorna:
         --------
@@ -111,19 +354,195 @@ class DataFrameBuilder:
         """
         logger.info(f"Executando get_accounts_data com statement: {statement[:80]}...")
         databricks = Databricks()
-        response = databricks.sql_statements(statement, tries)
-        response_text_json = json.loads(response.text)
-        
-        data = response_text_json['result']['data_array']
-        logger.info(f"Quantidade de registros retornados: {len(data)}")
+        response_text_json = databricks.sql_statements(statement, tries, parameters=parameters, cancelar=cancelar)
 
         columns = response_text_json['manifest']['schema']['columns']
         column_names = [col['name'] for col in columns]
+        colunas = response_text_json.get('result', {}).get('colunas') or []
+        logger.info(f"Quantidade de registros retornados: {len(colunas[0]) if colunas else 0}")
         logger.info(f"Colunas retornadas: {column_names}")
-        return pd.DataFrame(data, columns=column_names)
+        if not colunas:
+            return pd.DataFrame(columns=column_names)
+        return pd.DataFrame(dict(zip(column_names, colunas)), columns=column_names)
     
     @staticmethod
-    def get_index_data(path : str = path_index_accounts) -> pd.DataFrame:
+    def get_accounts_data_filtrado(consulta: ConsultaContas, tries: int = 3, cancelar: threading.Event = None) -> pd.DataFrame:
+        """
+        Executa as consultas (lotes) montadas por ConsultaContas e concatena os resultados.
+
+        Parâmetros:
+        -----------
+        consulta : ConsultaContas
+            Consulta com projeção e filtros a serem enviados ao Databricks.
+        tries : int, opcional
+            Número máximo de tentativas caso a consulta fique pendente. Padrão: 3.
+        cancelar : threading.Event, opcional
+            Evento que, quando sinalizado, interrompe a execução dos lotes.
+
+        Retorna:
+        --------
+        pd.DataFrame
+            DataFrame contendo os dados retornados por todos os lotes.
+        """
+        consultas = consulta.montar()
+        logger.info(f"Executando {len(consultas)} lote(s) de consulta de contas.")
+        resultados = []
+        for statement, parameters in consultas:
+            if cancelar is not None and cancelar.is_set():
+                raise Exception("Consulta de contas cancelada.")
+            resultados.append(DataFrameBuilder.get_accounts_data(statement, tries, parameters, cancelar))
+        if not resultados:
+            return pd.DataFrame(columns=consulta.colunas)
+        return pd.concat(resultados, ignore_index=True)
+
+    @staticmethod
+    def get_accounts_data_particionado(particoes: list, max_paralelo: int = None, ao_concluir=None, tries: int = 3, cancelar: threading.Event = None) -> pd.DataFrame:
+        """
+        Executa as partições da consulta de contas concorrentemente, limitado a `max_paralelo`
+        statements simultâneos no Databricks, e monta o resultado à medida que cada partição termina.
+
+        Parâmetros:
+        -----------
+        particoes : list
+            Lista de ConsultaContas (ex: ConsultaContas.por_agencia). Cada lote de cada partição
+            é executado como um statement independente.
+        max_paralelo : int, opcional
+            Quantidade máxima de statements simultâneos. Por padrão, utiliza a variável global PARALELISMO_CONSULTA.
+        ao_concluir : callable, opcional
+            Função chamada com o DataFrame de cada statement concluído (na thread chamadora), permitindo
+            iniciar o processamento (ex: geração dos extratos) antes do fim da busca.
+        tries : int, opcional
+            Número máximo de tentativas caso a consulta fique pendente. Padrão: 3.
+        cancelar : threading.Event, opcional
+            Evento que, quando sinalizado, cancela os statements pendentes.
+
+        Retorna:
+        --------
+        pd.DataFrame
+            DataFrame contendo os dados de todas as partições.
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        max_paralelo = max_paralelo or gvars.PARALELISMO_CONSULTA
+        consultas = [consulta for particao in particoes for consulta in particao.montar()]
+        logger.info(f"Executando {len(consultas)} statements em até {max_paralelo} execuções simultâneas.")
+
+        resultados = []
+        with ThreadPoolExecutor(max_workers=max_paralelo) as executor:
+            futures = [
+                executor.submit(DataFrameBuilder.get_accounts_data, statement, tries, parameters, cancelar)
+                for statement, parameters in consultas
+            ]
+            try:
+                for future in as_completed(futures):
+                    df = future.result()
+                    resultados.append(df)
+                    if ao_concluir is not None:
+                        ao_concluir(df)
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        if not resultados:
+            colunas = particoes[0].colunas if particoes else COLUNAS_DATABRICKS
+            return pd.DataFrame(columns=colunas)
+        return pd.concat(resultados, ignore_index=True)
+
+    @staticmethod
+    def get_accounts_data_delta(mes_emissao: str = None, completo: bool = False, cancelar: threading.Event = None, contas: list = None) -> pd.DataFrame:
+        """
+        Busca apenas as contas alteradas desde a última extração bem-sucedida e as aplica sobre a
+        base de contas em cache local.
+
+        A marca d'água (maior COLUNA_ATUALIZACAO já recebida) é persistida junto com o cache. Cada
+        execução busca as linhas com atualização posterior à marca d'água menos DELTA_MARGEM_MINUTOS
+        (para capturar correções gravadas com atraso), substitui essas linhas no cache e remove as
+        linhas que não existem mais no Databricks (consulta apenas das colunas 'conta' e 'data_emissao').
+        As linhas são identificadas por conta e data de emissão, de modo que, com um intervalo de
+        meses, a correção de um mês não descarta os demais meses da conta.
+
+        Com `contas` (FILTRAR_CONTAS_NA_CONSULTA), todas as consultas são filtradas pelas contas do
+        índice; contas do índice ausentes do cache são buscadas por inteiro, independentemente da
+        marca d'água.
+
+        Uma extração completa é feita quando `completo` é True, quando não há cache ou quando o mês
+        de emissão, as colunas ou o uso do filtro de contas mudam em relação ao cache.
+
+        Parâmetros:
+        -----------
+        mes_emissao : str, opcional
+            Mês de emissão no formato 'AAAA-MM', ou intervalo 'AAAA-MM:AAAA-MM'. Se None, não filtra por mês.
+        completo : bool, opcional
+            Força a extração completa, descartando o cache. Padrão: False.
+        cancelar : threading.Event, opcional
+            Evento que, quando sinalizado, cancela as consultas pendentes.
+        contas : list, opcional
+            Contas do índice a serem buscadas (formato 'NNNNN-D'). Se None, não filtra por conta.
+
+        Retorna:
+        --------
+        pd.DataFrame
+            Base de contas atualizada.
+        """
+        colunas = COLUNAS_DATABRICKS + [gvars.COLUNA_ATUALIZACAO]
+        chave = ['conta', 'data_emissao']
+        filtrar_contas = contas is not None
+        estado = {}
+        if os.path.exists(gvars.PATH_CACHE_WATERMARK) and os.path.exists(gvars.PATH_CACHE_CONTAS):
+            with open(gvars.PATH_CACHE_WATERMARK, encoding='utf-8') as f:
+                estado = json.load(f)
+
+        if (completo or not estado or estado.get('mes_emissao') != mes_emissao or estado.get('colunas') != colunas
+                or estado.get('filtrar_contas', False) != filtrar_contas):
+            logger.info("Extração completa da base de contas.")
+            accounts = DataFrameBuilder.get_accounts_data_filtrado(
+                ConsultaContas(colunas=colunas, mes_emissao=mes_emissao, contas=contas), cancelar=cancelar
+            )
+        else:
+            desde = pd.Timestamp(estado['watermark']) - pd.Timedelta(minutes=gvars.DELTA_MARGEM_MINUTOS)
+            logger.info(f"Extração delta da base de contas: alterações após {desde.isoformat()}.")
+            cache = pd.read_pickle(gvars.PATH_CACHE_CONTAS)
+
+            alteradas = DataFrameBuilder.get_accounts_data_filtrado(
+                ConsultaContas(colunas=colunas, mes_emissao=mes_emissao, contas=contas, atualizado_apos=desde.isoformat()),
+                cancelar=cancelar
+            )
+            if filtrar_contas:
+                novas = sorted(set(contas) - set(cache['conta']) - set(alteradas['conta']))
+                if novas:
+                    logger.info(f"{len(novas)} contas do índice ausentes do cache serão buscadas por inteiro.")
+                    alteradas = pd.concat([alteradas, DataFrameBuilder.get_accounts_data_filtrado(
+                        ConsultaContas(colunas=colunas, mes_emissao=mes_emissao, contas=novas), cancelar=cancelar
+                    )], ignore_index=True)
+            chaves = DataFrameBuilder.get_accounts_data_filtrado(
+                ConsultaContas(colunas=chave, mes_emissao=mes_emissao, contas=contas), cancelar=cancelar
+            )
+
+            existentes = pd.MultiIndex.from_frame(cache[chave].astype(str))
+            removidas = ~existentes.isin(pd.MultiIndex.from_frame(chaves[chave].astype(str)))
+            substituidas = existentes.isin(pd.MultiIndex.from_frame(alteradas[chave].astype(str)))
+            cache = cache[~removidas & ~substituidas]
+            accounts = pd.concat([cache, alteradas], ignore_index=True)
+            logger.info(
+                f"Delta aplicado: {len(alteradas)} linhas novas/alteradas, {int(removidas.sum())} removidas, "
+                f"{len(accounts)} linhas na base."
+            )
+
+        atualizacoes = pd.to_datetime(accounts[gvars.COLUNA_ATUALIZACAO], errors='coerce')
+        watermark = atualizacoes.max() if atualizacoes.notna().any() else pd.Timestamp(estado.get('watermark', 0))
+
+        os.makedirs(os.path.dirname(gvars.PATH_CACHE_CONTAS) or '.', exist_ok=True)
+        accounts.to_pickle(gvars.PATH_CACHE_CONTAS)
+        with open(gvars.PATH_CACHE_WATERMARK, 'w', encoding='utf-8') as f:
+            json.dump({'watermark': watermark.isoformat(), 'mes_emissao': mes_emissao, 'colunas': colunas,
+                       'filtrar_contas': filtrar_contas}, f)
+        logger.info(f"Marca d'água da base de contas: {watermark.isoformat()}")
+
+        return accounts
+
+    @staticmethod
+    def get_index_data(path : str = path_index_accounts, cancelar: threading.Event = None) -> pd.DataFrame:
         """
         Atualiza e lê uma base Excel, tratando o número da conta, e retorna como DataFrame.
 
@@ -131,14 +550,18 @@ class DataFrameBuilder:
         -----------
         path : str, opcional
             Caminho para o arquivo Excel da base de índices. Por padrão, utiliza o valor da variável de ambiente 'PATH_INDEX_ACCOUNTS'.
+        cancelar : threading.Event, opcional
+            Evento que, quando sinalizado, interrompe a atualização da planilha entre as etapas.
 
         Retorna:
         --------
         pd.DataFrame
             DataFrame contendo os dados da base de índices, com o número da conta tratado.
         """
+        from src.navigations import DSSheets
+
         logger.info('Atualizando base_completa')
-        DSSheets.windows_excel_refresh_query(path, visible=True)
+        DSSheets.windows_excel_refresh_query(path, visible=True, cancelar=cancelar)
         df_index = pd.read_excel(path)
         logger.info('Realizando a leitura da base')
 
@@ -149,10 +572,36 @@ class DataFrameBuilder:
         return df_index
     
     @staticmethod
-    def create_cota_capital():
+    def create_cota_capital(mes_emissao: str = None, prazo_segundos: float = None, completo: bool = False):
         """
         Realiza o merge entre a base de contas (Databricks) e a base de índices (Excel),
-        retornando um DataFrame consolidado para geração dos extratos.
+        retornando um DataFrame consolidado para geração dos extratos, com os tipos
+        otimizados por BaseSchema.
+
+        Com CARREGAR_FONTES_EM_PARALELO, a atualização do índice (Excel) e a consulta ao Databricks
+        são executadas ao mesmo tempo, com prazo compartilhado; a consulta projeta apenas as colunas
+        utilizadas e filtra pelo mês de emissão, e o merge descarta as contas fora do índice.
+        Como a consulta não depende do índice, não há filtro por conta nem divisão por agência
+        (desativado por padrão).
+
+        Com EXTRACAO_DELTA, apenas as contas alteradas desde a última extração são buscadas e
+        aplicadas sobre a base de contas em cache (ver get_accounts_data_delta), com o mesmo filtro
+        pelas contas do índice (FILTRAR_CONTAS_NA_CONSULTA).
+
+        Caso contrário, o índice é carregado primeiro e, com FILTRAR_CONTAS_NA_CONSULTA, apenas as
+        contas presentes nele são buscadas. Com PARALELISMO_CONSULTA > 1, a consulta é dividida
+        por agência e as partições são executadas concorrentemente.
+
+        Parâmetros:
+        -----------
+        mes_emissao : str, opcional
+            Mês de emissão no formato 'AAAA-MM', ou intervalo 'AAAA-MM:AAAA-MM' para a geração
+            de vários meses (ver ExtratosPeriodo). Por padrão, utiliza a variável global MES_EMISSAO
+            (None busca todas as emissões).
+        prazo_segundos : float, opcional
+            Prazo total da carga em paralelo. Por padrão, utiliza a variável global PRAZO_CARGA_SEGUNDOS.
+        completo : bool, opcional
+            Com EXTRACAO_DELTA, força a extração completa da base de contas. Padrão: False.
 
         Retorna:
         --------
@@ -161,21 +610,148 @@ class DataFrameBuilder:
         """
 
         logger.info("Iniciando criação do DataFrame de cota capital.")
+        mes_emissao = mes_emissao or gvars.MES_EMISSAO
 
-        logger.info("Obtendo dados das contas do Databricks.")
-        accounts = DataFrameBuilder.get_accounts_data()
-        logger.info(f"Dados das contas obtidos: {accounts.shape[0]} linhas, {accounts.shape[1]} colunas.")
+        if gvars.CARREGAR_FONTES_EM_PARALELO:
+            if not mes_emissao:
+                logger.warning("Carga em paralelo sem MES_EMISSAO: a tabela de contas será consultada por inteiro.")
+            index, accounts = DataFrameBuilder.carregar_fontes_em_paralelo(mes_emissao, prazo_segundos, completo)
+        else:
+            logger.info("Obtendo dados do índice (Excel).")
+            index = DataFrameBuilder.get_index_data()
+            logger.info(f"Dados do índice obtidos: {index.shape[0]} linhas, {index.shape[1]} colunas.")
 
-        logger.info("Obtendo dados do índice (Excel).")
-        index = DataFrameBuilder.get_index_data()
-        logger.info(f"Dados do índice obtidos: {index.shape[0]} linhas, {index.shape[1]} colunas.")
+            logger.info("Obtendo dados das contas do Databricks.")
+            if gvars.EXTRACAO_DELTA:
+                contas = index['conta'].dropna().tolist() if gvars.FILTRAR_CONTAS_NA_CONSULTA else None
+                accounts = DataFrameBuilder.get_accounts_data_delta(mes_emissao, completo, contas=contas)
+            elif gvars.PARALELISMO_CONSULTA > 1:
+                particoes = ConsultaContas.por_agencia(index, mes_emissao, gvars.FILTRAR_CONTAS_NA_CONSULTA)
+                accounts = DataFrameBuilder.get_accounts_data_particionado(particoes)
+            else:
+                consulta = ConsultaContas(
+                    mes_emissao=mes_emissao,
+                    contas=index['conta'].dropna().tolist() if gvars.FILTRAR_CONTAS_NA_CONSULTA else None
+                )
+                accounts = DataFrameBuilder.get_accounts_data_filtrado(consulta)
+            logger.info(f"Dados das contas obtidos: {accounts.shape[0]} linhas, {accounts.shape[1]} colunas.")
 
         logger.info("Realizando merge entre as bases de contas e índices.")
         merged_df = pd.merge(index, accounts, on='conta')
         logger.info(f"Merge concluído: {merged_df.shape[0]} linhas, {merged_df.shape[1]} colunas.")
 
+        logger.info("Otimizando tipos e descartando colunas não utilizadas.")
+        merged_df = BaseSchema.otimizar(merged_df)
+
+        # Contas descartadas pelo merge, para a pré-validação (ValidacaoBase). Ficam em arquivo à parte,
+        # e não em merged_df.attrs, que o pandas copia a cada fatia e a cada linha do iterrows
+        ValidacaoBase.salvar_conciliacao(ValidacaoBase.conciliar(index, accounts), len(merged_df))
+
         return merged_df
-        
+
+    @staticmethod
+    def carregar_fontes_em_paralelo(mes_emissao: str = None, prazo_segundos: float = None, completo: bool = False):
+        """
+        Executa a atualização/leitura do índice (Excel, via COM em thread própria) e a consulta
+        de contas no Databricks ao mesmo tempo. Se uma das cargas falhar ou o prazo expirar,
+        a outra é cancelada (statement cancelado no Databricks e Excel encerrado na próxima etapa).
+
+        Parâmetros:
+        -----------
+        mes_emissao : str, opcional
+            Mês de emissão no formato 'AAAA-MM'. Se None, não filtra por mês.
+        prazo_segundos : float, opcional
+            Prazo total das duas cargas. Por padrão, utiliza a variável global PRAZO_CARGA_SEGUNDOS.
+        completo : bool, opcional
+            Com EXTRACAO_DELTA, força a extração completa da base de contas. Padrão: False.
+
+        Retorna:
+        --------
+        tuple
+            (index, accounts): DataFrames do índice e das contas.
+        """
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+
+        prazo_segundos = prazo_segundos or gvars.PRAZO_CARGA_SEGUNDOS
+        cancelar = threading.Event()
+
+        logger.info(f"Obtendo índice (Excel) e contas (Databricks) em paralelo, prazo de {prazo_segundos}s.")
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="carga")
+        futures = {
+            executor.submit(DataFrameBuilder.get_index_data, cancelar=cancelar): "índice",
+            executor.submit(DataFrameBuilder._carregar_contas_sem_indice, mes_emissao, completo, cancelar): "contas",
+        }
+        try:
+            concluidos, pendentes = wait(futures, timeout=prazo_segundos, return_when=FIRST_EXCEPTION)
+            for future in concluidos:
+                if future.exception() is not None:
+                    logger.error(f"Falha na carga de {futures[future]}; cancelando as demais.")
+                    raise future.exception()
+            if pendentes:
+                nomes = ", ".join(futures[f] for f in pendentes)
+                raise TimeoutError(f"Prazo de {prazo_segundos}s esgotado aguardando a carga de: {nomes}.")
+        except BaseException:
+            cancelar.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+
+        resultados = {nome: future.result() for future, nome in futures.items()}
+        index, accounts = resultados["índice"], resultados["contas"]
+        logger.info(f"Dados do índice obtidos: {index.shape[0]} linhas, {index.shape[1]} colunas.")
+        logger.info(f"Dados das contas obtidos: {accounts.shape[0]} linhas, {accounts.shape[1]} colunas.")
+        return index, accounts
+
+    @staticmethod
+    def _carregar_contas_sem_indice(mes_emissao: str, completo: bool, cancelar: threading.Event) -> pd.DataFrame:
+        if gvars.EXTRACAO_DELTA:
+            return DataFrameBuilder.get_accounts_data_delta(mes_emissao, completo, cancelar)
+        return DataFrameBuilder.get_accounts_data_filtrado(ConsultaContas(mes_emissao=mes_emissao), cancelar=cancelar)
+
+    @staticmethod
+    def salvar_base(df: pd.DataFrame, path: str = None) -> str:
+        """
+        Salva a base consolidada em cache local, para reaproveitamento pelas etapas seguintes (render, zip, mail).
+
+        Parâmetros:
+        -----------
+        df : pd.DataFrame
+            Base consolidada gerada por create_cota_capital.
+        path : str, opcional
+            Caminho do arquivo de cache. Por padrão, utiliza a variável global PATH_CACHE_BASE.
+
+        Retorna:
+        --------
+        str
+            Caminho do arquivo salvo.
+        """
+        path = path or gvars.PATH_CACHE_BASE
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        df.to_pickle(path)
+        logger.info(f"Base consolidada salva em {path}")
+        return path
+
+    @staticmethod
+    def carregar_base(path: str = None) -> pd.DataFrame:
+        """
+        Carrega a base consolidada salva por salvar_base.
+
+        Parâmetros:
+        -----------
+        path : str, opcional
+            Caminho do arquivo de cache. Por padrão, utiliza a variável global PATH_CACHE_BASE.
+
+        Retorna:
+        --------
+        pd.DataFrame
+            Base consolidada.
+        """
+        path = path or gvars.PATH_CACHE_BASE
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Base consolidada não encontrada em {path}. Execute a etapa 'fetch' antes.")
+        logger.info(f"Carregando base consolidada de {path}")
+        return pd.read_pickle(path)
+
 if __name__ == "__main__":
     # dmanager = DataFrameBuilder()
     # print(dmanager.create_cota_capital())
@@ -185,29 +761,19 @@ if __name__ == "__main__":
 
     test_statement = ""
 
-    response = db.sql_statements(test_statement, 3)
-    response_text_json = json.loads(response.text)
+    response_text_json = db.sql_statements(test_statement, 3)
     # print(response_text_json)
 
-    list_accounts = response_text_json['result']['data_array']
+    colunas = response_text_json['result']['colunas']
     rows_amnt = response_text_json['result']['row_count']
-    print(f"Quantidade de itens na lista: {len(list_accounts)}, row_counts = {rows_amnt}")
+    print(f"Quantidade de itens na lista: {len(colunas[0]) if colunas else 0}, row_counts = {rows_amnt}")
 
     columns = response_text_json['manifest']['schema']['columns']
     column_names = [col['name'] for col in columns]
-    df = pd.DataFrame(list_accounts, columns=column_names)
+    df = pd.DataFrame(dict(zip(column_names, colunas)), columns=column_names)
     #print(df)
 
-    # def existe_valor_negativo_em_dataframe(df):
-    #     """
-    #     Verifica se há valores negativos no campo 'valor_transacao' dentro
-    #     """
-    #     for idx, row in df.iterrows():
-    #         valor_mov = row['tipo_valor_data_movimentacao']
-    #         if not valor_mov or valor_mov in ('', 'null', 'None'):
-    #             continue  # pula se for None, vazio ou string nula
-    #         movimentos = json.loads(valor_mov)
-    #         for movimento in movimentos:
-    #             if float(movimento.get("valor_transacao", 0)) < 0:
-    #                 print(f"Conta: {row.get('conta', 'N/A')} possui valor negativo: {movimento}")
-    # existe_valor_negativo_em_dataframe(df)
+    # Valores negativos, somas divergentes e demais verificações da base, de forma vetorizada
+    relatorio = ValidacaoBase.validar(df, saida='')
+    for conta in relatorio['avisos']['valor_negativo']['contas']:
+        print(f"Conta: {conta} possui valor negativo")
@@ -0,0 +1,271 @@
+import io
+import os
+import json
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.log import Logs
+from src.pdf_config import PDF_CONFIG
+from src.report_generator import CotaCapital
+from src.run_summary import ResumoExecucao
+from src.storage import Armazenamento
+import src.global_vars as gvars
+
+# Este módulo implementa a execução de teste (dry run) da geração dos extratos, para conferir
+# mudanças de template e a qualidade dos dados antes da execução mensal completa. Em vez de gerar
+# todos os extratos, é sorteada uma amostra estratificada por agência, administradora e faixa de
+# quantidade de movimentações (que determina o tamanho e o tempo de cada extrato). Apenas a amostra
+# é gerada, em memória ou em PATH_TESTE, sem compactação nem envio de e-mails. O custo medido por
+# conta em cada estrato é então aplicado à população do estrato para projetar o tempo e o tamanho
+# da execução completa.
+#
+# Uso:
+#     python app.py teste --por-estrato 3 --em-memoria --saida relatorio_teste.json
+
+logger = Logs.load_log(__name__)
+
+# Limites inferiores das faixas de quantidade de movimentações usadas na estratificação
+FAIXAS_MOVIMENTOS = [0, 1, 6, 21]
+ROTULOS_FAIXAS = ['0', '1-5', '6-20', '21+']
+
+CHAVE_ESTRATO = ['agencia', 'administradora', 'faixa']
+
+
+class ExecucaoTeste:
+    """
+    Execução de teste com amostra estratificada e projeção da execução completa.
+
+    Métodos
+    -------
+    estratos(contas: pd.DataFrame) -> pd.DataFrame
+        Retorna o estrato (agência, administradora, faixa de movimentações) de cada conta.
+    amostrar(estratos: pd.DataFrame, por_estrato, semente) -> np.ndarray
+        Sorteia até 'por_estrato' contas de cada estrato e retorna as posições sorteadas.
+    executar(contas: pd.DataFrame, por_estrato, em_memoria, semente, saida) -> dict
+        Gera a amostra, mede o custo por conta e retorna o relatório com a projeção.
+    projetar(estratos: pd.DataFrame, medidas: pd.DataFrame) -> pd.DataFrame
+        Projeta segundos, bytes e falhas de cada estrato a partir das medidas da amostra.
+    """
+
+    @staticmethod
+    def estratos(contas: pd.DataFrame) -> pd.DataFrame:
+        """
+        Parâmetros:
+        -----------
+        contas : pd.DataFrame
+            Base consolidada.
+
+        Retorna:
+        --------
+        pd.DataFrame
+            Uma linha por conta (mesma ordem da base) com 'agencia', 'administradora',
+            'faixa' e 'movimentos'.
+        """
+        movimentos = ResumoExecucao.quantidade_movimentos(contas)
+        faixa = np.searchsorted(FAIXAS_MOVIMENTOS, movimentos, side='right') - 1
+        return pd.DataFrame({
+            'agencia': ResumoExecucao.codigos_agencia(contas),
+            'administradora': contas['administradora'].astype(object).fillna('').astype(str).to_numpy(),
+            'faixa': np.asarray(ROTULOS_FAIXAS, dtype=object)[faixa],
+            'movimentos': movimentos,
+        })
+
+    @staticmethod
+    def amostrar(estratos: pd.DataFrame, por_estrato: int = None, semente: int = 0) -> np.ndarray:
+        """
+        Sorteia até por_estrato contas de cada estrato (todas, se o estrato for menor).
+
+        Parâmetros:
+        -----------
+        estratos : pd.DataFrame
+            Resultado de estratos().
+        por_estrato : int, opcional
+            Contas por estrato. Padrão: variável global AMOSTRA_POR_ESTRATO.
+        semente : int, opcional
+            Semente do sorteio, para que a mesma base produza a mesma amostra.
+
+        Retorna:
+        --------
+        np.ndarray
+            Posições (ordenadas) das contas sorteadas na base.
+        """
+        por_estrato = max(1, por_estrato or gvars.AMOSTRA_POR_ESTRATO)
+        ordem = np.random.default_rng(semente).permutation(len(estratos))
+        embaralhados = estratos.iloc[ordem]
+        sorteados = embaralhados.groupby(CHAVE_ESTRATO, sort=False).cumcount().to_numpy() < por_estrato
+        return np.sort(ordem[sorteados])
+
+    @staticmethod
+    def executar(contas: pd.DataFrame, por_estrato: int = None, em_memoria: bool = False,
+                 semente: int = 0, saida: str = None) -> dict:
+        """
+        Gera os extratos da amostra estratificada e projeta a execução completa.
+
+        Parâmetros:
+        -----------
+        contas : pd.DataFrame
+            Base consolidada.
+        por_estrato : int, opcional
+            Contas sorteadas por estrato. Padrão: variável global AMOSTRA_POR_ESTRATO.
+        em_memoria : bool, opcional
+            Gera os PDFs apenas em memória. Caso contrário, grava-os em PATH_TESTE, na mesma
+            estrutura de pastas da execução real, para conferência visual.
+        semente : int, opcional
+            Semente do sorteio.
+        saida : str, opcional
+            Caminho do relatório em JSON. Padrão: variável global PATH_RELATORIO_TESTE (vazio não grava).
+
+        Retorna:
+        --------
+        dict
+            'contas', 'estratos', 'amostra', 'medido' (totais da amostra), 'projecao' (execução
+            completa: 'segundos', 'bytes', 'falhas'), 'agencias' (projeção por agência) e
+            'falhas_amostra' (conta e erro das contas da amostra que falharam).
+        """
+        inicio_execucao = time.perf_counter()
+        estratos = ExecucaoTeste.estratos(contas)
+        posicoes = ExecucaoTeste.amostrar(estratos, por_estrato, semente)
+        amostra = contas.iloc[posicoes]
+        logger.info(f"Execução de teste: {len(amostra)} contas sorteadas em "
+                    f"{estratos.groupby(CHAVE_ESTRATO).ngroups} estratos ({len(contas)} contas na base).")
+
+        medidas, falhas = ExecucaoTeste._gerar_amostra(amostra, em_memoria)
+        medidas.index = posicoes
+        medidas = estratos.iloc[posicoes].join(medidas)
+
+        projecao = ExecucaoTeste.projetar(estratos, medidas)
+        por_agencia = projecao.groupby('agencia', sort=True)[['contas', 'segundos', 'bytes', 'falhas']].sum()
+        geradas = medidas[medidas['gerado']]
+
+        relatorio = {
+            'gerado_em': datetime.now().isoformat(timespec='seconds'),
+            'contas': len(contas),
+            'estratos': int(len(projecao)),
+            'amostra': int(len(amostra)),
+            'em_memoria': bool(em_memoria),
+            'perfil_pdf': gvars.PERFIL_PDF,
+            'medido': {
+                'segundos': round(float(geradas['segundos'].sum()), 3),
+                'bytes': int(geradas['bytes'].sum()),
+                'ms_medio': round(1000 * float(geradas['segundos'].mean()), 2) if len(geradas) else 0.0,
+                'bytes_medio': round(float(geradas['bytes'].mean())) if len(geradas) else 0,
+                'falhas': len(falhas),
+                'duracao_teste': round(time.perf_counter() - inicio_execucao, 3),
+            },
+            'projecao': {
+                'segundos': round(float(projecao['segundos'].sum()), 1),
+                'minutos': round(float(projecao['segundos'].sum()) / 60, 1),
+                'bytes': int(projecao['bytes'].sum()),
+                'mb': round(float(projecao['bytes'].sum()) / 1024 ** 2, 1),
+                'falhas': int(round(float(projecao['falhas'].sum()))),
+            },
+            'agencias': {
+                agencia: {
+                    'contas': int(linha.contas),
+                    'segundos': round(float(linha.segundos), 1),
+                    'bytes': int(linha.bytes),
+                    'falhas': int(round(float(linha.falhas))),
+                }
+                for agencia, linha in por_agencia.iterrows()
+            },
+            'falhas_amostra': falhas,
+        }
+
+        p = relatorio['projecao']
+        logger.info(f"Amostra gerada: {relatorio['amostra'] - len(falhas)} extratos, {len(falhas)} falhas, "
+                    f"{relatorio['medido']['ms_medio']} ms e {relatorio['medido']['bytes_medio']} bytes por extrato.")
+        logger.info(f"Projeção da execução completa: {p['minutos']} min de geração, {p['mb']} MB, "
+                    f"cerca de {p['falhas']} falhas (sem compactação e envio de e-mails).")
+
+        saida = gvars.PATH_RELATORIO_TESTE if saida is None else saida
+        if saida:
+            os.makedirs(os.path.dirname(saida) or '.', exist_ok=True)
+            with open(saida, 'w', encoding='utf-8') as f:
+                json.dump(relatorio, f, ensure_ascii=False, indent=2)
+            logger.info(f"Relatório da execução de teste gravado em {saida}.")
+        return relatorio
+
+    @staticmethod
+    def projetar(estratos: pd.DataFrame, medidas: pd.DataFrame) -> pd.DataFrame:
+        """
+        Aplica o custo médio por conta medido em cada estrato à população do estrato. O tempo e o
+        tamanho vêm dos extratos gerados com sucesso; estratos sem nenhum extrato gerado usam a
+        média da sua faixa de movimentações (ou de toda a amostra). A taxa de falhas do estrato
+        projeta as falhas da execução completa.
+
+        Parâmetros:
+        -----------
+        estratos : pd.DataFrame
+            Resultado de estratos() para a base inteira.
+        medidas : pd.DataFrame
+            Estratos da amostra com 'gerado', 'segundos' e 'bytes' de cada conta.
+
+        Retorna:
+        --------
+        pd.DataFrame
+            Uma linha por estrato com 'contas', 'segundos', 'bytes' e 'falhas' projetados.
+        """
+        populacao = estratos.groupby(CHAVE_ESTRATO, sort=True).size().rename('contas')
+        geradas = medidas[medidas['gerado']]
+
+        custo = geradas.groupby(CHAVE_ESTRATO)[['segundos', 'bytes']].mean().reindex(populacao.index)
+        por_faixa = geradas.groupby('faixa')[['segundos', 'bytes']].mean()
+        faixas = populacao.index.get_level_values('faixa')
+        for coluna in ('segundos', 'bytes'):
+            substituto = por_faixa[coluna].reindex(faixas).to_numpy() if len(por_faixa) else np.full(len(faixas), np.nan)
+            geral = geradas[coluna].mean() if len(geradas) else 0.0
+            custo[coluna] = custo[coluna].fillna(pd.Series(substituto, index=custo.index)).fillna(geral)
+
+        taxa_falhas = (~medidas['gerado']).groupby([medidas[c] for c in CHAVE_ESTRATO]).mean()
+        taxa_falhas = taxa_falhas.reindex(populacao.index).fillna(0.0)
+
+        projecao = pd.DataFrame({'contas': populacao})
+        projecao['segundos'] = populacao * (1 - taxa_falhas) * custo['segundos']
+        projecao['bytes'] = (populacao * (1 - taxa_falhas) * custo['bytes']).round().astype(np.int64)
+        projecao['falhas'] = populacao * taxa_falhas
+        return projecao.reset_index()
+
+    @staticmethod
+    def _gerar_amostra(amostra: pd.DataFrame, em_memoria: bool) -> tuple:
+        # O fundo é codificado antes da medição, como ocorre uma única vez por processo no lote
+        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        CotaCapital.preparar_fundo(os.path.join(base_dir, "data", "img", "background.png"))
+
+        armazenamento = None
+        if not em_memoria:
+            armazenamento = Armazenamento.criar(gvars.PATH_TESTE, 'local')
+            armazenamento.preparar_pastas(CotaCapital.pastas_saida(amostra))
+
+        gerado = np.zeros(len(amostra), dtype=bool)
+        segundos = np.zeros(len(amostra))
+        tamanhos = np.zeros(len(amostra), dtype=np.int64)
+        falhas = []
+        for posicao, (_, row) in enumerate(amostra.iterrows()):
+            inicio = time.perf_counter()
+            try:
+                if armazenamento is None:
+                    buffer = io.BytesIO()
+                    CotaCapital.gerar_pdf(buffer, row, PDF_CONFIG, '')
+                    tamanhos[posicao] = buffer.getbuffer().nbytes
+                else:
+                    _, tamanhos[posicao] = CotaCapital.gerar_extrato_conta(row, gvars.PATH_TESTE, armazenamento)
+            except Exception as e:
+                logger.warning(f"Amostra: erro ao gerar extrato da conta {row.get('conta', 'N/A')}: {type(e).__name__}: {e}")
+                falhas.append({'conta': str(row.get('conta', 'N/A')), 'erro': f"{type(e).__name__}: {e}"})
+                continue
+            segundos[posicao] = time.perf_counter() - inicio
+            gerado[posicao] = True
+
+        if armazenamento is not None:
+            nao_gravados = armazenamento.confirmar()
+            for posicao in (np.flatnonzero(gerado) if nao_gravados else []):
+                row = amostra.iloc[posicao]
+                erro = nao_gravados.get(CotaCapital.caminho_relativo(row)[1])
+                if erro:
+                    gerado[posicao] = False
+                    falhas.append({'conta': str(row.get('conta', 'N/A')), 'erro': erro})
+            logger.info(f"Extratos da amostra gravados em {gvars.PATH_TESTE}.")
+        return pd.DataFrame({'gerado': gerado, 'segundos': segundos, 'bytes': tamanhos}), falhas
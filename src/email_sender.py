@@ -2,7 +2,10 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import smtplib
 import os
-import pandas as pd
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 # Este módulo fornece a classe EmailSender para envio de e-mails via SMTP,
 # com suporte a mensagens em texto ou HTML, além de utilitários para formatação
@@ -18,8 +21,10 @@ class EmailSender:
         Inicializa o objeto EmailSender com as configurações do servidor SMTP.
     send_email(to_email, from_email, subject, body, is_html=False)
         Envia um e-mail para o destinatário especificado, podendo ser em formato HTML ou texto simples.
-    get_body_format()
+    get_body_format(tabela_resumo)
         Retorna o corpo padrão do e-mail em HTML, informando sobre a disponibilidade dos extratos de cota capital.
+    get_email_list_to(df)
+        Retorna os e-mails de destino extraídos da coluna 'email' de um DataFrame.
 
     Exemplo de uso
     --------------
@@ -91,10 +96,15 @@ class EmailSender:
             raise
 
     @staticmethod
-    def get_body_format():
+    def get_body_format(tabela_resumo: str = ""):
         """
         Retorna o corpo padrão do e-mail em HTML, informando sobre a disponibilidade dos extratos de cota capital.
 
+        Parâmetros:
+        -----------
+        tabela_resumo : str, opcional
+            Tabela HTML com os extratos por agência (ver ResumoExecucao.corpo_email), incluída após a mensagem.
+
         Retorna:
         --------
         str
@@ -123,6 +133,7 @@ class EmailSender:
             <body>
             <h2>Extratos de Cota Capital de Condomínios já disponíveis</h2>
             <p>{mensagem_final}</p>
+            {tabela_resumo}
             <p>Para eventuais dúvidas, favor contatar <i>{'Contatos'}</i>.</p>
             <br>
             <p>Atenciosamente,<br>
@@ -133,9 +144,10 @@ class EmailSender:
         """
 
     @staticmethod
-    def get_email_list_to(df: pd.DataFrame) -> list:
+    def get_email_list_to(df: 'pd.DataFrame') -> list:
         """
         Retorna uma lista de e-mails extraídos de um DataFrame, separando múltiplos e-mails em uma mesma célula.
+        Os endereços são normalizados e validados pelo diretório de destinatários (ver DiretorioDestinatarios).
 
         Parâmetros:
         -----------
@@ -145,26 +157,11 @@ class EmailSender:
         Retorna:
         --------
         list
-            Lista de e-mails extraídos do DataFrame.
+            Lista de e-mails extraídos do DataFrame, sem repetição, na ordem em que aparecem.
         """
-        if 'email' not in df.columns:
-            raise ValueError("O DataFrame deve conter uma coluna 'email'.")
-
-        emails = []
-        for cell in df['email'].dropna():
-            # Divide por ';' ou ',' e remove espaços extras
-            for email in str(cell).replace(';', ',').split(','):
-                email = email.strip()
-                if email:
-                    emails.append(email)
-        # Remove duplicados mantendo a ordem
-        seen = set()
-        unique_emails = []
-        for email in emails:
-            if email not in seen:
-                seen.add(email)
-                unique_emails.append(email)
-        return unique_emails
+        from src.recipients import DiretorioDestinatarios
+
+        return DiretorioDestinatarios.destinatarios(DiretorioDestinatarios.construir(df))
 
 # if __name__ == "__main__":
 
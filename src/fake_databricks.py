@@ -0,0 +1,265 @@
+import os
+import re
+import json
+import time
+import uuid
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Este módulo fornece um servidor local que simula a API de statements do Databricks SQL
+# (POST /api/2.0/sql/statements, GET /api/2.0/sql/statements/<id> e POST .../<id>/cancel), a partir do arquivo
+# docs/simulacao_retorno.json. Permite testar a busca de contas (inclusive particionada e
+# concorrente) sem acesso ao warehouse. O servidor entende a projeção do SELECT e os
+# parâmetros gerados por ConsultaContas (dias de emissão 'e<n>', contas 'c<n>', agências 'a<n>'
+# e atualizado_apos). As linhas podem ser alteradas, incluídas e removidas entre
+# consultas (alterar, adicionar, remover), para testar a extração delta.
+#
+# Uso:
+#     python -m src.fake_databricks --porta 8765 --atraso 0.5
+#     (e configurar DATABRICKS_ENDPOINT = 'http://127.0.0.1:8765/api/2.0/sql/statements')
+
+ROTA_STATEMENTS = "/api/2.0/sql/statements"
+FIXTURE_PADRAO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "docs", "simulacao_retorno.json")
+
+
+class FakeDatabricks:
+    """
+    Servidor HTTP local que simula a API de statements do Databricks SQL.
+
+    Atributos
+    ---------
+    recebidos : list
+        (statement, parameters) de cada statement recebido, na ordem de chegada.
+
+    Métodos
+    -------
+    __init__(fixture, atraso, multiplicar, coluna_atualizacao)
+        Carrega a massa de dados e configura a latência simulada de cada statement.
+    alterar(conta, valores, data_emissao, atualizado_em) -> int
+        Altera as linhas de uma conta e atualiza a data de atualização.
+    adicionar(valores, atualizado_em)
+        Inclui uma linha na massa de dados.
+    remover(conta, data_emissao) -> int
+        Remove as linhas de uma conta.
+    iniciar(porta) -> str
+        Inicia o servidor em segundo plano e retorna a URL do endpoint de statements.
+    parar()
+        Encerra o servidor.
+    """
+
+    def __init__(self, fixture: str = FIXTURE_PADRAO, atraso: float = 0.2, multiplicar: int = 1,
+                 coluna_atualizacao: str = 'data_atualizacao'):
+        """
+        Parâmetros:
+        -----------
+        fixture : str, opcional
+            Resposta de exemplo da API (JSON_ARRAY) usada como massa de dados.
+        atraso : float, opcional
+            Segundos que cada statement permanece em PENDING antes de concluir. Padrão: 0.2.
+        multiplicar : int, opcional
+            Replica as linhas da massa N vezes (com contas distintas) para simular bases maiores. Padrão: 1.
+        coluna_atualizacao : str, opcional
+            Coluna de data/hora de atualização acrescentada às linhas (se a massa não a tiver),
+            filtrada pelo parâmetro atualizado_apos. Padrão: 'data_atualizacao'.
+        """
+        with open(fixture, encoding='utf-8') as f:
+            retorno = json.load(f)
+        self.colunas = [col['name'] for col in retorno['manifest']['schema']['columns']]
+        self.schema = {col['name']: col for col in retorno['manifest']['schema']['columns']}
+        linhas = retorno['result']['data_array']
+        self.coluna_atualizacao = coluna_atualizacao
+        acrescentar_atualizacao = coluna_atualizacao not in self.colunas
+        if acrescentar_atualizacao:
+            self.colunas.append(coluna_atualizacao)
+            self.schema[coluna_atualizacao] = {'name': coluna_atualizacao, 'type_text': 'TIMESTAMP', 'type_name': 'TIMESTAMP'}
+        carga = datetime.now().isoformat(timespec='microseconds')
+        pos_conta = self.colunas.index('conta')
+        self.linhas = []
+        for n in range(multiplicar):
+            for linha in linhas:
+                linha = list(linha)
+                if n:
+                    numero, digito = linha[pos_conta].split('-')
+                    linha[pos_conta] = f"{int(numero) + n * 100000:05d}-{digito}"
+                if acrescentar_atualizacao:
+                    linha.append(carga)
+                self.linhas.append(linha)
+        self.atraso = atraso
+        self.statements = {}
+        self.total_statements = 0
+        self.recebidos = []
+        self._lock = threading.Lock()
+        self._servidor = None
+
+    def _executar(self, statement: str, parametros: list) -> dict:
+        valores = {p['name']: p['value'] for p in parametros or []}
+        contas = {v for k, v in valores.items() if re.fullmatch(r"c\d+", k)}
+        agencias = {v for k, v in valores.items() if re.fullmatch(r"a\d+", k)}
+        dias_emissao = {v for k, v in valores.items() if re.fullmatch(r"e\d+", k)}
+        atualizado_apos = valores.get('atualizado_apos')
+        atualizado_apos = datetime.fromisoformat(atualizado_apos) if atualizado_apos else None
+
+        projecao = re.match(r"SELECT\s+(.*?)\s+FROM\s", statement, re.IGNORECASE | re.DOTALL).group(1).strip()
+        colunas = self.colunas if projecao == '*' else [c.strip() for c in projecao.split(',')]
+        posicoes = [self.colunas.index(c) for c in colunas]
+        pos = {c: i for i, c in enumerate(self.colunas)}
+
+        dados = []
+        with self._lock:
+            linhas = [list(linha) for linha in self.linhas]
+        for linha in linhas:
+            if contas and linha[pos['conta']] not in contas:
+                continue
+            if agencias and linha[pos['agencia']] not in agencias:
+                continue
+            if dias_emissao and linha[pos['data_emissao']] not in dias_emissao:
+                continue
+            if atualizado_apos and not datetime.fromisoformat(linha[pos[self.coluna_atualizacao]]) > atualizado_apos:
+                continue
+            dados.append([linha[p] for p in posicoes])
+
+        return {
+            "manifest": {
+                "format": "JSON_ARRAY",
+                "schema": {
+                    "column_count": len(colunas),
+                    "columns": [dict(self.schema[c], position=i) for i, c in enumerate(colunas)],
+                },
+                "total_row_count": len(dados),
+            },
+            "result": {"chunk_index": 0, "row_offset": 0, "row_count": len(dados), "data_array": dados},
+        }
+
+    def alterar(self, conta: str, valores: dict, data_emissao: str = None, atualizado_em: str = None) -> int:
+        """
+        Altera as colunas informadas nas linhas da conta (apenas do mês `data_emissao`, se informado)
+        e grava `atualizado_em` (padrão: agora) na coluna de atualização. Retorna a quantidade de linhas alteradas.
+        """
+        atualizado_em = atualizado_em or datetime.now().isoformat(timespec='microseconds')
+        pos = {c: i for i, c in enumerate(self.colunas)}
+        alteradas = 0
+        with self._lock:
+            for linha in self.linhas:
+                if linha[pos['conta']] != conta or (data_emissao and linha[pos['data_emissao']] != data_emissao):
+                    continue
+                for coluna, valor in dict(valores, **{self.coluna_atualizacao: atualizado_em}).items():
+                    linha[pos[coluna]] = valor
+                alteradas += 1
+        return alteradas
+
+    def adicionar(self, valores: dict, atualizado_em: str = None):
+        """
+        Inclui uma linha com as colunas informadas (as demais ficam nulas), com `atualizado_em`
+        (padrão: agora) na coluna de atualização.
+        """
+        valores = dict(valores, **{self.coluna_atualizacao: atualizado_em or datetime.now().isoformat(timespec='microseconds')})
+        with self._lock:
+            self.linhas.append([valores.get(c) for c in self.colunas])
+
+    def remover(self, conta: str, data_emissao: str = None) -> int:
+        """
+        Remove as linhas da conta (apenas do mês `data_emissao`, se informado). Retorna a quantidade removida.
+        """
+        pos = {c: i for i, c in enumerate(self.colunas)}
+        with self._lock:
+            antes = len(self.linhas)
+            self.linhas = [
+                linha for linha in self.linhas
+                if linha[pos['conta']] != conta or (data_emissao and linha[pos['data_emissao']] != data_emissao)
+            ]
+            return antes - len(self.linhas)
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, status: int, corpo: dict):
+                dados = json.dumps(corpo).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def _estado(self, statement_id: str) -> dict:
+                with fake._lock:
+                    registro = fake.statements.get(statement_id)
+                if registro is None:
+                    return None
+                if time.time() - registro['inicio'] < fake.atraso:
+                    return {"statement_id": statement_id, "status": {"state": "PENDING"}}
+                return dict({"statement_id": statement_id, "status": {"state": "SUCCEEDED"}}, **registro['resultado'])
+
+            def do_POST(self):
+                if self.path.startswith(ROTA_STATEMENTS + '/') and self.path.rstrip('/').endswith('/cancel'):
+                    statement_id = self.path.rstrip('/').rsplit('/', 2)[-2]
+                    with fake._lock:
+                        fake.statements.pop(statement_id, None)
+                    return self._responder(200, {})
+                if self.path.rstrip('/') != ROTA_STATEMENTS:
+                    return self._responder(404, {"message": "rota inexistente"})
+                corpo = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                try:
+                    resultado = fake._executar(corpo['statement'], corpo.get('parameters'))
+                except Exception as e:
+                    return self._responder(400, {"error_code": "BAD_REQUEST", "message": str(e)})
+                statement_id = str(uuid.uuid4())
+                with fake._lock:
+                    fake.statements[statement_id] = {"inicio": time.time(), "resultado": resultado}
+                    fake.total_statements += 1
+                    fake.recebidos.append((corpo['statement'], corpo.get('parameters') or []))
+                self._responder(200, self._estado(statement_id))
+
+            def do_GET(self):
+                statement_id = self.path.rstrip('/').rsplit('/', 1)[-1]
+                estado = self._estado(statement_id) if self.path.startswith(ROTA_STATEMENTS + '/') else None
+                if estado is None:
+                    return self._responder(404, {"message": "statement inexistente"})
+                self._responder(200, estado)
+
+        return Handler
+
+    def iniciar(self, porta: int = 0) -> str:
+        """
+        Inicia o servidor em uma thread em segundo plano.
+
+        Parâmetros:
+        -----------
+        porta : int, opcional
+            Porta local. Padrão: 0 (porta livre escolhida pelo sistema).
+
+        Retorna:
+        --------
+        str
+            URL do endpoint de statements, para uso em DATABRICKS_ENDPOINT.
+        """
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", porta), self._handler())
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._servidor.server_address[1]}{ROTA_STATEMENTS}"
+
+    def parar(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Servidor local que simula a API de statements do Databricks SQL.")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--atraso", type=float, default=0.2, help="Segundos em PENDING por statement.")
+    parser.add_argument("--multiplicar", type=int, default=1, help="Replica a massa de dados N vezes.")
+    args = parser.parse_args()
+
+    fake = FakeDatabricks(atraso=args.atraso, multiplicar=args.multiplicar)
+    print(f"Endpoint: {fake.iniciar(args.porta)}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        fake.parar()
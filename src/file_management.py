@@ -9,25 +9,45 @@ import shutil
 
 class FileManager:
     @staticmethod
-    def zip_folder(folder_path, zip_path, delete_original=False):
+    def zip_folder(folder_path, zip_path, delete_original=False, extra_files=None):
         """
         Compacta o conteúdo de uma pasta em um arquivo zip.
+        O zip é gravado em um arquivo temporário e renomeado ao final, para que um zip
+        incompleto nunca fique no caminho final. Arquivos temporários (*.tmp) de gravações
+        em andamento ou interrompidas não são incluídos.
 
         :param folder_path: Caminho da pasta a ser compactada.
         :param zip_path: Caminho do arquivo zip de saída.
-        :param delete_original: Se True, deleta a pasta original após compactar.
+        :param delete_original: Se True, deleta a pasta original (e os arquivos extras) após compactar.
+        :param extra_files: Arquivos incluídos na raiz do zip, como o PDF consolidado da administradora;
+            com eles, a pasta pode não existir.
         """
-        if os.path.exists(folder_path):
+        extra_files = extra_files or []
+        if os.path.exists(folder_path) or extra_files:
             os.makedirs(os.path.dirname(zip_path), exist_ok=True)
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for root, dirs, files in os.walk(folder_path):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(file_path, start=folder_path)
-                        zipf.write(file_path, arcname)
+            temporario = os.path.join(os.path.dirname(zip_path), f".{os.path.basename(zip_path)}.{os.getpid()}.tmp")
+            try:
+                with zipfile.ZipFile(temporario, 'w', zipfile.ZIP_DEFLATED) as zipf:
+                    for root, dirs, files in os.walk(folder_path):
+                        for file in files:
+                            if file.endswith('.tmp'):
+                                continue
+                            file_path = os.path.join(root, file)
+                            arcname = os.path.relpath(file_path, start=folder_path)
+                            zipf.write(file_path, arcname)
+                    for file_path in extra_files:
+                        zipf.write(file_path, os.path.basename(file_path))
+                os.replace(temporario, zip_path)
+            except BaseException:
+                if os.path.exists(temporario):
+                    os.remove(temporario)
+                raise
             if delete_original:
                 try:
-                    shutil.rmtree(folder_path)
+                    if os.path.exists(folder_path):
+                        shutil.rmtree(folder_path)
+                    for file_path in extra_files:
+                        os.remove(file_path)
                 except Exception as e:
                     raise Exception(f"Erro ao deletar a pasta original: {e}")
         else:
@@ -37,12 +57,40 @@ class FileManager:
     def zip_all_folders(folders_path, delete_original=False):
         folders_list = FileManager.list_folders(folders_path)
         for folder in folders_list:
-            adms = FileManager.list_folders(f"{folders_path}\\{folder}\\Extratos de Cota Capital")
-            for adm in adms:
-                FileManager.zip_folder(
-                    folder_path= f"{folders_path}\\{folder}\\Extratos de Cota Capital\\{adm}",
-                    zip_path= f"{folders_path}\\{folder}\\Extratos de Cota Capital\\{adm}.zip",
-                    delete_original= delete_original)
+            FileManager.zip_agency_folder(folders_path, folder, delete_original=delete_original)
+
+    @staticmethod
+    def zip_agency_folder(folders_path, agency_folder, delete_original=False):
+        """
+        Compacta as pastas de administradoras de uma única agência (ex: 'UA01'). O PDF
+        consolidado de cada administradora ('<administradora>.pdf') é incluído no seu zip.
+
+        :param folders_path: Caminho base das pastas de agências (PATH_BASES).
+        :param agency_folder: Nome da pasta da agência.
+        :param delete_original: Se True, deleta as pastas originais após compactar.
+        """
+        extratos_path = os.path.join(folders_path, agency_folder, "Extratos de Cota Capital")
+        adms = FileManager.list_folders(extratos_path)
+        consolidados = FileManager.list_consolidated(extratos_path)
+        for adm in sorted(set(adms) | set(consolidados)):
+            FileManager.zip_folder(
+                folder_path= os.path.join(extratos_path, adm),
+                zip_path= os.path.join(extratos_path, f"{adm}.zip"),
+                delete_original= delete_original,
+                extra_files= [consolidados[adm]] if adm in consolidados else None)
+
+    @staticmethod
+    def list_consolidated(folder):
+        """
+        Retorna {administradora: caminho} dos PDFs consolidados ('<administradora>.pdf') da pasta.
+        """
+        try:
+            return {
+                name[:-len('.pdf')]: os.path.join(folder, name) for name in os.listdir(folder)
+                if name.endswith('.pdf') and os.path.isfile(os.path.join(folder, name))
+            }
+        except OSError:
+            return {}
 
     @staticmethod
     def list_folders(folder):
@@ -6,6 +6,24 @@
 # Variáveis:
 #     TOKEN (str): Token de autenticação para acesso a recursos protegidos.
 #     PATH_DATABRICKS (str): Consulta SQL para extração de dados do Databricks.
+#     DATABRICKS_ENDPOINT (str): URL da API de statements do SQL Warehouse (.../api/2.0/sql/statements).
+#     DATABRICKS_WAREHOUSE_ID (str): ID do SQL Warehouse utilizado nas consultas.
+#     DATABRICKS_ESPERA_SEGUNDOS (int): Base do tempo de espera entre consultas de status de um statement pendente.
+#     PARALELISMO_CONSULTA (int): Quantidade máxima de partições (por agência) consultadas simultaneamente; 1 desativa.
+#     CARREGAR_FONTES_EM_PARALELO (bool): Atualiza o índice (Excel) e consulta o Databricks ao mesmo tempo.
+#         Nesse modo a consulta não filtra pelas contas do índice nem é dividida por agência
+#         (FILTRAR_CONTAS_NA_CONSULTA e PARALELISMO_CONSULTA são ignorados) e, sem MES_EMISSAO, busca a
+#         tabela de contas inteira; por isso vem desativado e só compensa com MES_EMISSAO definido.
+#     PRAZO_CARGA_SEGUNDOS (int): Prazo total da carga em paralelo do índice e das contas.
+#     EXTRACAO_DELTA (bool): Busca apenas as contas alteradas desde a última extração, aplicando-as sobre o cache local.
+#     COLUNA_ATUALIZACAO (str): Coluna de data/hora de atualização da tabela de contas, usada como marca d'água.
+#     DELTA_MARGEM_MINUTOS (int): Margem subtraída da marca d'água para capturar correções gravadas com atraso.
+#     PATH_CACHE_CONTAS (str): Caminho do cache local da base de contas do Databricks.
+#     PATH_CACHE_WATERMARK (str): Caminho do arquivo com a marca d'água da última extração.
+#     TABELA_DATABRICKS (str): Tabela de contas consultada no Databricks (com projeção e filtros).
+#     MES_EMISSAO (str): Mês de emissão ('AAAA-MM') filtrado na consulta; None busca todas as emissões.
+#     FILTRAR_CONTAS_NA_CONSULTA (bool): Se True, envia as contas do índice como filtro da consulta.
+#     TAMANHO_LOTE_CONSULTA (int): Quantidade máxima de contas por lista IN em cada consulta.
 #     PATH_INDEX_ACCOUNTS (str): Caminho absoluto para o arquivo de contas, personalizado para o usuário atual.
 #     PATH_BASES (str): Caminho absoluto para a pasta de bases, personalizado para o usuário atual.
 #     OUVIDORIA_SICREDI (str): Telefone da ouvidoria Sicredi.
@@ -15,13 +33,107 @@
 #     SMTP_PASSWORD (str): Senha para autenticação no servidor SMTP.
 #     EMAIL_FROM (str): Endereço de e-mail do remetente padrão.
 #     EMAIL_USER_DUVIDA (str): Nome(s) do(s) usuário(s) para contato em caso de dúvidas.
+#     PATH_CACHE_BASE (str): Caminho do cache local da base consolidada, compartilhado entre as etapas da CLI.
+#     PATH_CACHE_DESTINATARIOS (str): Caminho do cache local do diretório de destinatários dos e-mails
+#         (endereços por agência e administradora), recalculado apenas quando a base muda.
+#     LIMITE_DESTINATARIOS_EMAIL (int): Máximo de destinatários por mensagem no envio por agência ('mail --por-agencia').
+#     PATH_SHARDS (str): Pasta compartilhada com os shards (por agência e administradora) e a fila SQLite dos workers.
+#     SHARD_LEASE_SEGUNDOS (int): Tempo de reserva de um shard por um worker antes de ser liberado para outro.
+#     SHARD_MAX_TENTATIVAS (int): Número máximo de tentativas de processamento de um shard.
+#     SHARD_WORKERS_PREVISTOS (int): Workers considerados na distribuição LPT dos shards quando a quantidade
+#         não é informada ('python app.py shard' sem --workers).
+#     CUSTO_CONTA_SEGUNDOS (float): Custo padrão de geração por conta, usado enquanto não há histórico.
+#     CUSTO_MOVIMENTO_SEGUNDOS (float): Custo padrão de geração por movimentação, usado enquanto não há histórico.
+#     PATH_HISTORICO_CUSTO (str): Histórico (JSON) dos tempos medidos dos shards, usado para ajustar os custos.
+#     HISTORICO_CUSTO_MAXIMO (int): Quantidade de observações mantidas no histórico de custos.
+#     MODO_SAIDA (str): 'individual' (um PDF por conta) ou 'consolidado' (um PDF por administradora).
+#     BLOQUEAR_RENDER_COM_ERROS (bool): Interrompe a geração se a pré-validação da base encontrar erros.
+#     PATH_RELATORIO_VALIDACAO (str): Caminho do relatório (JSON) da pré-validação da base; vazio não grava.
+#     PATH_CACHE_CONCILIACAO (str): Caminho (JSON) das contas descartadas pelo merge entre índice e Databricks,
+#         gravado ao lado da base consolidada e lido pela pré-validação.
+#     EXECUCAO_TESTE (bool): No bot, gera apenas a amostra estratificada e a projeção da execução completa,
+#         sem compactação nem envio de e-mails (equivale a 'python app.py teste').
+#     AMOSTRA_POR_ESTRATO (int): Contas sorteadas por agência, administradora e faixa de movimentações na execução de teste.
+#     PATH_TESTE (str): Pasta dos extratos da amostra gravados pela execução de teste.
+#     PATH_RELATORIO_TESTE (str): Caminho do relatório (JSON) da execução de teste; vazio não grava.
+#     PERFIL_PDF (str): Perfil de saída dos PDFs ('padrao', 'rapido', 'equilibrado' ou 'menor'; ver PERFIS_PDF em pdf_config.py).
+#     ARQUIVO_FALHAS (str): Nome do arquivo (em PATH_BASES) com as contas cujo extrato falhou.
+#     ARQUIVO_RESUMO (str): Nome (sem extensão) dos arquivos CSV e JSON com o resumo da execução
+#         por agência e administradora, gravados em PATH_BASES ao lado dos arquivos compactados.
+#     WORKERS_PERIODO (int): Quantidade de processos na geração de um intervalo de meses ('render --periodo').
+#     ARMAZENAR_EXTRATOS (bool): Registra os extratos individuais gerados no repositório indexado (PATH_REPOSITORIO).
+#         Os PDFs passam a ser gerados sem data de criação, para que extratos idênticos não sejam duplicados.
+#     PATH_REPOSITORIO (str): Pasta do repositório de extratos (índice SQLite e PDFs endereçados por hash).
+#     ARMAZENAMENTO (str): Destino dos PDFs: 'local' (PATH_BASES), 's3' (bucket S3/MinIO, requer boto3)
+#         ou 's3_local' (bucket simulado em PATH_S3_LOCAL, para testes).
+#     LOTE_FSYNC (int): Arquivos gravados por lote antes da sincronização em disco (ou do envio ao bucket).
+#     S3_BUCKET (str): Bucket de saída nos destinos S3.
+#     S3_PREFIXO (str): Prefixo das chaves no bucket (equivalente a PATH_BASES).
+#     S3_ENDPOINT (str): Endpoint S3 alternativo (ex: MinIO); vazio usa o padrão da AWS.
+#     PATH_S3_LOCAL (str): Pasta do bucket simulado do destino 's3_local'.
+#     RENDER_PORTA (int): Porta local do serviço de geração sob demanda ('python app.py serve').
+#     RENDER_INTERVALO_RECARGA (int): Segundos entre as verificações de atualização da base em cache pelo serviço.
 
 
 TOKEN = ''
 PATH_DATABRICKS = 'SELECT * FROM table_name'
+TABELA_DATABRICKS = 'table_name'
+DATABRICKS_ENDPOINT = ''
+DATABRICKS_WAREHOUSE_ID = ''
+DATABRICKS_ESPERA_SEGUNDOS = 10
+PARALELISMO_CONSULTA = 1
+CARREGAR_FONTES_EM_PARALELO = False
+PRAZO_CARGA_SEGUNDOS = 1800
+EXTRACAO_DELTA = False
+COLUNA_ATUALIZACAO = 'data_atualizacao'
+DELTA_MARGEM_MINUTOS = 60
+MES_EMISSAO = None
+FILTRAR_CONTAS_NA_CONSULTA = True
+TAMANHO_LOTE_CONSULTA = 1000
 
 PATH_INDEX_ACCOUNTS = ''
 PATH_BASES = ''
+ARQUIVO_FALHAS = 'extratos_falhos.csv'
+ARQUIVO_RESUMO = 'resumo_execucao'
+MODO_SAIDA = 'individual'
+PERFIL_PDF = 'padrao'
+EXECUCAO_TESTE = False
+AMOSTRA_POR_ESTRATO = 2
+PATH_TESTE = 'cache/execucao_teste'
+PATH_RELATORIO_TESTE = 'cache/execucao_teste.json'
+BLOQUEAR_RENDER_COM_ERROS = True
+PATH_RELATORIO_VALIDACAO = 'cache/validacao_base.json'
+
+PATH_CACHE_BASE = 'cache/base_cota_capital.pkl'
+PATH_CACHE_CONCILIACAO = 'cache/conciliacao_base.json'
+PATH_CACHE_DESTINATARIOS = 'cache/destinatarios.json'
+LIMITE_DESTINATARIOS_EMAIL = 50
+PATH_CACHE_CONTAS = 'cache/contas_databricks.pkl'
+PATH_CACHE_WATERMARK = 'cache/watermark_contas.json'
+
+PATH_SHARDS = 'cache/shards'
+SHARD_LEASE_SEGUNDOS = 600
+SHARD_MAX_TENTATIVAS = 3
+SHARD_WORKERS_PREVISTOS = 4
+CUSTO_CONTA_SEGUNDOS = 0.0025
+CUSTO_MOVIMENTO_SEGUNDOS = 0.00003
+PATH_HISTORICO_CUSTO = 'cache/historico_custo.json'
+HISTORICO_CUSTO_MAXIMO = 500
+
+WORKERS_PERIODO = 4
+
+ARMAZENAR_EXTRATOS = False
+PATH_REPOSITORIO = 'cache/repositorio'
+
+ARMAZENAMENTO = 'local'
+LOTE_FSYNC = 100
+S3_BUCKET = ''
+S3_PREFIXO = 'extratos'
+S3_ENDPOINT = ''
+PATH_S3_LOCAL = 'cache/s3_local'
+
+RENDER_PORTA = 8766
+RENDER_INTERVALO_RECARGA = 60
 
 OUVIDORIA_SICREDI = '0800 000 0000'
 
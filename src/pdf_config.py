@@ -30,4 +30,21 @@ PDF_CONFIG = {
     "block_spacing": 50,
     "text_space_s" : "                                      ",
     "text_space_b" : "                                                                              "
-}
\ No newline at end of file
+}
+
+
+# Perfis de saída dos PDFs, selecionados pela variável global PERFIL_PDF (ou por parâmetro em
+# CotaCapital.gerar_pdf). A imagem de fundo corresponde à maior parte do tamanho de cada extrato,
+# por isso os perfis atuam principalmente sobre ela:
+#   compressao  (int): compressão Flate do conteúdo das páginas (0 ou 1).
+#   fundo_dpi   (int): resolução máxima do fundo na página; None mantém a resolução original.
+#   fundo_jpeg  (int): qualidade JPEG do fundo (1-95); None mantém a compressão sem perdas.
+# Quando o fundo é reprocessado (fundo_dpi ou fundo_jpeg), ele é composto sobre branco e o canal
+# alfa é descartado. O texto dos extratos é o mesmo em todos os perfis (ver PerfisPdf.medir).
+
+PERFIS_PDF = {
+    "padrao": {"compressao": 1, "fundo_dpi": None, "fundo_jpeg": None},
+    "rapido": {"compressao": 0, "fundo_dpi": None, "fundo_jpeg": None},
+    "equilibrado": {"compressao": 1, "fundo_dpi": 100, "fundo_jpeg": 85},
+    "menor": {"compressao": 1, "fundo_dpi": 72, "fundo_jpeg": 60},
+}
@@ -0,0 +1,140 @@
+import io
+import os
+import json
+import time
+
+import pandas as pd
+
+from src.log import Logs
+from src.pdf_config import PDF_CONFIG, PERFIS_PDF
+from src.report_generator import CotaCapital
+
+# Este módulo mede os perfis de saída dos PDFs (PERFIS_PDF em pdf_config.py) sobre uma amostra
+# da base: tamanho e tempo de geração por extrato em cada perfil e a redução em relação ao perfil
+# 'padrao'. Também valida que o texto extraído de cada extrato é idêntico ao do perfil 'padrao',
+# já que os perfis só devem alterar a compressão e a imagem de fundo. A validação requer o pacote
+# opcional 'pypdf'; sem ele, o relatório é gerado com 'texto_identico' igual a None.
+#
+# Uso:
+#     python app.py perfis --amostra 50 --saida relatorio_perfis.json
+
+logger = Logs.load_log(__name__)
+
+PERFIL_REFERENCIA = "padrao"
+
+
+class PerfisPdf:
+    """
+    Comparação dos perfis de saída dos PDFs.
+
+    Métodos
+    -------
+    medir(accounts: pd.DataFrame, perfis, amostra, saida) -> dict
+        Gera a amostra em memória em cada perfil e retorna o relatório de tamanho, tempo e validação do texto.
+    extrair_texto(conteudo: bytes) -> str
+        Retorna o texto de um PDF (requer pypdf).
+    """
+
+    @staticmethod
+    def medir(accounts: pd.DataFrame, perfis: list = None, amostra: int = 20, saida: str = None) -> dict:
+        """
+        Gera em memória os extratos de uma amostra da base em cada perfil e compara os resultados.
+
+        Parâmetros:
+        -----------
+        accounts : pd.DataFrame
+            Base consolidada.
+        perfis : list, opcional
+            Perfis comparados. Padrão: todos os de PERFIS_PDF.
+        amostra : int, opcional
+            Quantidade de contas geradas em cada perfil (as primeiras da base). Padrão: 20.
+        saida : str, opcional
+            Caminho do relatório em JSON.
+
+        Retorna:
+        --------
+        dict
+            Por perfil: 'extratos', 'bytes_total', 'bytes_medio', 'ms_medio', 'reducao_pct'
+            (em relação a 'padrao'), 'texto_identico' (None sem pypdf) e 'contas_divergentes'.
+        """
+        perfis = list(perfis or PERFIS_PDF)
+        for perfil in perfis:
+            CotaCapital.perfil_pdf(perfil)
+        linhas = accounts.head(amostra)
+
+        textos_referencia = None
+        resultados = {}
+        for perfil in [PERFIL_REFERENCIA] + [p for p in perfis if p != PERFIL_REFERENCIA]:
+            pdfs, tempos = PerfisPdf._gerar_amostra(linhas, perfil)
+            textos = PerfisPdf._textos(pdfs)
+            if perfil == PERFIL_REFERENCIA:
+                textos_referencia = textos
+
+            divergentes = None
+            if textos is not None and textos_referencia is not None:
+                divergentes = [conta for conta, texto in textos.items() if texto != textos_referencia.get(conta)]
+
+            total = sum(len(pdf) for pdf in pdfs.values())
+            resultados[perfil] = {
+                "extratos": len(pdfs),
+                "bytes_total": total,
+                "bytes_medio": round(total / len(pdfs)) if pdfs else 0,
+                "ms_medio": round(1000 * sum(tempos) / len(tempos), 2) if tempos else 0,
+                "texto_identico": None if divergentes is None else not divergentes,
+                "contas_divergentes": divergentes or [],
+            }
+
+        referencia = resultados[PERFIL_REFERENCIA]["bytes_total"]
+        for resultado in resultados.values():
+            resultado["reducao_pct"] = round(100 * (1 - resultado["bytes_total"] / referencia), 1) if referencia else 0.0
+        resultados = {perfil: resultados[perfil] for perfil in perfis}
+
+        for perfil, r in resultados.items():
+            logger.info(f"Perfil {perfil}: {r['bytes_medio']} bytes/extrato ({r['reducao_pct']}% menor), "
+                        f"{r['ms_medio']} ms/extrato, texto idêntico: {r['texto_identico']}.")
+
+        if saida:
+            os.makedirs(os.path.dirname(saida) or '.', exist_ok=True)
+            with open(saida, 'w', encoding='utf-8') as f:
+                json.dump(resultados, f, ensure_ascii=False, indent=2)
+            logger.info(f"Relatório de perfis gravado em {saida}.")
+        return resultados
+
+    @staticmethod
+    def _gerar_amostra(linhas: pd.DataFrame, perfil: str) -> tuple:
+        # O fundo do perfil é codificado antes da medição, como ocorre uma única vez por processo no lote
+        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        CotaCapital.preparar_fundo(os.path.join(base_dir, "data", "img", "background.png"), perfil)
+
+        pdfs, tempos = {}, []
+        for _, row in linhas.iterrows():
+            buffer = io.BytesIO()
+            inicio = time.perf_counter()
+            try:
+                CotaCapital.gerar_pdf(buffer, row, PDF_CONFIG, '', perfil)
+            except Exception as e:
+                logger.warning(f"Conta {row.get('conta', 'N/A')} ignorada na medição: {type(e).__name__}: {e}")
+                continue
+            tempos.append(time.perf_counter() - inicio)
+            pdfs[str(row['conta'])] = buffer.getvalue()
+        return pdfs, tempos
+
+    @staticmethod
+    def _textos(pdfs: dict):
+        try:
+            return {conta: PerfisPdf.extrair_texto(pdf) for conta, pdf in pdfs.items()}
+        except ImportError as e:
+            logger.warning(f"{e} O texto dos perfis não será validado.")
+            return None
+
+    @staticmethod
+    def extrair_texto(conteudo: bytes) -> str:
+        """
+        Retorna o texto de todas as páginas de um PDF. Requer o pacote opcional 'pypdf'.
+        """
+        try:
+            from pypdf import PdfReader
+        except ImportError as e:
+            raise ImportError("A validação do texto requer o pacote 'pypdf' (pip install pypdf).") from e
+
+        return "\n".join(pagina.extract_text() for pagina in PdfReader(io.BytesIO(conteudo)).pages)
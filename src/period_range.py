@@ -0,0 +1,278 @@
+import os
+import glob
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from src.log import Logs
+import src.global_vars as gvars
+
+# Este módulo permite gerar os extratos de vários meses de emissão em uma única execução
+# (recuperação de meses atrasados ou extratos anuais). A base de um intervalo de meses é buscada
+# uma única vez (ConsultaContas com mes_emissao 'AAAA-MM:AAAA-MM'); as movimentações são
+# agrupadas por mês de forma vetorizada e é montada uma linha por (conta, mês de emissão). Nos
+# meses em que a conta não tem registro na base, o saldo do mês anterior é levado adiante,
+# somado às movimentações daquele mês encontradas nos demais registros. Os extratos de todos
+# os meses são gerados em paralelo, em uma pasta por mês: PATH_BASES/AAAA-MM/UAXX/..., no modo de
+# saída configurado em MODO_SAIDA (um PDF por conta ou um consolidado por administradora).
+
+logger = Logs.load_log(__name__)
+
+COLUNAS_MOVIMENTO = ['tipo_movimento', 'valor_transacao', 'data_transacao']
+
+
+class ExtratosPeriodo:
+    """
+    Geração de extratos para um intervalo de meses de emissão.
+
+    Métodos
+    -------
+    meses(periodo: str) -> pd.PeriodIndex
+        Converte o intervalo 'AAAA-MM:AAAA-MM' nos meses de emissão correspondentes.
+    montar_base_mensal(contas: pd.DataFrame, periodo: str) -> pd.DataFrame
+        Monta uma linha por (conta, mês de emissão), com o saldo levado adiante entre os meses.
+    gerar(contas: pd.DataFrame, periodo: str, path_bases: str, workers: int, modo: str) -> dict
+        Gera todos os extratos do intervalo em paralelo, em uma pasta por mês.
+    """
+
+    @staticmethod
+    def meses(periodo: str) -> pd.PeriodIndex:
+        """
+        Converte o intervalo de meses de emissão ('AAAA-MM:AAAA-MM' ou apenas 'AAAA-MM') em um PeriodIndex.
+        """
+        inicio, _, fim = periodo.partition(':')
+        meses = pd.period_range(inicio, fim or inicio, freq='M')
+        if meses.empty:
+            raise ValueError(f"Intervalo de meses inválido: {periodo}")
+        return meses
+
+    @staticmethod
+    def _datas_emissao(contas: pd.DataFrame) -> pd.Series:
+        if pd.api.types.is_datetime64_any_dtype(contas['data_emissao']):
+            return contas['data_emissao']
+        return pd.to_datetime(contas['data_emissao'].astype(str), format='%d/%m/%Y', errors='coerce')
+
+    @staticmethod
+    def _movimentos(linhas: pd.DataFrame) -> pd.DataFrame:
+        # Uma linha por movimentação, com o mês de emissão do extrato que a apresenta
+        # (o mês seguinte ao da transação)
+        listas = linhas['tipo_valor_data_movimentacao'].map(ExtratosPeriodo._interpretar_movimentos)
+        explodidas = listas.explode().dropna()
+        if explodidas.empty:
+            return pd.DataFrame({
+                'conta': pd.Series(dtype=object), '_mes': pd.Series(dtype='period[M]'),
+                'valor': pd.Series(dtype=float), 'movimento': pd.Series(dtype=object),
+            })
+
+        movimentos = pd.DataFrame(explodidas.tolist(), index=explodidas.index).reindex(columns=COLUNAS_MOVIMENTO)
+        datas = pd.to_datetime(movimentos['data_transacao'], format='%d/%m/%Y', errors='coerce')
+        movimentos = pd.DataFrame({
+            'conta': linhas.loc[explodidas.index, 'conta'].to_numpy(),
+            '_mes': datas.dt.to_period('M') + 1,
+            '_data': datas,
+            'valor': pd.to_numeric(movimentos['valor_transacao'], errors='coerce').fillna(0.0),
+            'movimento': explodidas.to_numpy(),
+        })
+        invalidas = movimentos['_mes'].isna()
+        if invalidas.any():
+            logger.warning(f"{int(invalidas.sum())} movimentações com data inválida desconsideradas no agrupamento por mês.")
+        return movimentos[~invalidas].sort_values(['conta', '_data'], kind='stable')
+
+    @staticmethod
+    def _interpretar_movimentos(valor) -> list:
+        if isinstance(valor, list):
+            return valor
+        if isinstance(valor, str) and valor.strip() not in ('', 'null', 'None'):
+            try:
+                movimentos = json.loads(valor)
+            except ValueError:
+                return []
+            return movimentos if isinstance(movimentos, list) else []
+        return []
+
+    @staticmethod
+    def montar_base_mensal(contas: pd.DataFrame, periodo: str) -> pd.DataFrame:
+        """
+        Monta a base do intervalo com uma linha por (conta, mês de emissão), a partir do primeiro
+        mês em que a conta aparece até o fim do intervalo.
+
+        Os meses em que a conta possui registro na base mantêm o registro original. Nos demais, a
+        linha é montada com os dados cadastrais do registro anterior, as movimentações do mês
+        encontradas nos outros registros da conta e o saldo anterior levado adiante:
+        capital_social = saldo do último registro + movimentações acumuladas desde então. A data de
+        emissão dessas linhas repete o dia de emissão do último registro da conta no mês em questão
+        (limitado ao último dia do mês), para que o campo EMISSÃO siga o calendário real de emissão.
+
+        Parâmetros:
+        -----------
+        contas : pd.DataFrame
+            Base consolidada com os registros de todos os meses do intervalo.
+        periodo : str
+            Intervalo de meses de emissão 'AAAA-MM:AAAA-MM'.
+
+        Retorna:
+        --------
+        pd.DataFrame
+            Base mensal, com a coluna adicional 'mes_emissao' ('AAAA-MM'). Registros com data de
+            emissão inválida são mantidos com 'mes_emissao' nulo, para que falhem na geração.
+        """
+        meses = ExtratosPeriodo.meses(periodo)
+        contas = contas.reset_index(drop=True)
+        mes = ExtratosPeriodo._datas_emissao(contas).dt.to_period('M')
+
+        invalidas = contas[mes.isna()].assign(mes_emissao=None)
+        if not invalidas.empty:
+            logger.warning(f"{len(invalidas)} registros com data de emissão inválida.")
+
+        registros = contas[mes.notna() & mes.between(meses[0], meses[-1])].assign(_mes=mes)
+        duplicados = registros.duplicated(['conta', '_mes'], keep='last')
+        if duplicados.any():
+            logger.warning(f"{int(duplicados.sum())} registros duplicados por conta e mês; mantido o último de cada.")
+            registros = registros[~duplicados]
+
+        # Grade (conta, mês) a partir do primeiro mês de cada conta
+        primeiro_mes = registros.groupby('conta', observed=True)['_mes'].min().rename('_inicio').reset_index()
+        grade = primeiro_mes.merge(pd.DataFrame({'_mes': meses}), how='cross')
+        grade = grade.loc[grade['_mes'] >= grade['_inicio'], ['conta', '_mes']].reset_index(drop=True)
+        if grade.empty:
+            return invalidas
+
+        # Movimentações agrupadas por conta e mês
+        movimentos = ExtratosPeriodo._movimentos(registros)
+        por_mes = movimentos.groupby(['conta', '_mes'], sort=False).agg(
+            _movimentacao=('valor', 'sum'), _movimentos=('movimento', list)
+        ).reset_index()
+
+        base = grade.merge(registros.assign(_registro=True), on=['conta', '_mes'], how='left')
+        base = base.merge(por_mes, on=['conta', '_mes'], how='left')
+        base['_registro'] = base['_registro'].eq(True)
+
+        # Saldo levado adiante: o último saldo registrado (capital_social - movimentação acumulada)
+        # é propagado e somado à movimentação acumulada de cada mês
+        capital = pd.to_numeric(base['capital_social'], errors='coerce')
+        movimentacao = pd.to_numeric(base['movimentacao'], errors='coerce').where(
+            base['_registro'], base['_movimentacao'].fillna(0.0)
+        ).fillna(0.0)
+        acumulado = movimentacao.groupby(base['conta'], sort=False).cumsum()
+        ancora = (capital - acumulado).where(base['_registro']).groupby(base['conta'], sort=False).ffill()
+        saldo = (ancora + acumulado).round(2)
+
+        # Dados cadastrais do registro anterior nos meses sem registro
+        cadastrais = [c for c in contas.columns if c not in (
+            'conta', 'data_emissao', 'capital_social', 'movimentacao', 'tipo_valor_data_movimentacao'
+        )]
+        if cadastrais:
+            base[cadastrais] = base.groupby('conta', sort=False)[cadastrais].ffill()
+
+        sinteticas = ~base['_registro']
+        for col in ('capital_social', 'movimentacao'):
+            if not pd.api.types.is_float_dtype(base[col]):
+                base[col] = base[col].astype(object)
+        base['tipo_valor_data_movimentacao'] = base['tipo_valor_data_movimentacao'].astype(object)
+        base.loc[sinteticas, 'capital_social'] = saldo[sinteticas]
+        base.loc[sinteticas, 'movimentacao'] = movimentacao[sinteticas].round(2)
+        base.loc[sinteticas, 'tipo_valor_data_movimentacao'] = base.loc[sinteticas, '_movimentos'].map(
+            lambda movs: json.dumps(movs, ensure_ascii=False) if isinstance(movs, list) else None
+        )
+
+        # Data de emissão dos meses sem registro: o dia de emissão do último registro da conta,
+        # limitado ao último dia do mês (ex.: emissão no dia 31 vira 30/04)
+        dia = ExtratosPeriodo._datas_emissao(base).dt.day.where(base['_registro'])
+        dia = dia.groupby(base['conta'], sort=False).ffill()
+        dia = dia.clip(upper=base['_mes'].dt.days_in_month).fillna(1).astype('int64')
+        emissao = base['_mes'].dt.start_time + pd.to_timedelta(dia - 1, unit='D')
+        if pd.api.types.is_datetime64_any_dtype(contas['data_emissao']):
+            base.loc[sinteticas, 'data_emissao'] = emissao[sinteticas]
+        else:
+            base['data_emissao'] = base['data_emissao'].astype(object)
+            base.loc[sinteticas, 'data_emissao'] = emissao[sinteticas].dt.strftime('%d/%m/%Y')
+
+        base['mes_emissao'] = base['_mes'].astype(str)
+        logger.info(
+            f"Base do período {meses[0]} a {meses[-1]}: {len(base)} extratos "
+            f"({int(sinteticas.sum())} meses sem registro, com saldo levado adiante)."
+        )
+        base = base.drop(columns=['_mes', '_registro', '_movimentacao', '_movimentos'])
+        return pd.concat([base, invalidas], ignore_index=True) if not invalidas.empty else base
+
+    @staticmethod
+    def gerar(contas: pd.DataFrame, periodo: str, path_bases: str = None, workers: int = None, modo: str = None) -> dict:
+        """
+        Gera os extratos de todos os meses do intervalo em uma única passada paralela, com uma
+        tarefa por (mês, agência) executada em processos separados. Cada mês é gravado em
+        PATH_BASES/AAAA-MM, com seu próprio arquivo de falhas (compatível com reprocessar_falhas)
+        e seu próprio resumo (ResumoExecucao), somado a partir dos resumos parciais de cada tarefa.
+
+        Parâmetros:
+        -----------
+        contas : pd.DataFrame
+            Base consolidada com os registros de todos os meses do intervalo.
+        periodo : str
+            Intervalo de meses de emissão 'AAAA-MM:AAAA-MM'.
+        path_bases : str, opcional
+            Diretório base de saída. Por padrão, utiliza a variável global PATH_BASES.
+        workers : int, opcional
+            Quantidade de processos. Por padrão, utiliza a variável global WORKERS_PERIODO.
+        modo : str, opcional
+            'individual' (um PDF por conta) ou 'consolidado' (um PDF por administradora). Por
+            padrão, utiliza a variável global MODO_SAIDA.
+
+        Retorna:
+        --------
+        dict
+            Totais da execução ('gerados', 'falhas', 'arquivo_falhas') e 'meses', com os totais por mês.
+        """
+        from src.report_generator import CotaCapital
+        from src.run_summary import ResumoExecucao
+
+        path_bases = path_bases or gvars.PATH_BASES
+        workers = workers or gvars.WORKERS_PERIODO
+        modo = modo or gvars.MODO_SAIDA
+        gerar_grupo = CotaCapital.gerar_extratos_consolidados if modo == "consolidado" else CotaCapital.gerar_extratos_mensal
+        base = ExtratosPeriodo.montar_base_mensal(contas, periodo)
+
+        invalidas = base[base['mes_emissao'].isna()]
+        base = base[base['mes_emissao'].notna()]
+
+        grupos = base.groupby(['mes_emissao', 'agência'], sort=False, dropna=False, observed=True)
+        totais_mes = {}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futuros = {}
+            for i, ((mes, _), grupo) in enumerate(grupos):
+                pasta_mes = os.path.join(path_bases, mes)
+                futuro = executor.submit(
+                    gerar_grupo, grupo, pasta_mes, arquivo_falhas=os.path.join(pasta_mes, f"_falhas_{i}.csv")
+                )
+                futuros[futuro] = mes
+            for futuro in as_completed(futuros):
+                mes = futuros[futuro]
+                totais = futuro.result()
+                acumulado = totais_mes.setdefault(mes, {"gerados": 0, "falhas": 0, "resumos": []})
+                acumulado["gerados"] += totais["gerados"]
+                acumulado["resumos"].append(totais["resumo"])
+
+        # Consolida as falhas parciais de cada mês no arquivo de falhas da pasta do mês
+        for mes, acumulado in totais_mes.items():
+            pasta_mes = os.path.join(path_bases, mes)
+            parciais = sorted(glob.glob(os.path.join(pasta_mes, "_falhas_*.csv")))
+            falhas = [pd.read_csv(f, dtype=str, encoding='utf-8-sig') for f in parciais]
+            falhas = pd.concat(falhas, ignore_index=True).to_dict('records') if falhas else []
+            acumulado["falhas"] = len(falhas)
+            acumulado["arquivo_falhas"] = CotaCapital.salvar_falhas(falhas, pasta_mes)
+            for f in parciais:
+                os.remove(f)
+            ResumoExecucao.salvar(ResumoExecucao.mesclar(acumulado.pop("resumos")), pasta_mes)
+            logger.info(f"Mês {mes}: {acumulado['gerados']} extratos gerados, {acumulado['falhas']} falhas.")
+
+        falhas_sem_mes = invalidas.assign(erro="data_emissao inválida").to_dict('records')
+        arquivo_falhas = CotaCapital.salvar_falhas(falhas_sem_mes, path_bases) if falhas_sem_mes else None
+
+        totais = {
+            "gerados": sum(t["gerados"] for t in totais_mes.values()),
+            "falhas": sum(t["falhas"] for t in totais_mes.values()) + len(falhas_sem_mes),
+            "arquivo_falhas": arquivo_falhas,
+            "meses": dict(sorted(totais_mes.items())),
+        }
+        logger.info(f"Período {periodo}: {totais['gerados']} extratos gerados, {totais['falhas']} falhas.")
+        return totais
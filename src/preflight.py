@@ -0,0 +1,310 @@
+import os
+import json
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.log import Logs
+import src.global_vars as gvars
+
+# Este módulo faz a pré-validação (conciliação) da base consolidada antes da geração dos PDFs.
+# Todas as verificações são feitas de uma vez sobre a base inteira, com operações vetorizadas do
+# pandas/NumPy sobre as movimentações já expandidas (uma linha por movimentação), em vez de
+# percorrer as contas uma a uma. O resultado é um relatório em JSON, separado em:
+#   - erros: problemas que impedem ou tornam incorreto o extrato (conta duplicada no mesmo arquivo
+#     de saída, saldo ausente, agência ou data de emissão inválida, movimentações ilegíveis e soma
+#     das movimentações diferente de 'movimentacao'). Com BLOQUEAR_RENDER_COM_ERROS, a geração é
+#     interrompida.
+#   - avisos: situações que merecem conferência, mas não impedem a geração (valores negativos,
+#     datas fora do período do extrato, contas do índice sem dados no Databricks).
+#
+# Uso:
+#     python app.py validar --saida relatorio_validacao.json
+
+logger = Logs.load_log(__name__)
+
+# Diferença máxima aceita entre a soma das movimentações e a coluna 'movimentacao'
+TOLERANCIA_SOMA = 0.005
+
+# Quantidade máxima de contas listadas por verificação no relatório
+LIMITE_CONTAS_RELATORIO = 100
+
+COLUNAS_MOVIMENTO = ['tipo_movimento', 'valor_transacao', 'data_transacao']
+
+
+class ValidacaoBase:
+    """
+    Pré-validação vetorizada da base consolidada.
+
+    Métodos
+    -------
+    validar(contas: pd.DataFrame, saida: str, conciliacao: dict) -> dict
+        Executa todas as verificações e retorna (e opcionalmente grava) o relatório.
+    conciliar(index: pd.DataFrame, accounts: pd.DataFrame) -> dict
+        Compara as contas do índice e do Databricks antes do merge.
+    salvar_conciliacao(conciliacao: dict, contas: int, path: str)
+        Grava a conciliação ao lado da base consolidada.
+    carregar_conciliacao(contas: int, path: str) -> dict
+        Lê a conciliação gravada para a base com a quantidade de linhas informada.
+    expandir_movimentos(contas: pd.DataFrame) -> tuple
+        Retorna as movimentações em um DataFrame (uma linha por movimentação) e as linhas ilegíveis.
+    bloquear_se_necessario(relatorio: dict)
+        Interrompe a execução se o relatório tiver erros e BLOQUEAR_RENDER_COM_ERROS estiver ativo.
+    """
+
+    @staticmethod
+    def validar(contas: pd.DataFrame, saida: str = None, conciliacao: dict = None) -> dict:
+        """
+        Verifica a base inteira e monta o relatório de erros e avisos. Verificações cujas colunas
+        não existem na base (ex: base bruta do Databricks, sem agência) são ignoradas.
+
+        Parâmetros:
+        -----------
+        contas : pd.DataFrame
+            Base consolidada (create_cota_capital ou carregar_base).
+        saida : str, opcional
+            Caminho do relatório em JSON. Padrão: variável global PATH_RELATORIO_VALIDACAO
+            (vazio não grava).
+        conciliacao : dict, opcional
+            Resultado de conciliar. Por padrão, lido de PATH_CACHE_CONCILIACAO (carregar_conciliacao).
+
+        Retorna:
+        --------
+        dict
+            'gerado_em', 'contas', 'movimentos', 'erros' e 'avisos' (por verificação: quantidade
+            de registros e as primeiras contas afetadas), 'contas_com_erro' e 'bloqueante'.
+        """
+        contas = contas.reset_index(drop=True)
+        conta = contas['conta'].astype(str) if 'conta' in contas.columns else pd.Series(contas.index.astype(str))
+        erros, avisos = {}, {}
+
+        capital = ValidacaoBase._numero(contas, 'capital_social')
+        movimentacao = ValidacaoBase._numero(contas, 'movimentacao')
+        if capital is not None or movimentacao is not None:
+            ausente = np.zeros(len(contas), dtype=bool)
+            for serie in (capital, movimentacao):
+                if serie is not None:
+                    ausente |= serie.isna().to_numpy()
+            erros['valor_ausente'] = ausente
+
+        agencia = None
+        if 'agência' in contas.columns:
+            agencia = pd.to_numeric(contas['agência'].astype(object), errors='coerce')
+            erros['agencia_invalida'] = (agencia.isna() | (agencia % 1 != 0)).to_numpy()
+
+        emissao = None
+        if 'data_emissao' in contas.columns:
+            emissao = ValidacaoBase._datas(contas['data_emissao'])
+            erros['data_emissao_invalida'] = emissao.isna().to_numpy()
+
+        # Chaves duplicadas: o PDF é gravado em UAxx/<administradora>/<conta>.pdf (um diretório por mês
+        # nos extratos por período), então duas linhas com a mesma agência, administradora, conta e mês
+        # de emissão gravariam o mesmo arquivo
+        chave = {
+            'agencia': agencia,
+            'administradora': contas['administradora'].astype(str) if 'administradora' in contas.columns else None,
+            'conta': conta if 'conta' in contas.columns else None,
+            'mes': emissao.dt.to_period('M') if emissao is not None else None,
+        }
+        chave = pd.DataFrame({nome: serie for nome, serie in chave.items() if serie is not None})
+        if 'conta' in chave.columns:
+            erros['conta_duplicada'] = chave.duplicated(keep=False).to_numpy()
+
+        total_movimentos = 0
+        if 'tipo_valor_data_movimentacao' in contas.columns:
+            movimentos, ilegiveis = ValidacaoBase.expandir_movimentos(contas)
+            total_movimentos = len(movimentos)
+            erros['movimentacoes_invalidas'] = ilegiveis
+
+            valores = pd.to_numeric(movimentos['valor_transacao'], errors='coerce')
+            avisos['valor_transacao_invalido'] = ValidacaoBase._por_conta(len(contas), movimentos['_linha'], valores.isna())
+            avisos['valor_negativo'] = ValidacaoBase._por_conta(len(contas), movimentos['_linha'], valores < 0)
+
+            if movimentacao is not None:
+                soma = np.bincount(movimentos['_linha'], weights=valores.fillna(0.0), minlength=len(contas))
+                divergente = np.abs(soma - movimentacao.fillna(0.0).to_numpy()) > TOLERANCIA_SOMA
+                erros['soma_divergente'] = divergente & ~ilegiveis & movimentacao.notna().to_numpy()
+
+            datas = pd.to_datetime(movimentos['data_transacao'], format='%d/%m/%Y', errors='coerce')
+            avisos['data_transacao_invalida'] = ValidacaoBase._por_conta(len(contas), movimentos['_linha'], datas.isna())
+            if emissao is not None:
+                # O extrato emitido em um mês apresenta as movimentações do mês anterior
+                mes_emissao = (emissao.dt.year * 12 + emissao.dt.month).to_numpy(dtype='float64')
+                esperado = mes_emissao[movimentos['_linha'].to_numpy()] - 1
+                mes_transacao = (datas.dt.year * 12 + datas.dt.month).to_numpy(dtype='float64')
+                fora = ~np.isnan(esperado) & ~np.isnan(mes_transacao) & (mes_transacao != esperado)
+                avisos['data_fora_do_periodo'] = ValidacaoBase._por_conta(len(contas), movimentos['_linha'], fora)
+
+        relatorio = {
+            'gerado_em': datetime.now().isoformat(timespec='seconds'),
+            'contas': len(contas),
+            'movimentos': total_movimentos,
+            'erros': {nome: ValidacaoBase._resumo(conta, marcadas) for nome, marcadas in erros.items()},
+            'avisos': {nome: ValidacaoBase._resumo(conta, marcadas) for nome, marcadas in avisos.items()},
+        }
+
+        if conciliacao is None:
+            conciliacao = ValidacaoBase.carregar_conciliacao(len(contas))
+        if conciliacao:
+            somente_indice = conciliacao.get('somente_indice', [])
+            relatorio['avisos']['somente_indice'] = {
+                'quantidade': len(somente_indice), 'contas': somente_indice[:LIMITE_CONTAS_RELATORIO]
+            }
+            relatorio['somente_databricks'] = conciliacao.get('somente_databricks', 0)
+
+        com_erro = np.zeros(len(contas), dtype=bool)
+        for marcadas in erros.values():
+            com_erro |= marcadas
+        relatorio['contas_com_erro'] = int(com_erro.sum())
+        relatorio['bloqueante'] = bool(com_erro.any())
+
+        for grupo in ('erros', 'avisos'):
+            for nome, resumo in relatorio[grupo].items():
+                if resumo['quantidade']:
+                    registrar = logger.error if grupo == 'erros' else logger.warning
+                    registrar(f"Validação ({grupo}) {nome}: {resumo['quantidade']} registros. Ex: {resumo['contas'][:5]}")
+        logger.info(f"Validação concluída: {len(contas)} contas, {total_movimentos} movimentações, "
+                    f"{relatorio['contas_com_erro']} contas com erro.")
+
+        saida = saida if saida is not None else gvars.PATH_RELATORIO_VALIDACAO
+        if saida:
+            os.makedirs(os.path.dirname(saida) or '.', exist_ok=True)
+            with open(saida, 'w', encoding='utf-8') as f:
+                json.dump(relatorio, f, ensure_ascii=False, indent=2)
+            logger.info(f"Relatório de validação gravado em {saida}.")
+        return relatorio
+
+    @staticmethod
+    def conciliar(index: pd.DataFrame, accounts: pd.DataFrame) -> dict:
+        """
+        Compara as contas do índice (Excel) e do Databricks antes do merge, que descarta as
+        contas presentes em apenas um dos lados.
+
+        Retorna:
+        --------
+        dict
+            'somente_indice': contas do índice sem dados no Databricks;
+            'somente_databricks': quantidade de contas do Databricks fora do índice.
+        """
+        contas_indice = pd.Index(index['conta'].dropna().astype(str).unique())
+        contas_databricks = pd.Index(accounts['conta'].dropna().astype(str).unique())
+        return {
+            'somente_indice': contas_indice.difference(contas_databricks).tolist(),
+            'somente_databricks': int(len(contas_databricks.difference(contas_indice))),
+        }
+
+    @staticmethod
+    def salvar_conciliacao(conciliacao: dict, contas: int, path: str = None):
+        """
+        Grava a conciliação (conciliar) em JSON ao lado da base consolidada, com a quantidade de
+        linhas da base a que se refere.
+        """
+        path = path or gvars.PATH_CACHE_CONCILIACAO
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({**conciliacao, 'contas': contas}, f, ensure_ascii=False)
+
+    @staticmethod
+    def carregar_conciliacao(contas: int, path: str = None) -> dict:
+        """
+        Lê a conciliação gravada por salvar_conciliacao. Retorna None se não houver arquivo ou se
+        ele se referir a uma base com outra quantidade de linhas.
+        """
+        path = path or gvars.PATH_CACHE_CONCILIACAO
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            conciliacao = json.load(f)
+        if conciliacao.pop('contas', None) != contas:
+            logger.warning(f"Conciliação em {path} não corresponde à base validada; ignorada.")
+            return None
+        return conciliacao
+
+    @staticmethod
+    def expandir_movimentos(contas: pd.DataFrame) -> tuple:
+        """
+        Expande a coluna 'tipo_valor_data_movimentacao' em um DataFrame com uma linha por
+        movimentação. Os textos JSON de todas as contas são interpretados em uma única chamada;
+        somente se algum for inválido as contas são interpretadas individualmente.
+
+        Retorna:
+        --------
+        tuple
+            (movimentos, ilegiveis): DataFrame com as colunas de COLUNAS_MOVIMENTO e '_linha'
+            (posição da conta na base) e um array booleano com as contas cujo valor não pôde
+            ser interpretado.
+        """
+        valores = contas['tipo_valor_data_movimentacao'].astype(object).to_numpy()
+        listas = np.empty(len(valores), dtype=object)
+        listas.fill(())
+        ilegiveis = np.zeros(len(valores), dtype=bool)
+
+        e_lista = np.fromiter((isinstance(v, list) for v in valores), dtype=bool, count=len(valores))
+        listas[e_lista] = valores[e_lista]
+        e_texto = np.fromiter((isinstance(v, str) for v in valores), dtype=bool, count=len(valores))
+        textos = pd.Series(valores[e_texto], dtype=object).str.strip()
+        preenchidos = ~textos.isin(['', 'null', 'None']).to_numpy()
+        posicoes = np.flatnonzero(e_texto)[preenchidos]
+        textos = textos[preenchidos].tolist()
+
+        try:
+            interpretados = json.loads(f"[{','.join(textos)}]")
+            if len(interpretados) != len(textos):
+                raise ValueError("quantidade de valores interpretados diferente da esperada")
+        except ValueError:
+            interpretados = []
+            for texto in textos:
+                try:
+                    interpretados.append(json.loads(texto))
+                except ValueError:
+                    interpretados.append(None)
+
+        for posicao, movimento in zip(posicoes, interpretados):
+            if isinstance(movimento, list) and all(isinstance(m, dict) for m in movimento):
+                listas[posicao] = movimento
+            else:
+                ilegiveis[posicao] = True
+
+        tamanhos = np.fromiter((len(lista) for lista in listas), dtype=np.int64, count=len(listas))
+        planos = [movimento for lista in listas for movimento in lista]
+        movimentos = pd.DataFrame.from_records(planos, columns=COLUNAS_MOVIMENTO) if planos else pd.DataFrame(columns=COLUNAS_MOVIMENTO)
+        movimentos['_linha'] = np.repeat(np.arange(len(listas)), tamanhos)
+        return movimentos, ilegiveis
+
+    @staticmethod
+    def bloquear_se_necessario(relatorio: dict):
+        """
+        Interrompe a execução se o relatório tiver erros e BLOQUEAR_RENDER_COM_ERROS estiver ativo.
+        """
+        if not relatorio['bloqueante']:
+            return
+        nomes = ", ".join(nome for nome, resumo in relatorio['erros'].items() if resumo['quantidade'])
+        mensagem = f"Pré-validação encontrou {relatorio['contas_com_erro']} contas com erro ({nomes})."
+        if gvars.BLOQUEAR_RENDER_COM_ERROS:
+            raise Exception(f"{mensagem} Geração interrompida; corrija a base ou desative BLOQUEAR_RENDER_COM_ERROS.")
+        logger.warning(f"{mensagem} A geração continuará; as contas com erro irão para o arquivo de falhas.")
+
+    @staticmethod
+    def _numero(contas: pd.DataFrame, coluna: str):
+        if coluna not in contas.columns:
+            return None
+        return pd.to_numeric(contas[coluna].astype(object), errors='coerce').astype('float64')
+
+    @staticmethod
+    def _datas(serie: pd.Series) -> pd.Series:
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            return serie
+        return pd.to_datetime(serie.astype(object), format='%d/%m/%Y', errors='coerce')
+
+    @staticmethod
+    def _por_conta(total: int, linhas: pd.Series, marcadas) -> np.ndarray:
+        # Converte uma marcação por movimentação em uma marcação por conta
+        resultado = np.zeros(total, dtype=bool)
+        resultado[np.asarray(linhas)[np.asarray(marcadas, dtype=bool)]] = True
+        return resultado
+
+    @staticmethod
+    def _resumo(conta: pd.Series, marcadas: np.ndarray) -> dict:
+        afetadas = conta[marcadas]
+        return {'quantidade': int(marcadas.sum()), 'contas': afetadas.head(LIMITE_CONTAS_RELATORIO).tolist()}
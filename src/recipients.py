@@ -0,0 +1,293 @@
+import os
+import json
+import hashlib
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from src.log import Logs
+import src.global_vars as gvars
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+# Este módulo monta o diretório de destinatários dos e-mails de aviso: para cada agência e
+# administradora, os endereços normalizados (sem espaços, em minúsculas) e válidos da coluna
+# 'email' da base. A coluna é processada de uma vez, com str.split/explode/drop_duplicates, em vez
+# de percorrer as células uma a uma. O diretório é gravado em cache (PATH_CACHE_DESTINATARIOS)
+# com a assinatura das colunas de origem, e só é recalculado quando a base muda. A partir dele,
+# as consultas "quem recebe o quê" (destinatários de uma agência/administradora, vínculos de um
+# endereço e lotes de envio por agência) não precisam da base: elas aceitam tanto o DataFrame
+# quanto as linhas lidas do cache por carregar_linhas, sem importar o pandas, para que a etapa de
+# envio dos e-mails ('app.py mail') continue leve.
+
+logger = Logs.load_log(__name__)
+
+COLUNAS_DIRETORIO = ['agencia', 'administradora', 'email']
+
+# Separadores aceitos entre endereços de uma mesma célula
+SEPARADORES_EMAIL = r"[;,\s]+"
+
+# Endereço com uma única '@', sem espaços e com domínio contendo ao menos um ponto
+PADRAO_EMAIL = r"[^@\s<>()\[\],;:\"]+@[^@\s<>()\[\],;:\"]+\.[a-z0-9-]{2,}"
+
+
+class DiretorioDestinatarios:
+    """
+    Diretório vetorizado de destinatários por agência e administradora.
+
+    Métodos
+    -------
+    construir(contas: pd.DataFrame) -> pd.DataFrame
+        Extrai, normaliza e valida os endereços da base, por agência e administradora.
+    obter(contas: pd.DataFrame, path: str) -> pd.DataFrame
+        Retorna o diretório em cache se a base não mudou; caso contrário, constrói e grava o cache.
+    salvar(diretorio: pd.DataFrame, path: str, assinatura: str) -> str
+        Grava o diretório em cache (JSON).
+    carregar(path: str) -> pd.DataFrame ou None
+        Lê o diretório gravado por salvar.
+    carregar_linhas(path: str) -> list ou None
+        Lê as linhas (agencia, administradora, email) do diretório gravado por salvar, sem pandas.
+    destinatarios(diretorio, agencia, administradora) -> list
+        Endereços de uma agência e/ou administradora (ou de todas), sem repetição.
+    por_agencia(diretorio) -> dict
+        Endereços de cada agência.
+    vinculos(diretorio, email) -> list
+        Pares (agência, administradora) de um endereço.
+    lotes(diretorio, tamanho) -> list
+        Lotes de envio por agência, com no máximo 'tamanho' destinatários cada.
+    """
+
+    @staticmethod
+    def construir(contas: 'pd.DataFrame') -> 'pd.DataFrame':
+        """
+        Parâmetros:
+        -----------
+        contas : pd.DataFrame
+            Base com a coluna 'email' (vários endereços por célula, separados por ';', ',' ou
+            espaços) e, opcionalmente, 'agência' e 'administradora'.
+
+        Retorna:
+        --------
+        pd.DataFrame
+            Uma linha por (agencia, administradora, email), na ordem em que aparecem na base.
+            A agência tem dois dígitos ('invalida' se não for numérica).
+        """
+        if 'email' not in contas.columns:
+            raise ValueError("O DataFrame deve conter uma coluna 'email'.")
+        import pandas as pd
+
+        # Cada célula distinta de e-mail é separada uma única vez; as linhas da base são reduzidas
+        # aos pares distintos (agência, administradora, célula), comparados por código
+        agencias, agencias_unicas = pd.factorize(DiretorioDestinatarios._agencias(contas))
+        administradoras, administradoras_unicas = pd.factorize(DiretorioDestinatarios._coluna_texto(contas, 'administradora'))
+        celulas, celulas_unicas = pd.factorize(contas['email'].astype(object))
+        pares = pd.DataFrame({'agencia': agencias, 'administradora': administradoras, 'celula': celulas})
+        pares = pares[pares['celula'] >= 0].drop_duplicates()
+
+        enderecos = (
+            pd.Series(celulas_unicas, dtype=object).astype(str)
+            .str.split(SEPARADORES_EMAIL, regex=True)
+            .explode()
+            .str.strip(" \t<>\"'").str.lower()
+        )
+        enderecos = enderecos[enderecos.str.len() > 0]
+
+        validos = enderecos.str.fullmatch(PADRAO_EMAIL).fillna(False).to_numpy(dtype=bool)
+        if not validos.all():
+            invalidos = enderecos[~validos].unique()
+            logger.warning(f"{len(invalidos)} endereços de e-mail inválidos descartados. Ex: {list(invalidos[:5])}")
+        enderecos = enderecos[validos].rename('email').rename_axis('celula').reset_index()
+
+        diretorio = pares.merge(enderecos, on='celula', how='inner', sort=False)
+        diretorio = diretorio.drop_duplicates(['agencia', 'administradora', 'email'], ignore_index=True)
+        diretorio['agencia'] = agencias_unicas[diretorio['agencia'].to_numpy()]
+        diretorio['administradora'] = administradoras_unicas[diretorio['administradora'].to_numpy()]
+
+        logger.info(
+            f"Diretório de destinatários: {diretorio['email'].nunique()} endereços em "
+            f"{diretorio['agencia'].nunique()} agências."
+        )
+        return diretorio[COLUNAS_DIRETORIO]
+
+    @staticmethod
+    def obter(contas: 'pd.DataFrame', path: str = None) -> 'pd.DataFrame':
+        """
+        Retorna o diretório da base, reaproveitando o cache se as colunas de origem (agência,
+        administradora e e-mail) não mudaram desde a última construção.
+
+        Parâmetros:
+        -----------
+        contas : pd.DataFrame
+            Base consolidada.
+        path : str, opcional
+            Caminho do cache. Por padrão, utiliza a variável global PATH_CACHE_DESTINATARIOS.
+
+        Retorna:
+        --------
+        pd.DataFrame
+            Diretório de destinatários.
+        """
+        path = path or gvars.PATH_CACHE_DESTINATARIOS
+        assinatura = DiretorioDestinatarios._assinatura(contas)
+        cache = DiretorioDestinatarios.carregar(path)
+        if cache is not None and cache.attrs.get('assinatura') == assinatura:
+            logger.info(f"Diretório de destinatários carregado do cache {path}.")
+            return cache
+
+        diretorio = DiretorioDestinatarios.construir(contas)
+        DiretorioDestinatarios.salvar(diretorio, path, assinatura)
+        return diretorio
+
+    @staticmethod
+    def salvar(diretorio: 'pd.DataFrame', path: str = None, assinatura: str = None) -> str:
+        """
+        Grava o diretório em JSON, com a assinatura da base de origem.
+        """
+        path = path or gvars.PATH_CACHE_DESTINATARIOS
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        documento = {
+            'gerado_em': datetime.now().isoformat(timespec='seconds'),
+            'assinatura': assinatura,
+            'colunas': COLUNAS_DIRETORIO,
+            'linhas': diretorio[COLUNAS_DIRETORIO].to_numpy().tolist(),
+        }
+        temporario = f"{path}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(documento, f, ensure_ascii=False)
+        os.replace(temporario, path)
+        logger.info(f"Diretório de destinatários salvo em {path}")
+        return path
+
+    @staticmethod
+    def carregar(path: str = None):
+        """
+        Lê o diretório gravado por salvar, ou retorna None se o cache não existir ou estiver
+        em um formato anterior (lista simples de endereços).
+        """
+        documento = DiretorioDestinatarios._ler_cache(path)
+        if documento is None:
+            return None
+        import pandas as pd
+
+        diretorio = pd.DataFrame(documento['linhas'], columns=COLUNAS_DIRETORIO, dtype=object)
+        diretorio.attrs['assinatura'] = documento.get('assinatura')
+        return diretorio
+
+    @staticmethod
+    def carregar_linhas(path: str = None):
+        """
+        Lê as linhas (agencia, administradora, email) do diretório gravado por salvar, sem
+        importar o pandas, ou retorna None se o cache não existir.
+        """
+        documento = DiretorioDestinatarios._ler_cache(path)
+        if documento is None:
+            return None
+        return [tuple(linha) for linha in documento['linhas']]
+
+    @staticmethod
+    def destinatarios(diretorio, agencia: str = None, administradora: str = None) -> list:
+        """
+        Retorna os endereços (sem repetição, na ordem da base) de uma agência, de uma
+        administradora, de ambas ou, sem filtros, de todo o diretório.
+        """
+        agencia = None if agencia is None else str(agencia).zfill(2)
+        administradora = None if administradora is None else str(administradora)
+        return list(dict.fromkeys(
+            email for ag, adm, email in DiretorioDestinatarios._linhas(diretorio)
+            if (agencia is None or ag == agencia) and (administradora is None or adm == administradora)
+        ))
+
+    @staticmethod
+    def por_agencia(diretorio) -> dict:
+        """
+        Retorna {agencia: [endereços]} para todas as agências do diretório, em ordem.
+        """
+        enderecos = {}
+        for agencia, _, email in DiretorioDestinatarios._linhas(diretorio):
+            enderecos.setdefault(agencia, {})[email] = None
+        return {agencia: list(enderecos[agencia]) for agencia in sorted(enderecos)}
+
+    @staticmethod
+    def vinculos(diretorio, email: str) -> list:
+        """
+        Retorna os pares (agencia, administradora) cujos extratos são avisados ao endereço informado.
+        """
+        email = str(email).strip().lower()
+        return [(ag, adm) for ag, adm, endereco in DiretorioDestinatarios._linhas(diretorio) if endereco == email]
+
+    @staticmethod
+    def lotes(diretorio, tamanho: int = None) -> list:
+        """
+        Divide os destinatários em lotes de envio por agência.
+
+        Parâmetros:
+        -----------
+        diretorio : pd.DataFrame ou list
+            Diretório de destinatários (DataFrame ou linhas de carregar_linhas).
+        tamanho : int, opcional
+            Máximo de destinatários por mensagem. Padrão: variável global LIMITE_DESTINATARIOS_EMAIL.
+
+        Retorna:
+        --------
+        list
+            Dicionários {'agencia', 'administradoras', 'destinatarios'}, um por mensagem.
+        """
+        tamanho = max(1, tamanho or gvars.LIMITE_DESTINATARIOS_EMAIL)
+        administradoras = {}
+        for agencia, administradora, _ in DiretorioDestinatarios._linhas(diretorio):
+            administradoras.setdefault(agencia, set()).add(administradora)
+
+        lotes = []
+        for agencia, enderecos in DiretorioDestinatarios.por_agencia(diretorio).items():
+            for inicio in range(0, len(enderecos), tamanho):
+                lotes.append({
+                    'agencia': agencia,
+                    'administradoras': sorted(administradoras[agencia]),
+                    'destinatarios': enderecos[inicio:inicio + tamanho],
+                })
+        return lotes
+
+    @staticmethod
+    def _linhas(diretorio) -> list:
+        if isinstance(diretorio, list):
+            return diretorio
+        return list(diretorio[COLUNAS_DIRETORIO].itertuples(index=False, name=None))
+
+    @staticmethod
+    def _ler_cache(path: str = None):
+        path = path or gvars.PATH_CACHE_DESTINATARIOS
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            documento = json.load(f)
+        if not isinstance(documento, dict) or 'linhas' not in documento:
+            return None
+        return documento
+
+    @staticmethod
+    def _agencias(contas: 'pd.DataFrame') -> 'np.ndarray':
+        import numpy as np
+        import pandas as pd
+
+        if 'agência' not in contas.columns:
+            return np.full(len(contas), 'invalida', dtype=object)
+        agencia = pd.to_numeric(contas['agência'].astype(object), errors='coerce')
+        valida = agencia.notna() & (agencia % 1 == 0)
+        return agencia.where(valida).astype('Int64').astype(str).str.zfill(2).where(valida, 'invalida').to_numpy(dtype=object)
+
+    @staticmethod
+    def _coluna_texto(contas: 'pd.DataFrame', coluna: str) -> 'np.ndarray':
+        import numpy as np
+
+        if coluna not in contas.columns:
+            return np.full(len(contas), '', dtype=object)
+        return contas[coluna].astype(object).fillna('').astype(str).to_numpy(dtype=object)
+
+    @staticmethod
+    def _assinatura(contas: 'pd.DataFrame') -> str:
+        import pandas as pd
+
+        colunas = [c for c in ('agência', 'administradora', 'email') if c in contas.columns]
+        hashes = pd.util.hash_pandas_object(contas[colunas], index=False).to_numpy()
+        return hashlib.sha256(hashes.tobytes()).hexdigest()
@@ -0,0 +1,303 @@
+import io
+import os
+import json
+import time
+import zipfile
+import threading
+from urllib.parse import urlparse, unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import src.global_vars as gvars
+from src.log import Logs
+from src.pdf_config import PDF_CONFIG
+from src.report_generator import CotaCapital
+from src.storage import Armazenamento
+from src.data_management import DataFrameBuilder
+
+# Este módulo fornece um serviço local de geração sob demanda de extratos de cota capital.
+# O serviço mantém em memória a base consolidada (com um índice por conta), a configuração do PDF
+# e a imagem de fundo já codificada, de modo que o extrato de uma conta é gerado em milissegundos,
+# sem reexecutar o lote completo do app.py. A base é recarregada em segundo plano sempre que o
+# cache local (PATH_CACHE_BASE) é atualizado, por exemplo por um novo 'python app.py fetch'.
+#
+# Rotas:
+#     GET  /extrato/<conta>   PDF do extrato da conta (application/pdf).
+#     POST /extratos          Lote: {"contas": [...], "salvar": false}. Retorna um ZIP com um PDF por
+#                             conta (e falhas.json, se houver); com "salvar": true, grava os PDFs no
+#                             destino configurado (ARMAZENAMENTO) e retorna um JSON com os caminhos
+#                             gerados (relativos a PATH_BASES) e as falhas.
+#     POST /recarregar        Recarrega a base do cache local imediatamente.
+#     GET  /status            Situação do serviço (contas carregadas, data da base, extratos gerados).
+#
+# Uso:
+#     python app.py serve --porta 8766
+
+logger = Logs.load_log(__name__)
+
+
+class ServicoExtratos:
+    """
+    Servidor HTTP local que gera extratos individuais a partir da base mantida em memória.
+
+    Métodos
+    -------
+    __init__(path_base, intervalo_recarga)
+        Configura o cache da base e o intervalo de verificação de atualizações.
+    carregar() -> bool
+        Carrega (ou recarrega) a base e o índice por conta, se o cache foi alterado.
+    renderizar(conta) -> bytes
+        Gera o PDF do extrato de uma conta em memória.
+    renderizar_lote(contas, salvar) -> tuple
+        Gera os extratos de várias contas, em um ZIP em memória ou gravados em PATH_BASES.
+    iniciar(porta) -> str
+        Aquece o serviço, inicia o servidor e a recarga em segundo plano e retorna a URL base.
+    parar()
+        Encerra o servidor e a recarga em segundo plano.
+    """
+
+    def __init__(self, path_base: str = None, intervalo_recarga: float = None):
+        """
+        Parâmetros:
+        -----------
+        path_base : str, opcional
+            Cache da base consolidada. Padrão: variável global PATH_CACHE_BASE.
+        intervalo_recarga : float, opcional
+            Segundos entre as verificações de atualização do cache. Padrão: RENDER_INTERVALO_RECARGA.
+        """
+        self.path_base = path_base or gvars.PATH_CACHE_BASE
+        self.intervalo_recarga = intervalo_recarga if intervalo_recarga is not None else gvars.RENDER_INTERVALO_RECARGA
+        self.base = None
+        self.indice = {}
+        self.versao_base = None
+        self.carregado_em = None
+        self.total_gerados = 0
+        self._lock = threading.Lock()
+        self._lock_carga = threading.Lock()
+        self._parar = threading.Event()
+        self._servidor = None
+
+    def carregar(self, forcar: bool = False) -> bool:
+        """
+        Carrega a base do cache local e monta o índice conta -> posição. A nova base só substitui
+        a anterior depois de carregada, de modo que as requisições em andamento não são afetadas.
+
+        Parâmetros:
+        -----------
+        forcar : bool, opcional
+            Recarrega mesmo que o cache não tenha sido alterado. Padrão: False.
+
+        Retorna:
+        --------
+        bool
+            True se a base foi (re)carregada.
+        """
+        with self._lock_carga:
+            versao = os.path.getmtime(self.path_base)
+            if not forcar and versao == self.versao_base:
+                return False
+
+            base = DataFrameBuilder.carregar_base(self.path_base).reset_index(drop=True)
+            contas = base['conta'].astype(str)
+            duplicadas = contas.duplicated(keep='last')
+            if duplicadas.any():
+                logger.warning(f"{int(duplicadas.sum())} contas duplicadas na base; será usado o último registro de cada.")
+            indice = dict(zip(contas, range(len(base))))
+
+            with self._lock:
+                self.base, self.indice, self.versao_base = base, indice, versao
+                self.carregado_em = time.strftime('%Y-%m-%d %H:%M:%S')
+            logger.info(f"Base carregada no serviço de extratos: {len(indice)} contas.")
+            return True
+
+    def _recarregar_periodicamente(self):
+        while not self._parar.wait(self.intervalo_recarga):
+            try:
+                self.carregar()
+            except Exception as e:
+                logger.error(f"Erro ao recarregar a base do serviço de extratos: {type(e).__name__}: {e}")
+
+    def _linha(self, conta: str):
+        with self._lock:
+            base, indice = self.base, self.indice
+        posicao = indice.get(str(conta))
+        if posicao is None:
+            raise KeyError(f"conta {conta} não encontrada na base")
+        return base.iloc[posicao]
+
+    def renderizar(self, conta: str) -> bytes:
+        """
+        Gera o PDF do extrato de uma conta em memória.
+
+        Parâmetros:
+        -----------
+        conta : str
+            Número da conta, no mesmo formato da coluna 'conta' da base.
+
+        Retorna:
+        --------
+        bytes
+            Conteúdo do PDF.
+        """
+        buffer = io.BytesIO()
+        CotaCapital.gerar_pdf(buffer, self._linha(conta), PDF_CONFIG, '')
+        with self._lock:
+            self.total_gerados += 1
+        return buffer.getvalue()
+
+    def renderizar_lote(self, contas: list, salvar: bool = False) -> tuple:
+        """
+        Gera os extratos de várias contas, isolando as falhas por conta.
+
+        Parâmetros:
+        -----------
+        contas : list
+            Números das contas.
+        salvar : bool, opcional
+            Se True, grava os PDFs em PATH_BASES (mesma estrutura do lote mensal) em vez de
+            montar um ZIP em memória. Padrão: False.
+
+        Retorna:
+        --------
+        tuple
+            (conteúdo, falhas): o ZIP em bytes (ou a lista de arquivos gravados, com salvar=True)
+            e um dicionário conta -> mensagem de erro.
+        """
+        falhas = {}
+        if salvar:
+            gerados = []
+            contas_geradas = []
+            armazenamento = Armazenamento.criar(gvars.PATH_BASES)
+            for conta in contas:
+                try:
+                    row = self._linha(conta)
+                    CotaCapital.gerar_extrato_conta(row, gvars.PATH_BASES, armazenamento)
+                    gerados.append(CotaCapital.caminho_relativo(row)[1])
+                    contas_geradas.append(str(conta))
+                except Exception as e:
+                    falhas[str(conta)] = f"{type(e).__name__}: {e}"
+            for caminho, erro in armazenamento.confirmar().items():
+                for conta in [c for c, arquivo in zip(contas_geradas, gerados) if arquivo == caminho]:
+                    falhas[conta] = erro
+            gerados = [arquivo for conta, arquivo in zip(contas_geradas, gerados) if conta not in falhas]
+            with self._lock:
+                self.total_gerados += len(gerados)
+            return gerados, falhas
+
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for conta in contas:
+                try:
+                    zf.writestr(f"{conta}.pdf", self.renderizar(conta))
+                except Exception as e:
+                    falhas[str(conta)] = f"{type(e).__name__}: {e}"
+            if falhas:
+                zf.writestr("falhas.json", json.dumps(falhas, ensure_ascii=False, indent=2))
+        return buffer.getvalue(), falhas
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "contas": len(self.indice),
+                "path_base": self.path_base,
+                "carregado_em": self.carregado_em,
+                "extratos_gerados": self.total_gerados,
+            }
+
+    def _handler(self):
+        servico = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, status: int, corpo, tipo: str = "application/json", nome: str = None):
+                dados = corpo if isinstance(corpo, bytes) else json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", tipo)
+                self.send_header("Content-Length", str(len(dados)))
+                if nome:
+                    self.send_header("Content-Disposition", f'attachment; filename="{nome}"')
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def do_GET(self):
+                rota = unquote(urlparse(self.path).path).rstrip('/')
+                if rota == "/status":
+                    return self._responder(200, servico.status())
+                if rota.startswith("/extrato/"):
+                    conta = rota[len("/extrato/"):]
+                    try:
+                        pdf = servico.renderizar(conta)
+                    except KeyError as e:
+                        return self._responder(404, {"erro": str(e.args[0])})
+                    except Exception as e:
+                        logger.error(f"Erro ao gerar extrato da conta {conta}: {type(e).__name__}: {e}")
+                        return self._responder(500, {"erro": f"{type(e).__name__}: {e}"})
+                    return self._responder(200, pdf, "application/pdf", f"{conta}.pdf")
+                self._responder(404, {"erro": "rota inexistente"})
+
+            def do_POST(self):
+                rota = urlparse(self.path).path.rstrip('/')
+                try:
+                    corpo = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                except ValueError:
+                    return self._responder(400, {"erro": "corpo JSON inválido"})
+
+                if rota == "/recarregar":
+                    try:
+                        servico.carregar(forcar=True)
+                    except Exception as e:
+                        return self._responder(500, {"erro": f"{type(e).__name__}: {e}"})
+                    return self._responder(200, servico.status())
+                if rota == "/extratos":
+                    contas = corpo.get('contas')
+                    if not isinstance(contas, list) or not contas:
+                        return self._responder(400, {"erro": "informe a lista 'contas'"})
+                    conteudo, falhas = servico.renderizar_lote([str(c) for c in contas], bool(corpo.get('salvar')))
+                    if corpo.get('salvar'):
+                        return self._responder(200, {"gerados": conteudo, "falhas": falhas})
+                    return self._responder(200, conteudo, "application/zip", "extratos.zip")
+                self._responder(404, {"erro": "rota inexistente"})
+
+        return Handler
+
+    def iniciar(self, porta: int = None, host: str = "127.0.0.1") -> str:
+        """
+        Carrega a base, aquece a geração (fontes e imagem de fundo) e inicia o servidor e a
+        recarga periódica em threads em segundo plano.
+
+        Parâmetros:
+        -----------
+        porta : int, opcional
+            Porta local. Padrão: variável global RENDER_PORTA (0 escolhe uma porta livre).
+        host : str, opcional
+            Endereço de escuta. Padrão: '127.0.0.1' (somente acesso local).
+
+        Retorna:
+        --------
+        str
+            URL base do serviço.
+        """
+        self.carregar(forcar=True)
+        CotaCapital.ativar_cache_fundo()
+        if self.indice:
+            try:
+                self.renderizar(next(iter(self.indice)))
+            except Exception as e:
+                logger.warning(f"Aquecimento do serviço de extratos falhou: {type(e).__name__}: {e}")
+            self.total_gerados = 0
+
+        self._parar.clear()
+        self._servidor = ThreadingHTTPServer((host, gvars.RENDER_PORTA if porta is None else porta), self._handler())
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        threading.Thread(target=self._recarregar_periodicamente, daemon=True).start()
+        url = f"http://{host}:{self._servidor.server_address[1]}"
+        logger.info(f"Serviço de extratos disponível em {url}")
+        return url
+
+    def parar(self):
+        self._parar.set()
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
@@ -1,13 +1,22 @@
-from src.data_management import DataFrameBuilder
+import reportlab
 from reportlab.pdfgen import canvas
-
-from src.pdf_config import PDF_CONFIG
+from reportlab.pdfbase import pdfdoc
+from reportlab.lib.utils import ImageReader
+from PIL import Image
+from pypdf import PdfReader, PdfWriter
+
+from src.pdf_config import PDF_CONFIG, PERFIS_PDF
+from src.storage import Armazenamento, PASTA_EXTRATOS
+from src.run_summary import ResumoExecucao
 from src.log import Logs
 
 import pandas as pd
+import numpy as np
+import io
 import os
 import time
 import json
+import threading
 from datetime import datetime, timedelta
 import src.global_vars as gvars
 
@@ -25,66 +34,474 @@ class CotaCapital():
 
     Métodos
     -------
-    gerar_extratos_mensal(accounts: pd.DataFrame)
-        Gera os extratos mensais em PDF para cada conta presente no DataFrame.
-    gerar_pdf(pdf_filename, row, PDF_CONFIG, base_dir)
+    gerar_extratos_mensal(accounts: pd.DataFrame, path_bases, arquivo_falhas, armazenamento)
+        Gera os extratos mensais em PDF para cada conta presente no DataFrame, isolando falhas por conta.
+    gerar_extrato_conta(row, path_bases, armazenamento) -> tuple
+        Gera o extrato de uma única conta na pasta da sua agência e administradora.
+    caminho_relativo(row) -> tuple
+        Retorna a agência (dois dígitos) e o caminho do PDF individual de uma conta, relativo à raiz de saída.
+    caminho_extrato(row, path_bases) -> tuple
+        Retorna a agência (dois dígitos) e o caminho local do PDF individual de uma conta.
+    pastas_saida(accounts: pd.DataFrame) -> list
+        Retorna as pastas UAXX/Extratos de Cota Capital/<administradora> necessárias para a base.
+    data_emissao(valor) -> pd.Timestamp
+        Interpreta a data de emissão de uma conta (Timestamp, dd/mm/aaaa ou aaaa-mm-dd).
+    salvar_falhas(falhas, path_bases, arquivo_falhas)
+        Grava as contas que falharam no arquivo de falhas (dead letter).
+    reprocessar_falhas(path_bases, modo, contas)
+        Gera novamente apenas as contas (ou, no modo consolidado, os PDFs) registradas no arquivo de falhas.
+    gerar_extratos_consolidados(accounts: pd.DataFrame, path_bases, armazenamento, arquivo_falhas)
+        Gera um único PDF por administradora, com uma página e um marcador por conta.
+    dividir_consolidado(pdf_consolidado, pasta_destino)
+        Divide um PDF consolidado em um PDF por conta.
+    gerar_pdf(pdf_filename, row, PDF_CONFIG, base_dir, perfil)
         Cria e salva o PDF do extrato detalhado de uma conta, incluindo movimentações.
+    novo_canvas(destino, PDF_CONFIG, perfil)
+        Cria um canvas com a compressão do perfil de saída.
+    perfil_pdf(perfil) -> tuple
+        Retorna o nome e a configuração do perfil de saída (padrão: PERFIL_PDF).
+    desenhar_extrato(c, row, PDF_CONFIG, perfil)
+        Desenha o extrato detalhado de uma conta na página atual de um canvas.
+    preparar_fundo(bg_path, perfil)
+        Prepara a imagem de fundo uma única vez por perfil para reutilização em todos os PDFs do processo.
+    ativar_cache_fundo()
+        Passa a copiar o fundo já codificado entre documentos (serviço de extratos).
     gerar_pdf2(pdf_filename, row, PDF_CONFIG, base_dir)
         Cria e salva um PDF de extrato simplificado para uma conta.
     """
 
+    # Imagens de fundo já codificadas para o PDF, por caminho e perfil (ver preparar_fundo)
+    _fundos = {}
+    _fundos_lock = threading.Lock()
+    # Cópia do fundo já codificado entre documentos, que usa estruturas internas do ReportLab:
+    # ativada apenas pelo serviço de extratos (ativar_cache_fundo) e desativada se elas não forem compatíveis
+    _fundo_em_cache = False
+
     @staticmethod
-    def gerar_extratos_mensal(accounts: pd.DataFrame):
+    def gerar_extratos_mensal(accounts: pd.DataFrame, path_bases: str = None, arquivo_falhas: str = None,
+                              armazenamento: Armazenamento = None) -> dict:
         """
         Gera os extratos mensais em PDF para cada conta do DataFrame fornecido.
-        Os arquivos são salvos em pastas organizadas por agência e administradora.
+        Os arquivos são salvos em pastas organizadas por agência e administradora, criadas uma
+        única vez antes do lote, e só aparecem no caminho final depois de gravados por completo.
+
+        Erros em uma conta não interrompem o lote: a linha é registrada em um arquivo
+        de falhas (dead letter) junto com a exceção, e o processamento segue para a próxima conta.
 
         Parâmetros:
         -----------
         accounts : pd.DataFrame
             DataFrame contendo os dados das contas e administradoras para geração dos extratos.
+        path_bases : str, opcional
+            Diretório base de saída. Por padrão, utiliza a variável global PATH_BASES.
+        arquivo_falhas : str, opcional
+            Caminho do arquivo de falhas. Por padrão, PATH_BASES/ARQUIVO_FALHAS.
+        armazenamento : Armazenamento, opcional
+            Destino dos PDFs. Por padrão, o destino configurado em ARMAZENAMENTO para path_bases.
+
+        Retorna:
+        --------
+        dict
+            Totais da execução: 'gerados', 'falhas', 'arquivo_falhas' (caminho do CSV de falhas ou None)
+            e 'resumo' (ResumoExecucao por agência e administradora, que o chamador pode mesclar e salvar).
         """
-        for _, row in accounts.iterrows():
-            # Obtém o diretório base a partir da variável de ambiente PATH_BASES
-            path_bases = gvars.PATH_BASES
-            agencia = str(int(float(row['agência']))).zfill(2)
-            # Monta o caminho: PATH_BASES/UAXX/Extratos de Cota Capital
-            pasta_agencia = f"UA{agencia}"
-            pdf_dir = os.path.join(
-            path_bases,
-            pasta_agencia,
-            "Extratos de Cota Capital", # Extratos de Cota Capital",
-            row['administradora']
-            )
-            os.makedirs(pdf_dir, exist_ok=True)
-            pdf_filename = os.path.join(pdf_dir, f"{row['conta']}.pdf")
+        path_bases = path_bases or gvars.PATH_BASES
+        armazenamento = armazenamento or Armazenamento.criar(path_bases)
+        armazenamento.preparar_pastas(CotaCapital.pastas_saida(accounts))
+        gerados = np.zeros(len(accounts), dtype=bool)
+        tamanhos = np.zeros(len(accounts), dtype=np.int64)
+        destinos = np.empty(len(accounts), dtype=object)
+        falhas = []
+        armazenar = []
+
+        for posicao, (_, row) in enumerate(accounts.iterrows()):
+            try:
+                agencia, tamanhos[posicao] = CotaCapital.gerar_extrato_conta(row, path_bases, armazenamento)
+            except Exception as e:
+                logger.error(f"Erro ao gerar extrato da conta {row.get('conta', 'N/A')}: {type(e).__name__}: {e}")
+                falha = row.to_dict()
+                falha['erro'] = f"{type(e).__name__}: {e}"
+                falhas.append(falha)
+                continue
+            gerados[posicao] = True
+            destinos[posicao] = CotaCapital.caminho_relativo(row)[1]
+
+            if gvars.ARMAZENAR_EXTRATOS:
+                armazenar.append({
+                    'conta': row['conta'],
+                    'agencia': agencia,
+                    'administradora': row['administradora'],
+                    'mes_emissao': f"{CotaCapital.data_emissao(row['data_emissao']):%Y-%m}",
+                    'arquivo': CotaCapital.caminho_relativo(row)[1],
+                })
+
+        # Arquivos que não chegaram ao caminho final (inclusive nas confirmações automáticas do lote)
+        # voltam para as falhas das próprias contas
+        nao_gravados = armazenamento.confirmar()
+        if nao_gravados:
+            for posicao in np.flatnonzero(gerados & pd.Series(destinos).isin(list(nao_gravados)).to_numpy()):
+                gerados[posicao] = False
+                tamanhos[posicao] = 0
+                falha = accounts.iloc[posicao].to_dict()
+                falha['erro'] = nao_gravados[destinos[posicao]]
+                falhas.append(falha)
+            armazenar = [a for a in armazenar if a['arquivo'] not in nao_gravados]
+        resumo = ResumoExecucao.calcular(accounts, gerados, tamanhos)
+        ResumoExecucao.registrar_log(resumo)
+        arquivo_falhas = CotaCapital.salvar_falhas(falhas, path_bases, arquivo_falhas)
+
+        if armazenar:
+            from src.statement_store import RepositorioExtratos
+            try:
+                RepositorioExtratos().adicionar_varios(armazenar, leitor=armazenamento.ler)
+                logger.info(f"{len(armazenar)} extratos registrados no repositório {gvars.PATH_REPOSITORIO}.")
+            except Exception as e:
+                logger.error(f"Erro ao registrar extratos no repositório: {type(e).__name__}: {e}")
+        logger.info(f"Extratos gerados: {int(gerados.sum())}. Falhas: {len(falhas)}.")
+
+        return {"gerados": int(gerados.sum()), "falhas": len(falhas), "arquivo_falhas": arquivo_falhas, "resumo": resumo}
 
-            CotaCapital.gerar_pdf(pdf_filename, row, PDF_CONFIG, pasta_agencia)
+    @staticmethod
+    def gerar_extrato_conta(row, path_bases: str, armazenamento: Armazenamento = None) -> tuple:
+        """
+        Gera o extrato de uma única conta em PATH_BASES/UAXX/Extratos de Cota Capital/<administradora>/<conta>.pdf.
+        O PDF é gerado em memória e entregue ao destino somente se a geração for concluída, de modo
+        que uma falha nunca deixa um arquivo parcial.
+
+        Parâmetros:
+        -----------
+        row : pd.Series
+            Linha do DataFrame com os dados da conta.
+        path_bases : str
+            Diretório base de saída.
+        armazenamento : Armazenamento, opcional
+            Destino do PDF, confirmado pelo chamador. Se None, o arquivo é gravado e confirmado
+            imediatamente no destino configurado para path_bases.
+
+        Retorna:
+        --------
+        tuple
+            (agência, bytes): código da agência com dois dígitos (ex: '01') e tamanho do PDF gravado.
+        """
+        agencia, caminho = CotaCapital.caminho_relativo(row)
+        buffer = io.BytesIO()
+        CotaCapital.gerar_pdf(buffer, row, PDF_CONFIG, f"UA{agencia}")
+
+        if armazenamento is None:
+            armazenamento = Armazenamento.criar(path_bases)
+            armazenamento.gravar(caminho, buffer.getvalue())
+            armazenamento.confirmar_ou_erro()
+        else:
+            armazenamento.gravar(caminho, buffer.getvalue())
+        return agencia, buffer.getbuffer().nbytes
+
+    @staticmethod
+    def caminho_relativo(row) -> tuple:
+        """
+        Retorna a agência com dois dígitos e o caminho do PDF individual da conta, relativo à
+        raiz de saída e separado por '/': UAXX/Extratos de Cota Capital/<administradora>/<conta>.pdf.
+        """
+        agencia = str(int(float(row['agência']))).zfill(2)
+        return agencia, f"UA{agencia}/{PASTA_EXTRATOS}/{row['administradora']}/{row['conta']}.pdf"
 
-            # Agrupamento para log por agência e administradora
-            if not hasattr(CotaCapital, "_contas_por_agencia"):
-                CotaCapital._contas_por_agencia = {}
+    @staticmethod
+    def caminho_extrato(row, path_bases: str) -> tuple:
+        """
+        Retorna a agência com dois dígitos e o caminho local do PDF individual da conta:
+        PATH_BASES/UAXX/Extratos de Cota Capital/<administradora>/<conta>.pdf.
+        """
+        agencia, caminho = CotaCapital.caminho_relativo(row)
+        return agencia, os.path.join(path_bases, *caminho.split('/'))
 
-            agencia_key = agencia
-            admin_key = row['administradora']
+    @staticmethod
+    def pastas_saida(accounts: pd.DataFrame) -> list:
+        """
+        Retorna as pastas (relativas à raiz de saída) de todas as combinações de agência e
+        administradora da base, para que sejam criadas uma única vez antes do lote.
+        Agências inválidas são ignoradas (a conta falhará na geração).
+        """
+        pares = accounts[['agência', 'administradora']].drop_duplicates().itertuples(index=False)
+        pastas = []
+        for ag_valor, admin_key in pares:
+            try:
+                agencia = str(int(float(ag_valor))).zfill(2)
+            except (TypeError, ValueError):
+                continue
+            pastas.append(f"UA{agencia}/{PASTA_EXTRATOS}/{admin_key}")
+        return pastas
 
-            if agencia_key not in CotaCapital._contas_por_agencia:
-                CotaCapital._contas_por_agencia[agencia_key] = {}
+    @staticmethod
+    def data_emissao(valor) -> pd.Timestamp:
+        """
+        Interpreta a data de emissão de uma conta. Datas já convertidas (BaseSchema.otimizar) são
+        mantidas; textos são lidos no formato da base de entrada (dd/mm/aaaa) e, para arquivos de
+        falhas gravados por versões anteriores, no formato ISO (aaaa-mm-dd).
+
+        Retorna:
+        --------
+        pd.Timestamp
+            Data de emissão.
+        """
+        if isinstance(valor, (pd.Timestamp, datetime, np.datetime64)):
+            return pd.Timestamp(valor)
+        texto = str(valor).strip()
+        for formato in ('%d/%m/%Y', '%Y-%m-%d', '%Y-%m-%d %H:%M:%S'):
+            try:
+                return pd.to_datetime(texto, format=formato)
+            except ValueError:
+                continue
+        raise ValueError(f"Data de emissão inválida: {valor!r}")
 
-            if admin_key not in CotaCapital._contas_por_agencia[agencia_key]:
-                CotaCapital._contas_por_agencia[agencia_key][admin_key] = 0
+    @staticmethod
+    def _formatar_emissao(valor):
+        if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+            return valor
+        try:
+            return f"{CotaCapital.data_emissao(valor):%d/%m/%Y}"
+        except ValueError:
+            return valor
 
-            CotaCapital._contas_por_agencia[agencia_key][admin_key] += 1
+    @staticmethod
+    def salvar_falhas(falhas: list, path_bases: str = None, arquivo_falhas: str = None):
+        """
+        Grava as contas que falharam no arquivo de falhas (dead letter) em PATH_BASES.
+        Caso não haja falhas, remove um arquivo de falhas antigo, se existir.
 
-            # Após o loop, faça o log (apenas uma vez)
-            if _ == accounts.index[-1]:
-                for ag, admins in CotaCapital._contas_por_agencia.items():
-                    total = sum(admins.values())
-                    admins_str = ", ".join([f"{adm}: {qtd}" for adm, qtd in admins.items()])
-                    logger.info(f"Agência {ag}: {total} contas geradas. ({admins_str})")
+        Parâmetros:
+        -----------
+        falhas : list
+            Lista de dicionários com os dados da conta e a coluna 'erro'.
+        path_bases : str, opcional
+            Diretório base de saída. Por padrão, utiliza a variável global PATH_BASES.
+        arquivo_falhas : str, opcional
+            Caminho do arquivo de falhas. Por padrão, PATH_BASES/ARQUIVO_FALHAS.
+
+        Retorna:
+        --------
+        str ou None
+            Caminho do arquivo de falhas gravado, ou None se não houve falhas.
+        """
+        path_bases = path_bases or gvars.PATH_BASES
+        arquivo_falhas = arquivo_falhas or os.path.join(path_bases, gvars.ARQUIVO_FALHAS)
+
+        if not falhas:
+            if os.path.exists(arquivo_falhas):
+                os.remove(arquivo_falhas)
+            return None
+
+        os.makedirs(os.path.dirname(arquivo_falhas) or '.', exist_ok=True)
+        falhas = pd.DataFrame(falhas)
+        if 'data_emissao' in falhas.columns:
+            # Grava a emissão no mesmo formato da base de entrada (dd/mm/aaaa), para que o
+            # reprocessamento não troque dia e mês ao ler o arquivo de volta como texto
+            falhas['data_emissao'] = [CotaCapital._formatar_emissao(v) for v in falhas['data_emissao']]
+        falhas.to_csv(arquivo_falhas, index=False, encoding='utf-8-sig')
+        logger.warning(f"{len(falhas)} contas com falha gravadas em {arquivo_falhas}")
+        return arquivo_falhas
 
     @staticmethod
-    def gerar_pdf(pdf_filename, row, PDF_CONFIG, base_dir):
+    def reprocessar_falhas(path_bases: str = None, modo: str = None, contas: pd.DataFrame = None) -> dict:
+        """
+        Gera novamente apenas os extratos das contas registradas no arquivo de falhas.
+        O arquivo é regravado somente com as contas que continuarem falhando, e o resumo da
+        execução (se existir) é atualizado com os extratos gerados no reprocessamento.
+
+        No modo consolidado, cada PDF de administradora com falhas é gerado novamente por inteiro
+        a partir da base consolidada, para que as contas corrigidas entrem no <administradora>.pdf
+        em vez de virarem PDFs individuais.
+
+        Parâmetros:
+        -----------
+        path_bases : str, opcional
+            Diretório base de saída. Por padrão, utiliza a variável global PATH_BASES.
+        modo : str, opcional
+            'individual' ou 'consolidado'. Por padrão, utiliza a variável global MODO_SAIDA.
+        contas : pd.DataFrame, opcional
+            Base consolidada, usada apenas no modo consolidado. Por padrão, a base em cache
+            (DataFrameBuilder.carregar_base).
+
+        Retorna:
+        --------
+        dict
+            Totais da execução, no mesmo formato de gerar_extratos_mensal.
+        """
+        path_bases = path_bases or gvars.PATH_BASES
+        modo = modo or gvars.MODO_SAIDA
+        arquivo_falhas = os.path.join(path_bases, gvars.ARQUIVO_FALHAS)
+        if not os.path.exists(arquivo_falhas):
+            logger.info("Nenhum arquivo de falhas encontrado para reprocessar.")
+            return {"gerados": 0, "falhas": 0, "arquivo_falhas": None, "resumo": None}
+
+        falhas = pd.read_csv(arquivo_falhas, dtype=str, encoding='utf-8-sig')
+        falhas = falhas.drop(columns=['erro'], errors='ignore')
+        anterior = ResumoExecucao.carregar(path_bases)
+
+        if modo == "consolidado":
+            if contas is None:
+                from src.data_management import DataFrameBuilder
+                contas = DataFrameBuilder.carregar_base()
+            grupos = CotaCapital._grupos_consolidados(falhas)
+            contas = contas[CotaCapital._grupos_consolidados(contas).isin(grupos)]
+            logger.info(f"Reprocessando {len(falhas)} contas com falha ({len(grupos)} PDFs consolidados, {len(contas)} contas).")
+            totais = CotaCapital.gerar_extratos_consolidados(contas, path_bases)
+            resumo = ResumoExecucao.descontar_reprocessamento(anterior, totais['resumo'], substituir=True)
+        else:
+            logger.info(f"Reprocessando {len(falhas)} contas com falha.")
+            totais = CotaCapital.gerar_extratos_mensal(falhas, path_bases)
+            resumo = ResumoExecucao.descontar_reprocessamento(anterior, totais['resumo'])
+
+        ResumoExecucao.salvar(resumo, path_bases)
+        return totais
+
+    @staticmethod
+    def _grupos_consolidados(accounts: pd.DataFrame) -> pd.MultiIndex:
+        # (agência com dois dígitos, administradora) de cada linha: a chave de cada PDF consolidado
+        return pd.MultiIndex.from_arrays([
+            ResumoExecucao.codigos_agencia(accounts),
+            accounts['administradora'].astype(object).fillna('').astype(str).to_numpy(),
+        ])
+
+    @staticmethod
+    def gerar_extratos_consolidados(accounts: pd.DataFrame, path_bases: str = None,
+                                    armazenamento: Armazenamento = None, arquivo_falhas: str = None) -> dict:
+        """
+        Gera um único PDF por administradora, com uma página por conta, em
+        PATH_BASES/UAXX/Extratos de Cota Capital/<administradora>.pdf.
+        Fontes e imagem de fundo são incluídas uma única vez por arquivo, e cada conta
+        recebe um marcador (bookmark) no sumário do PDF.
+
+        Erros em uma conta não interrompem o lote: a conta é registrada no arquivo de falhas
+        e não aparece no PDF consolidado. Se nenhuma conta de uma administradora for gerada,
+        o consolidado anterior dela é removido.
+
+        Parâmetros:
+        -----------
+        accounts : pd.DataFrame
+            DataFrame contendo os dados das contas e administradoras para geração dos extratos.
+        path_bases : str, opcional
+            Diretório base de saída. Por padrão, utiliza a variável global PATH_BASES.
+        armazenamento : Armazenamento, opcional
+            Destino dos PDFs. Por padrão, o destino configurado em ARMAZENAMENTO para path_bases.
+        arquivo_falhas : str, opcional
+            Caminho do arquivo de falhas. Por padrão, PATH_BASES/ARQUIVO_FALHAS.
+
+        Retorna:
+        --------
+        dict
+            Totais da execução, no mesmo formato de gerar_extratos_mensal.
+        """
+        path_bases = path_bases or gvars.PATH_BASES
+        armazenamento = armazenamento or Armazenamento.criar(path_bases)
+        accounts = accounts.reset_index(drop=True)
+        gerados = np.zeros(len(accounts), dtype=bool)
+        tamanhos = np.zeros(len(accounts), dtype=np.int64)
+        falhas = []
+        consolidados = {}
+
+        for (ag_valor, admin_key), grupo in accounts.groupby(['agência', 'administradora'], sort=False, dropna=False, observed=True):
+            try:
+                agencia = str(int(float(ag_valor))).zfill(2)
+            except (TypeError, ValueError) as e:
+                for _, row in grupo.iterrows():
+                    falha = row.to_dict()
+                    falha['erro'] = f"{type(e).__name__}: {e}"
+                    falhas.append(falha)
+                logger.error(f"Agência inválida '{ag_valor}' ({len(grupo)} contas): {e}")
+                continue
+
+            buffer = io.BytesIO()
+            c = CotaCapital.novo_canvas(buffer, PDF_CONFIG)
+            c.setTitle(f"Extratos de Cota Capital - {admin_key}")
+            c.showOutline()
+            paginas = 0
+            for posicao, row in grupo.iterrows():
+                try:
+                    CotaCapital.desenhar_extrato(c, row, PDF_CONFIG)
+                except Exception as e:
+                    logger.error(f"Erro ao gerar extrato da conta {row.get('conta', 'N/A')}: {type(e).__name__}: {e}")
+                    falha = row.to_dict()
+                    falha['erro'] = f"{type(e).__name__}: {e}"
+                    falhas.append(falha)
+                    continue
+                # A posição na base distingue contas repetidas dentro do mesmo consolidado
+                chave = f"conta_{posicao}"
+                c.bookmarkPage(chave)
+                c.addOutlineEntry(str(row['conta']), chave, level=0)
+                c.showPage()
+                gerados[posicao] = True
+                paginas += 1
+
+            destino = f"UA{agencia}/{PASTA_EXTRATOS}/{admin_key}.pdf"
+            if paginas:
+                c.save()
+                armazenamento.gravar(destino, buffer.getvalue())
+                consolidados[destino] = grupo.index[gerados[grupo.index]]
+                # O tamanho do consolidado fica na primeira conta gerada do grupo (o resumo soma por grupo)
+                tamanhos[grupo.index[gerados[grupo.index]][0]] = buffer.getbuffer().nbytes
+            else:
+                # Nenhuma conta gerada: o consolidado de uma execução anterior não vale mais
+                try:
+                    armazenamento.remover(destino)
+                except FileNotFoundError:
+                    pass
+            logger.info(f"Agência {agencia}: {paginas} contas geradas no consolidado de {admin_key}.")
+
+        # Consolidados que não chegaram ao caminho final: todas as contas do arquivo falharam
+        for destino, erro in armazenamento.confirmar().items():
+            for posicao in consolidados.get(destino, []):
+                gerados[posicao] = False
+                tamanhos[posicao] = 0
+                falha = accounts.iloc[posicao].to_dict()
+                falha['erro'] = erro
+                falhas.append(falha)
+        arquivo_falhas = CotaCapital.salvar_falhas(falhas, path_bases, arquivo_falhas)
+        logger.info(f"Extratos gerados: {int(gerados.sum())}. Falhas: {len(falhas)}.")
+
+        return {"gerados": int(gerados.sum()), "falhas": len(falhas), "arquivo_falhas": arquivo_falhas,
+                "resumo": ResumoExecucao.calcular(accounts, gerados, tamanhos)}
+
+    @staticmethod
+    def dividir_consolidado(pdf_consolidado: str, pasta_destino: str = None) -> list:
+        """
+        Divide um PDF consolidado em um PDF por conta, usando os marcadores gerados por
+        gerar_extratos_consolidados.
+
+        Parâmetros:
+        -----------
+        pdf_consolidado : str
+            Caminho do PDF consolidado da administradora.
+        pasta_destino : str, opcional
+            Pasta onde os PDFs individuais serão salvos. Por padrão, uma pasta com o nome
+            da administradora ao lado do consolidado (mesmo layout do modo individual).
+
+        Retorna:
+        --------
+        list
+            Caminhos dos PDFs individuais gerados.
+        """
+        pasta_destino = pasta_destino or os.path.splitext(pdf_consolidado)[0]
+        os.makedirs(pasta_destino, exist_ok=True)
+
+        reader = PdfReader(pdf_consolidado)
+        marcadores = [m for m in reader.outline if not isinstance(m, list)]
+        inicios = [reader.get_destination_page_number(m) for m in marcadores]
+        fins = inicios[1:] + [len(reader.pages)]
+
+        arquivos = []
+        for marcador, inicio, fim in zip(marcadores, inicios, fins):
+            writer = PdfWriter()
+            for pagina in range(inicio, fim):
+                writer.add_page(reader.pages[pagina])
+            pdf_filename = os.path.join(pasta_destino, f"{marcador.title}.pdf")
+            with open(pdf_filename, 'wb') as f:
+                writer.write(f)
+            arquivos.append(pdf_filename)
+
+        logger.info(f"{len(arquivos)} extratos extraídos de {pdf_consolidado}")
+        return arquivos
+
+    @staticmethod
+    def gerar_pdf(pdf_filename, row, PDF_CONFIG, base_dir, perfil: str = None):
         """
         Cria e salva o PDF do extrato detalhado de uma conta, incluindo cabeçalho, dados do associado,
         movimentações mensais, saldo anterior, saldo atual e informações de ouvidoria.
@@ -99,13 +516,223 @@ class CotaCapital():
             Dicionário com as configurações de layout e estilos do PDF.
         base_dir : str
             Diretório base do projeto para localização de recursos (ex: imagem de fundo).
+        perfil : str, opcional
+            Perfil de saída (chave de PERFIS_PDF). Padrão: variável global PERFIL_PDF.
+        """
+        c = CotaCapital.novo_canvas(pdf_filename, PDF_CONFIG, perfil)
+        CotaCapital.desenhar_extrato(c, row, PDF_CONFIG, perfil)
+        c.save()
+
+    @staticmethod
+    def novo_canvas(destino, PDF_CONFIG, perfil: str = None):
+        """
+        Cria um canvas para o destino (caminho ou buffer) com a compressão de página do perfil de saída.
+        Com ARMAZENAR_EXTRATOS, o PDF é gerado sem data de criação e identificador aleatório
+        (invariant), para que extratos idênticos tenham o mesmo hash no repositório.
+        """
+        _, config = CotaCapital.perfil_pdf(perfil)
+        return canvas.Canvas(destino, pagesize=PDF_CONFIG["pagesize"], pageCompression=config["compressao"],
+                             invariant=1 if gvars.ARMAZENAR_EXTRATOS else 0)
+
+    @staticmethod
+    def perfil_pdf(perfil: str = None) -> tuple:
+        """
+        Retorna o nome e a configuração do perfil de saída (PERFIS_PDF). Padrão: variável global PERFIL_PDF.
+        """
+        perfil = perfil or gvars.PERFIL_PDF
+        if perfil not in PERFIS_PDF:
+            raise ValueError(f"Perfil de PDF desconhecido: {perfil} (opções: {', '.join(PERFIS_PDF)})")
+        return perfil, PERFIS_PDF[perfil]
+
+    @staticmethod
+    def preparar_fundo(bg_path: str, perfil: str = None) -> tuple:
+        """
+        Prepara a imagem de fundo uma única vez por perfil e a mantém em memória. Por padrão, é
+        mantido um único ImageReader (API pública do ReportLab) já lido e decodificado, reutilizado
+        pelo drawImage em todos os PDFs do processo.
+
+        Com ativar_cache_fundo (serviço de extratos), a imagem é codificada (compressão e canal alfa)
+        uma única vez e cada novo PDF apenas recebe uma cópia do objeto já codificado. Essa cópia
+        depende de estruturas internas do ReportLab; se elas não forem compatíveis, o cache é
+        desativado com um aviso e o fundo volta ao drawImage com o ImageReader.
+
+        Nos perfis que reduzem o fundo (fundo_dpi ou fundo_jpeg), a imagem é composta sobre branco,
+        reduzida para a resolução máxima do perfil e recodificada em JPEG com a qualidade do perfil.
+
+        Parâmetros:
+        -----------
+        bg_path : str
+            Caminho da imagem de fundo.
+        perfil : str, opcional
+            Perfil de saída (chave de PERFIS_PDF). Padrão: variável global PERFIL_PDF.
+
+        Retorna:
+        --------
+        tuple ou None
+            (imagem, máscara) codificadas pelo ReportLab (a máscara pode ser None), ou None se o
+            cache entre documentos estiver desativado.
+        """
+        if not CotaCapital._fundo_em_cache:
+            CotaCapital._fonte_fundo(bg_path, perfil)
+            return None
+        perfil, config = CotaCapital.perfil_pdf(perfil)
+        with CotaCapital._fundos_lock:
+            preparado = CotaCapital._fundos.get((bg_path, perfil))
+            if preparado is None and CotaCapital._fundo_em_cache:
+                try:
+                    # O nome é o mesmo que o drawImage calcula para o arquivo original, em qualquer perfil
+                    nome = canvas._digester(f"{bg_path}auto".encode('utf-8'))
+                    if config["fundo_dpi"] or config["fundo_jpeg"]:
+                        imagem = pdfdoc.PDFImageXObject(nome, CotaCapital._reduzir_fundo(bg_path, config))
+                    else:
+                        imagem = pdfdoc.PDFImageXObject(nome, bg_path, mask='auto')
+                    imagem.name = nome
+                except Exception as e:
+                    CotaCapital._desativar_cache_fundo(e)
+                    return None
+                preparado = (imagem, getattr(imagem, '_smask', None))
+                CotaCapital._fundos[(bg_path, perfil)] = preparado
+        return preparado
+
+    @staticmethod
+    def ativar_cache_fundo():
+        """
+        Passa a copiar entre documentos a imagem de fundo já codificada (ver preparar_fundo). Usado
+        pelo serviço de extratos, que gera PDFs individuais sob demanda em um processo de longa duração.
+        """
+        CotaCapital._fundo_em_cache = True
+
+    @staticmethod
+    def _desativar_cache_fundo(erro: Exception):
+        CotaCapital._fundo_em_cache = False
+        logger.warning(
+            f"Cache da imagem de fundo desativado: ReportLab {reportlab.Version} incompatível "
+            f"({type(erro).__name__}: {erro}). O fundo será codificado em cada PDF."
+        )
+
+    @staticmethod
+    def _fonte_fundo(bg_path: str, perfil: str = None) -> ImageReader:
+        # Imagem passada ao drawImage sem o cache entre documentos: um ImageReader do arquivo original
+        # ou, nos perfis que reduzem o fundo, da imagem reduzida, lido uma única vez por perfil
+        perfil, config = CotaCapital.perfil_pdf(perfil)
+        with CotaCapital._fundos_lock:
+            chave = (bg_path, perfil, 'drawImage')
+            if chave not in CotaCapital._fundos:
+                if config["fundo_dpi"] or config["fundo_jpeg"]:
+                    imagem = CotaCapital._reduzir_fundo(bg_path, config)
+                else:
+                    imagem = ImageReader(bg_path)
+                # Decodifica antes do primeiro uso, para que as threads de geração apenas leiam a imagem
+                imagem.getRGBData()
+                imagem.getTransparent()
+                CotaCapital._fundos[chave] = imagem
+            return CotaCapital._fundos[chave]
+
+    @staticmethod
+    def _reduzir_fundo(bg_path: str, config: dict) -> ImageReader:
+        # Compõe o fundo sobre branco (a página é branca), limita a largura à resolução do perfil
+        # na largura da página e recodifica em JPEG (ou mantém RGB sem perdas)
+        with Image.open(bg_path) as original:
+            original = original.convert('RGBA')
+            imagem = Image.new('RGB', original.size, 'white')
+            imagem.paste(original, mask=original.getchannel('A'))
+
+        if config["fundo_dpi"]:
+            largura = round(PDF_CONFIG["pagesize"][0] / 72 * config["fundo_dpi"])
+            if largura < imagem.width:
+                altura = round(imagem.height * largura / imagem.width)
+                imagem = imagem.resize((largura, altura), Image.LANCZOS)
+
+        if not config["fundo_jpeg"]:
+            return ImageReader(imagem)
+        buffer = io.BytesIO()
+        imagem.save(buffer, 'JPEG', quality=config["fundo_jpeg"], optimize=True)
+        buffer.seek(0)
+        return ImageReader(buffer)
+
+    @staticmethod
+    def _registrar_fundo(c, bg_path: str, perfil: str = None) -> bool:
+        # Registra no documento uma cópia da imagem já codificada, com o mesmo nome que o
+        # drawImage calcula para o arquivo, para que ele reutilize a imagem em vez de recodificá-la.
+        # Retorna False se o cache estiver desativado (o chamador desenha com _fonte_fundo)
+        preparado = CotaCapital.preparar_fundo(bg_path, perfil)
+        if preparado is None:
+            return False
+        imagem, mascara = preparado
+        try:
+            reg_name = c._doc.getXObjectName(imagem.name)
+            if reg_name in c._doc.idToObject:
+                return True
+
+            copia = CotaCapital._copiar_xobject(imagem)
+            copia.__dict__.pop('_smask', None)
+            mascara_reg_name = c._doc.getXObjectName(mascara.name) if mascara is not None else None
+            c._setXObjects(copia)
+            c._doc.Reference(copia, reg_name)
+            c._doc.addForm(imagem.name, copia)
+        except Exception as e:
+            CotaCapital._desativar_cache_fundo(e)
+            return False
+        if mascara is not None:
+            if mascara_reg_name in c._doc.idToObject:
+                copia.smask = pdfdoc.PDFObjectReference(mascara_reg_name)
+            else:
+                mascara = CotaCapital._copiar_xobject(mascara)
+                c._setXObjects(mascara)
+                copia.smask = c._doc.Reference(mascara, mascara_reg_name)
+        return True
+
+    @staticmethod
+    def _copiar_xobject(xobject):
+        copia = pdfdoc.PDFImageXObject(xobject.name)
+        copia.__dict__.update({k: v for k, v in xobject.__dict__.items() if k != '__InternalName__'})
+        return copia
+
+    @staticmethod
+    def desenhar_extrato(c, row, PDF_CONFIG, perfil: str = None):
+        """
+        Desenha o extrato detalhado de uma conta na página atual do canvas, sem finalizar a página.
+        Utilizado tanto para o PDF individual quanto para o PDF consolidado por administradora.
+
+        Parâmetros:
+        -----------
+        c : reportlab.pdfgen.canvas.Canvas
+            Canvas onde o extrato será desenhado.
+        row : pd.Series
+            Linha do DataFrame com os dados da conta e movimentações.
+        PDF_CONFIG : dict
+            Dicionário com as configurações de layout e estilos do PDF.
+        perfil : str, opcional
+            Perfil de saída (chave de PERFIS_PDF) que define a imagem de fundo. Padrão: PERFIL_PDF.
         """
-        c = canvas.Canvas(pdf_filename, pagesize=PDF_CONFIG["pagesize"])
         width, height = PDF_CONFIG["pagesize"]
 
+        # Interpreta os dados da conta antes de desenhar, para que uma conta inválida
+        # não deixe uma página parcialmente desenhada no canvas
+
+        # Calcula o período: do primeiro ao último dia do mês anterior à data de emissão
+        data_emissao = CotaCapital.data_emissao(row['data_emissao'])
+        emissao_str = f"{data_emissao:%d/%m/%Y}"
+        primeiro_dia_mes_anterior = (data_emissao.replace(day=1) - pd.DateOffset(months=1)).replace(day=1)
+        ultimo_dia_mes_anterior = (data_emissao.replace(day=1) - pd.DateOffset(days=1))
+
+        capital_social = float(row['capital_social'])
+        movimentacao = float(row['movimentacao'])
+        if pd.isna(capital_social) or pd.isna(movimentacao):
+            raise ValueError("capital_social ou movimentacao ausente")
+
+        movimentacoes = row.get('tipo_valor_data_movimentacao', [])
+        if isinstance(movimentacoes, str):
+            movimentacoes = json.loads(movimentacoes) if movimentacoes.strip() not in ('', 'null', 'None') else []
+        elif not isinstance(movimentacoes, list):
+            movimentacoes = []  # None/NaN: conta sem movimentação no mês
+        movimentacoes = [(mov['data_transacao'], mov['tipo_movimento'], mov['valor_transacao']) for mov in movimentacoes]
+
         # Imagem background (ajustada para cobrir toda a folha A4)
         base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         bg_path = os.path.join(base_dir, "data", "img", "background.png")
+        if not CotaCapital._registrar_fundo(c, bg_path, perfil):
+            bg_path = CotaCapital._fonte_fundo(bg_path, perfil)
         c.drawImage(
             bg_path,
             0, 0,
@@ -143,15 +770,9 @@ class CotaCapital():
         c.drawString(PDF_CONFIG["margin_left"], y, f"CIDADE......: {row['municipio']} - SC")
     
         y -= PDF_CONFIG["line_spacing"]
-        # Calcula o período: do primeiro ao último dia do mês anterior à data de emissão
-
-        data_emissao = pd.to_datetime(row['data_emissao'], dayfirst=True)
-        primeiro_dia_mes_anterior = (data_emissao.replace(day=1) - pd.DateOffset(months=1)).replace(day=1)
-        ultimo_dia_mes_anterior = (data_emissao.replace(day=1) - pd.DateOffset(days=1))
-
         periodo_str = f"{primeiro_dia_mes_anterior:%d/%m/%Y} a {ultimo_dia_mes_anterior:%d/%m/%Y}"
         text = "{:<30}{:>90}".format(
-            f"PERIODO.....: {periodo_str}", f"EMISSAO: {row['data_emissao']}"
+            f"PERIODO.....: {periodo_str}", f"EMISSAO: {emissao_str}"
         )
         c.drawString(PDF_CONFIG["margin_left"], y, text)
 
@@ -191,8 +812,6 @@ class CotaCapital():
 
         # movimentações
         y -= PDF_CONFIG["line_spacing_line"]
-        capital_social = float(row['capital_social'])
-        movimentacao = float(row['movimentacao'])
         saldo_anterior = capital_social - movimentacao
         valor_saldo_mov = saldo_anterior
         saldo_anterior_str = f"{saldo_anterior:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
@@ -201,18 +820,10 @@ class CotaCapital():
         )
         c.drawString(PDF_CONFIG["margin_left"], y, first_line)
 
-        movimentacoes = row.get('tipo_valor_data_movimentacao', [])
-        if isinstance(movimentacoes, str):
-            movimentacoes = json.loads(movimentacoes)
-
         if movimentacoes:
             y -= PDF_CONFIG["line_spacing"]
             c.setFont(*PDF_CONFIG["body_font"])
-            for mov in movimentacoes:
-                data = mov['data_transacao']
-                tipo = mov['tipo_movimento']
-                valor = mov['valor_transacao']  # ou mov.get('valor_transacao')
-                # Agora você pode usar data, tipo e valor normalmente
+            for data, tipo, valor in movimentacoes:
                 try:
                     valor_float = float(valor)
                 except Exception:
@@ -247,7 +858,7 @@ class CotaCapital():
         y -= PDF_CONFIG["line_spacing"]
         c.setFont(*PDF_CONFIG["body_font"])
         c.setFillColor(PDF_CONFIG["body_color"])
-        valor_saldo_final = f"{float(row['capital_social']):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        valor_saldo_final = f"{capital_social:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
         resumo = "{:<30}{:<40}{:>17}{:<17}{:>23}".format(
             "", "", "", "SALDO ATUAL (R$):", f"{valor_saldo_final}"
         )
@@ -277,8 +888,6 @@ class CotaCapital():
         c.setFillColor(PDF_CONFIG["footer_color"])
         c.drawRightString(width - PDF_CONFIG["margin_left"], PDF_CONFIG["footer_y"], f"Sicredi Vale Litoral - SC")
 
-        c.save()
-
     @staticmethod
     def gerar_pdf2(pdf_filename, row, PDF_CONFIG, base_dir):
         """
@@ -359,7 +968,7 @@ class CotaCapital():
         y -= PDF_CONFIG["line_spacing"]
         c.drawString(PDF_CONFIG["margin_left"], y, f"Movimentação mensal: {row['movimentacao']}")
         y -= PDF_CONFIG["line_spacing"]
-        c.drawString(PDF_CONFIG["margin_left"], y, f"Data de Emissão: {row['data_emissao']}")
+        c.drawString(PDF_CONFIG["margin_left"], y, f"Data de Emissão: {CotaCapital.data_emissao(row['data_emissao']):%d/%m/%Y}")
 
         # Rodapé
         c.setFont(*PDF_CONFIG["footer_font"])
@@ -369,6 +978,8 @@ class CotaCapital():
         c.save()
 
 if __name__ == "__main__":
+    from src.data_management import DataFrameBuilder
+
     start_time = time.time()
     contas = DataFrameBuilder.create_cota_capital()
     CotaCapital.gerar_extratos_mensal(contas)
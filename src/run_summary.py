@@ -0,0 +1,276 @@
+import io
+import html
+import json
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from src.log import Logs
+from src.storage import Armazenamento
+import src.global_vars as gvars
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+# Este módulo monta o resumo de uma execução por agência e administradora: contas, extratos
+# gerados, falhas, soma do capital social e das movimentações dos extratos gerados, quantidade
+# de movimentações e bytes gravados. O resumo é calculado com um único groupby sobre a base e é
+# aditivo: os resumos parciais de cada worker (shards) ou de cada tarefa (intervalo de meses)
+# são somados por mesclar(). O resultado é gravado em CSV e JSON ao lado dos arquivos compactados
+# (ARQUIVO_RESUMO em PATH_BASES) e resumido no corpo do e-mail de aviso. O numpy e o pandas são
+# importados apenas nos métodos que os utilizam: a etapa de envio dos e-mails lê o resumo em JSON
+# (carregar_linhas) e monta o corpo sem eles.
+
+logger = Logs.load_log(__name__)
+
+CHAVE_RESUMO = ['agencia', 'administradora']
+COLUNAS_RESUMO = ['contas', 'gerados', 'falhas', 'capital_social', 'movimentacao', 'movimentos', 'bytes']
+
+
+class ResumoExecucao:
+    """
+    Resumo vetorizado da geração dos extratos por agência e administradora.
+
+    Métodos
+    -------
+    calcular(accounts: pd.DataFrame, gerados, tamanhos) -> pd.DataFrame
+        Calcula o resumo da base a partir das contas geradas e dos bytes de cada extrato.
+    codigos_agencia(accounts: pd.DataFrame) -> np.ndarray
+        Agência de cada linha com dois dígitos ('invalida' se não for numérica).
+    quantidade_movimentos(accounts: pd.DataFrame) -> np.ndarray
+        Quantidade de movimentações de cada linha.
+    mesclar(parciais: list) -> pd.DataFrame
+        Soma resumos parciais (shards, meses ou tarefas paralelas).
+    descontar_reprocessamento(anterior, reprocessado, substituir) -> pd.DataFrame
+        Atualiza o resumo de uma execução com o resultado do reprocessamento das falhas.
+    registrar_log(resumo: pd.DataFrame)
+        Registra no log as contas geradas por agência e administradora.
+    salvar(resumo: pd.DataFrame, path_bases, armazenamento) -> list
+        Grava o resumo em CSV e JSON ao lado dos arquivos compactados.
+    carregar(path_bases, armazenamento) -> pd.DataFrame ou None
+        Lê o resumo gravado por salvar.
+    carregar_linhas(path_bases, armazenamento) -> list ou None
+        Lê as linhas do resumo (JSON gravado por salvar), sem pandas.
+    corpo_email(resumo) -> str
+        Retorna a tabela HTML do resumo por agência para o e-mail de aviso.
+    """
+
+    @staticmethod
+    def calcular(accounts: 'pd.DataFrame', gerados, tamanhos=None) -> 'pd.DataFrame':
+        """
+        Parâmetros:
+        -----------
+        accounts : pd.DataFrame
+            Base processada (uma linha por extrato).
+        gerados : array-like de bool
+            Indica, na ordem das linhas, os extratos gerados com sucesso.
+        tamanhos : array-like de int, opcional
+            Bytes gravados por linha (0 nas falhas).
+
+        Retorna:
+        --------
+        pd.DataFrame
+            Resumo indexado por (agencia, administradora), com as colunas de COLUNAS_RESUMO.
+            Agências inválidas aparecem como 'invalida'.
+        """
+        import numpy as np
+        import pandas as pd
+
+        gerados = np.asarray(gerados, dtype=bool)
+        tamanhos = np.zeros(len(accounts), dtype=np.int64) if tamanhos is None else np.asarray(tamanhos, dtype=np.int64)
+
+        agencia = ResumoExecucao.codigos_agencia(accounts)
+        quantidade = ResumoExecucao.quantidade_movimentos(accounts)
+
+        valores = {}
+        for coluna in ('capital_social', 'movimentacao'):
+            serie = accounts[coluna] if coluna in accounts.columns else pd.Series(np.nan, index=accounts.index)
+            valores[coluna] = np.where(gerados, pd.to_numeric(serie.astype(object), errors='coerce').fillna(0.0), 0.0)
+
+        linhas = pd.DataFrame({
+            'agencia': agencia,
+            'administradora': accounts['administradora'].astype(object).fillna('').astype(str).to_numpy(),
+            'contas': 1,
+            'gerados': gerados.astype(np.int64),
+            'falhas': (~gerados).astype(np.int64),
+            'capital_social': valores['capital_social'],
+            'movimentacao': valores['movimentacao'],
+            'movimentos': np.where(gerados, quantidade, 0),
+            'bytes': tamanhos,
+        })
+        return linhas.groupby(CHAVE_RESUMO, sort=True).sum()[COLUNAS_RESUMO]
+
+    @staticmethod
+    def codigos_agencia(accounts: 'pd.DataFrame') -> 'np.ndarray':
+        """
+        Retorna a agência de cada linha com dois dígitos (ex: '01'), ou 'invalida' se não for numérica.
+        """
+        import pandas as pd
+
+        agencia = pd.to_numeric(accounts['agência'].astype(object), errors='coerce')
+        valida = agencia.notna() & (agencia % 1 == 0)
+        return agencia.where(valida).astype('Int64').astype(str).str.zfill(2).where(valida, 'invalida').to_numpy(dtype=object)
+
+    @staticmethod
+    def quantidade_movimentos(accounts: 'pd.DataFrame') -> 'np.ndarray':
+        """
+        Retorna a quantidade de movimentações de cada linha (0 se ilegíveis ou ausentes).
+        """
+        import numpy as np
+        from src.preflight import ValidacaoBase
+
+        if 'tipo_valor_data_movimentacao' not in accounts.columns:
+            return np.zeros(len(accounts), dtype=np.int64)
+        movimentos, _ = ValidacaoBase.expandir_movimentos(accounts)
+        return np.bincount(movimentos['_linha'], minlength=len(accounts))
+
+    @staticmethod
+    def mesclar(parciais: list) -> 'pd.DataFrame':
+        """
+        Soma os resumos parciais por (agencia, administradora). Resumos None são ignorados.
+        """
+        import pandas as pd
+
+        parciais = [p for p in parciais if p is not None]
+        if not parciais:
+            return ResumoExecucao._vazio()
+        return pd.concat(parciais).groupby(level=CHAVE_RESUMO, sort=True).sum()[COLUNAS_RESUMO]
+
+    @staticmethod
+    def descontar_reprocessamento(anterior: 'pd.DataFrame', reprocessado: 'pd.DataFrame',
+                                  substituir: bool = False) -> 'pd.DataFrame':
+        """
+        Atualiza o resumo da execução com o reprocessamento das falhas: as contas reprocessadas
+        já estavam contadas (como falhas) no resumo anterior, então só os extratos gerados e as
+        falhas mudam. Com substituir=True (reprocessamento de PDFs consolidados inteiros), as
+        linhas reprocessadas substituem as do resumo anterior.
+        """
+        if anterior is None:
+            return reprocessado
+        if substituir:
+            return ResumoExecucao.mesclar([anterior.drop(reprocessado.index, errors='ignore'), reprocessado])
+        resumo = ResumoExecucao.mesclar([anterior, reprocessado])
+        contas = reprocessado['contas'].reindex(resumo.index, fill_value=0)
+        resumo['contas'] -= contas
+        resumo['falhas'] -= contas
+        return resumo
+
+    @staticmethod
+    def registrar_log(resumo: 'pd.DataFrame'):
+        """
+        Registra no log, por agência, as contas geradas por administradora.
+        """
+        gerados = resumo['gerados'][resumo['gerados'] > 0]
+        for agencia, por_adm in gerados.groupby(level='agencia', sort=True):
+            admins_str = ", ".join(f"{adm}: {qtd}" for (_, adm), qtd in por_adm.items())
+            logger.info(f"Agência {agencia}: {int(por_adm.sum())} contas geradas. ({admins_str})")
+
+    @staticmethod
+    def salvar(resumo: 'pd.DataFrame', path_bases: str = None, armazenamento: Armazenamento = None) -> list:
+        """
+        Grava o resumo em <ARQUIVO_RESUMO>.csv (uma linha por agência/administradora) e
+        <ARQUIVO_RESUMO>.json (totais e linhas) na raiz de saída, ao lado dos arquivos compactados.
+
+        Parâmetros:
+        -----------
+        resumo : pd.DataFrame
+            Resumo calculado por calcular ou mesclar.
+        path_bases : str, opcional
+            Diretório base de saída. Por padrão, utiliza a variável global PATH_BASES.
+        armazenamento : Armazenamento, opcional
+            Destino dos arquivos. Por padrão, o destino configurado em ARMAZENAMENTO para path_bases.
+
+        Retorna:
+        --------
+        list
+            Caminhos gravados, relativos à raiz de saída.
+        """
+        armazenamento = armazenamento or Armazenamento.criar(path_bases or gvars.PATH_BASES)
+        linhas = resumo.reset_index()
+
+        csv = linhas.to_csv(index=False).encode('utf-8-sig')
+        documento = {
+            'gerado_em': datetime.now().isoformat(timespec='seconds'),
+            'totais': {coluna: ResumoExecucao._nativo(linhas[coluna].sum()) for coluna in COLUNAS_RESUMO},
+            'agencias': json.loads(linhas.to_json(orient='records', double_precision=2)),
+        }
+        arquivos = [f"{gvars.ARQUIVO_RESUMO}.csv", f"{gvars.ARQUIVO_RESUMO}.json"]
+        armazenamento.gravar(arquivos[0], csv)
+        armazenamento.gravar(arquivos[1], json.dumps(documento, ensure_ascii=False, indent=2).encode('utf-8'))
+        armazenamento.confirmar_ou_erro()
+        logger.info(f"Resumo da execução gravado em {', '.join(arquivos)}.")
+        return arquivos
+
+    @staticmethod
+    def carregar(path_bases: str = None, armazenamento: Armazenamento = None):
+        """
+        Lê o resumo gravado por salvar, ou retorna None se ele não existir.
+        """
+        conteudo = ResumoExecucao._ler(f"{gvars.ARQUIVO_RESUMO}.csv", path_bases, armazenamento)
+        if conteudo is None:
+            return None
+        import pandas as pd
+
+        linhas = pd.read_csv(io.BytesIO(conteudo), encoding='utf-8-sig', dtype={'agencia': str, 'administradora': str})
+        return linhas.set_index(CHAVE_RESUMO)[COLUNAS_RESUMO]
+
+    @staticmethod
+    def carregar_linhas(path_bases: str = None, armazenamento: Armazenamento = None):
+        """
+        Lê as linhas do resumo ({'agencia', 'administradora', 'contas', 'gerados', ...}) do JSON
+        gravado por salvar, sem importar o pandas, ou retorna None se ele não existir.
+        """
+        conteudo = ResumoExecucao._ler(f"{gvars.ARQUIVO_RESUMO}.json", path_bases, armazenamento)
+        if conteudo is None:
+            return None
+        return json.loads(conteudo)['agencias']
+
+    @staticmethod
+    def corpo_email(resumo) -> str:
+        """
+        Retorna uma tabela HTML com os extratos disponibilizados por agência e administradora,
+        a partir do resumo (DataFrame) ou das linhas lidas por carregar_linhas. Os nomes vindos
+        da base são escapados.
+        """
+        if not isinstance(resumo, list):
+            resumo = resumo.reset_index().to_dict('records')
+        gerados = [r for r in resumo if r['gerados'] > 0]
+        if not gerados:
+            return ""
+        linhas = "".join(
+            f"<tr><td>UA{html.escape(str(r['agencia']))}</td><td>{html.escape(str(r['administradora']))}</td><td align=\"right\">{int(r['gerados'])}</td></tr>"
+            for r in gerados
+        )
+        return (
+            "<table border=\"1\" cellpadding=\"4\" cellspacing=\"0\">"
+            "<tr><th>Agência</th><th>Administradora</th><th>Extratos</th></tr>"
+            f"{linhas}"
+            f"<tr><td colspan=\"2\"><b>Total</b></td><td align=\"right\"><b>{sum(int(r['gerados']) for r in gerados)}</b></td></tr>"
+            "</table>"
+        )
+
+    @staticmethod
+    def _ler(arquivo: str, path_bases: str = None, armazenamento: Armazenamento = None):
+        armazenamento = armazenamento or Armazenamento.criar(path_bases or gvars.PATH_BASES)
+        try:
+            return armazenamento.ler(arquivo)
+        except (FileNotFoundError, KeyError):
+            return None
+        except Exception as e:
+            # Clientes S3 sinalizam objeto inexistente com exceções próprias
+            if 'NoSuchKey' not in type(e).__name__ and 'NoSuchKey' not in str(e):
+                raise
+            return None
+
+    @staticmethod
+    def _vazio() -> 'pd.DataFrame':
+        import pandas as pd
+
+        indice = pd.MultiIndex.from_arrays([[], []], names=CHAVE_RESUMO)
+        return pd.DataFrame({coluna: pd.Series(dtype='int64') for coluna in COLUNAS_RESUMO}, index=indice)
+
+    @staticmethod
+    def _nativo(valor):
+        import numpy as np
+
+        return round(float(valor), 2) if isinstance(valor, (float, np.floating)) else int(valor)
@@ -0,0 +1,190 @@
+import os
+import json
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from src.log import Logs
+from src.run_summary import ResumoExecucao
+import src.global_vars as gvars
+
+# Este módulo planeja a divisão da base em shards para a geração distribuída (ver sharding.py).
+# O custo de geração de cada conta é estimado por um modelo linear na quantidade de movimentações
+# (custo fixo por conta + custo por movimentação), ajustado pelos tempos medidos dos shards das
+# execuções anteriores (PATH_HISTORICO_CUSTO). As contas são agrupadas por agência e administradora
+# (a unidade de cada arquivo compactado); grupos muito caros são divididos em partes menores, para
+# que nenhum worker fique com uma administradora pesada no final da execução. Os shards são então
+# distribuídos entre os workers pela regra LPT (longest processing time first): do mais caro para o
+# mais barato, cada shard vai para o worker com a menor carga estimada até o momento.
+
+logger = Logs.load_log(__name__)
+
+# Custo mínimo (em segundos estimados) de um shard; grupos mais baratos não são divididos
+CUSTO_MINIMO_SHARD = 5.0
+
+# Shards por worker desejados, para que sobre trabalho a ser redistribuído (roubado) no final
+SHARDS_POR_WORKER = 4
+
+
+class Escalonamento:
+    """
+    Estimativa de custo por conta e planejamento LPT dos shards.
+
+    Métodos
+    -------
+    coeficientes(path: str) -> tuple
+        Retorna (segundos por conta, segundos por movimentação), ajustados pelo histórico.
+    custos(contas: pd.DataFrame, coeficientes) -> np.ndarray
+        Estima o custo de geração de cada conta.
+    particionar(contas: pd.DataFrame, workers, coeficientes, custo_minimo) -> pd.DataFrame
+        Divide a base em shards por agência/administradora e os distribui entre os workers.
+    distribuir_lpt(custos, workers) -> np.ndarray
+        Atribui cada tarefa a um worker pela regra LPT.
+    registrar_historico(observacoes: list, path: str)
+        Acrescenta ao histórico os tempos medidos dos shards de uma execução.
+    """
+
+    @staticmethod
+    def coeficientes(path: str = None) -> tuple:
+        """
+        Ajusta, por mínimos quadrados sobre as observações do histórico (contas, movimentações e
+        segundos de cada shard concluído), o custo por conta e por movimentação. Sem histórico
+        suficiente, retorna os valores de CUSTO_CONTA_SEGUNDOS e CUSTO_MOVIMENTO_SEGUNDOS.
+
+        Retorna:
+        --------
+        tuple
+            (segundos por conta, segundos por movimentação).
+        """
+        padrao = (gvars.CUSTO_CONTA_SEGUNDOS, gvars.CUSTO_MOVIMENTO_SEGUNDOS)
+        historico = Escalonamento._ler_historico(path)
+        if len(historico) < 2:
+            return padrao
+
+        x = np.array([[o['contas'], o['movimentos']] for o in historico], dtype=float)
+        y = np.array([o['segundos'] for o in historico], dtype=float)
+        if np.linalg.matrix_rank(x) < 2:
+            # Sem variação na proporção de movimentações, só o custo por conta pode ser ajustado
+            return float(y.sum() / max(x[:, 0].sum(), 1.0)), padrao[1]
+
+        por_conta, por_movimento = np.linalg.lstsq(x, y, rcond=None)[0]
+        if por_conta <= 0 or por_movimento < 0:
+            return float(y.sum() / max(x[:, 0].sum(), 1.0)), padrao[1]
+        return float(por_conta), float(por_movimento)
+
+    @staticmethod
+    def custos(contas: pd.DataFrame, coeficientes: tuple = None) -> np.ndarray:
+        """
+        Retorna o custo estimado (em segundos) de cada conta, na ordem da base.
+        """
+        por_conta, por_movimento = coeficientes or Escalonamento.coeficientes()
+        return por_conta + por_movimento * ResumoExecucao.quantidade_movimentos(contas)
+
+    @staticmethod
+    def particionar(contas: pd.DataFrame, workers: int = None, coeficientes: tuple = None,
+                    custo_minimo: float = None) -> pd.DataFrame:
+        """
+        Planeja os shards da base.
+
+        Parâmetros:
+        -----------
+        contas : pd.DataFrame
+            Base consolidada.
+        workers : int, opcional
+            Quantidade de workers previstos. Padrão: variável global SHARD_WORKERS_PREVISTOS.
+        coeficientes : tuple, opcional
+            (segundos por conta, segundos por movimentação). Padrão: ajustados pelo histórico.
+        custo_minimo : float, opcional
+            Custo abaixo do qual um grupo não é dividido. Padrão: CUSTO_MINIMO_SHARD.
+
+        Retorna:
+        --------
+        pd.DataFrame
+            Um shard por linha, do mais caro para o mais barato, com 'agencia', 'administradora',
+            'parte', 'contas', 'movimentos', 'custo', 'slot' (worker previsto) e 'posicoes'
+            (posições das contas do shard na base).
+        """
+        workers = max(1, workers or gvars.SHARD_WORKERS_PREVISTOS)
+        custo_minimo = CUSTO_MINIMO_SHARD if custo_minimo is None else custo_minimo
+        coeficientes = coeficientes or Escalonamento.coeficientes()
+
+        linhas = pd.DataFrame({
+            'agencia': ResumoExecucao.codigos_agencia(contas),
+            'administradora': contas['administradora'].astype(object).fillna('').astype(str).to_numpy(),
+            'movimentos': ResumoExecucao.quantidade_movimentos(contas),
+        })
+        linhas['custo'] = coeficientes[0] + coeficientes[1] * linhas['movimentos']
+
+        # Grupos mais caros que a meta são divididos em partes contíguas de custo semelhante
+        meta = max(custo_minimo, linhas['custo'].sum() / (workers * SHARDS_POR_WORKER))
+        grupo = linhas.groupby(['agencia', 'administradora'], sort=False)
+        custo_grupo = grupo['custo'].transform('sum')
+        partes = np.maximum(1, np.ceil(custo_grupo / meta)).astype(np.int64)
+        acumulado = grupo['custo'].cumsum() - linhas['custo']
+        linhas['parte'] = np.minimum((acumulado / custo_grupo * partes).astype(np.int64), partes - 1)
+
+        shards = (
+            linhas.rename_axis('posicao').reset_index()
+            .groupby(['agencia', 'administradora', 'parte'], sort=False)
+            .agg(contas=('posicao', 'size'), movimentos=('movimentos', 'sum'), custo=('custo', 'sum'),
+                 posicoes=('posicao', list))
+            .reset_index()
+            .sort_values('custo', ascending=False, kind='stable', ignore_index=True)
+        )
+        shards['slot'] = Escalonamento.distribuir_lpt(shards['custo'].to_numpy(), workers)
+
+        carga = shards.groupby('slot')['custo'].sum()
+        logger.info(
+            f"{len(shards)} shards planejados para {workers} workers (custo estimado {linhas['custo'].sum():.1f} s, "
+            f"maior carga {carga.max():.1f} s, menor {carga.min():.1f} s)."
+        )
+        return shards
+
+    @staticmethod
+    def distribuir_lpt(custos, workers: int) -> np.ndarray:
+        """
+        Atribui cada tarefa (na ordem recebida, que deve ser decrescente de custo) ao worker com a
+        menor carga acumulada.
+
+        Retorna:
+        --------
+        np.ndarray
+            Índice do worker (0 a workers-1) de cada tarefa.
+        """
+        cargas = [(0.0, slot) for slot in range(max(1, workers))]
+        slots = np.zeros(len(custos), dtype=np.int64)
+        for posicao, custo in enumerate(custos):
+            carga, slot = heapq.heappop(cargas)
+            slots[posicao] = slot
+            heapq.heappush(cargas, (carga + float(custo), slot))
+        return slots
+
+    @staticmethod
+    def registrar_historico(observacoes: list, path: str = None):
+        """
+        Acrescenta ao histórico as observações {'contas', 'movimentos', 'segundos'} de uma execução,
+        mantendo apenas as HISTORICO_CUSTO_MAXIMO mais recentes.
+        """
+        observacoes = [o for o in observacoes if o.get('segundos') and o.get('contas')]
+        if not observacoes:
+            return
+        path = path or gvars.PATH_HISTORICO_CUSTO
+        historico = (Escalonamento._ler_historico(path) + observacoes)[-gvars.HISTORICO_CUSTO_MAXIMO:]
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temporario = f"{path}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(historico, f)
+        os.replace(temporario, path)
+
+    @staticmethod
+    def _ler_historico(path: str = None) -> list:
+        path = path or gvars.PATH_HISTORICO_CUSTO
+        if not os.path.exists(path):
+            return []
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Histórico de custos ilegível em {path}, usando os custos padrão: {e}")
+            return []
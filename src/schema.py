@@ -0,0 +1,130 @@
+import pandas as pd
+
+from src.log import Logs
+
+# Este módulo define o esquema de tipos da base consolidada de cota capital.
+# Logo após a ingestão, as colunas são convertidas para tipos mais econômicos em memória:
+# valores muito repetidos (administradora, município, agência) viram categorias, valores
+# monetários viram números de largura fixa e a data de emissão vira data. Colunas que não
+# são utilizadas pelos extratos, pelos e-mails ou pelos relatórios são descartadas.
+
+logger = Logs.load_log(__name__)
+
+# Colunas utilizadas pelos templates de extrato, e-mails e relatórios
+COLUNAS_UTILIZADAS = [
+    'conta',
+    'nome',
+    'endereco_completo',
+    'municipio',
+    'data_emissao',
+    'capital_social',
+    'movimentacao',
+    'tipo_valor_data_movimentacao',
+    'agência',
+    'administradora',
+    'email',
+]
+
+# Colunas buscadas no Databricks (as demais vêm do índice Excel)
+COLUNAS_DATABRICKS = [
+    'conta',
+    'nome',
+    'endereco_completo',
+    'municipio',
+    'data_emissao',
+    'capital_social',
+    'movimentacao',
+    'tipo_valor_data_movimentacao',
+]
+
+COLUNAS_CATEGORICAS = ['agência', 'administradora', 'municipio']
+COLUNAS_NUMERICAS = ['capital_social', 'movimentacao']
+COLUNAS_DATA = {'data_emissao': '%d/%m/%Y'}
+
+
+class BaseSchema:
+    """
+    Conversão de tipos e relatório de memória da base consolidada.
+
+    Métodos
+    -------
+    otimizar(df: pd.DataFrame) -> pd.DataFrame
+        Descarta colunas não utilizadas e converte as demais para tipos econômicos.
+    memoria(df: pd.DataFrame) -> pd.DataFrame
+        Retorna o uso de memória por coluna, em bytes.
+    """
+
+    @staticmethod
+    def otimizar(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Descarta as colunas não utilizadas e converte as demais para categorias, números de
+        largura fixa e datas, registrando no log o uso de memória antes e depois.
+
+        Colunas numéricas ou de data com valores inválidos são mantidas como texto, para que
+        o erro apareça na geração da conta (e no arquivo de falhas) com o valor original.
+
+        Parâmetros:
+        -----------
+        df : pd.DataFrame
+            Base consolidada gerada pelo merge entre contas e índice.
+
+        Retorna:
+        --------
+        pd.DataFrame
+            Base com os tipos otimizados.
+        """
+        memoria_antes = BaseSchema.memoria(df)['bytes'].sum()
+
+        colunas = [col for col in COLUNAS_UTILIZADAS if col in df.columns]
+        descartadas = [col for col in df.columns if col not in colunas]
+        df = df[colunas].copy()
+
+        for col in COLUNAS_NUMERICAS:
+            if col in df.columns:
+                convertido = pd.to_numeric(df[col], errors='coerce').astype('float64')
+                BaseSchema._aplicar_se_valido(df, col, convertido)
+
+        for col, formato in COLUNAS_DATA.items():
+            if col in df.columns:
+                convertido = pd.to_datetime(df[col], format=formato, errors='coerce')
+                if not BaseSchema._aplicar_se_valido(df, col, convertido):
+                    df[col] = df[col].astype('category')
+
+        for col in COLUNAS_CATEGORICAS:
+            if col in df.columns:
+                df[col] = df[col].astype('category')
+
+        memoria_depois = BaseSchema.memoria(df)['bytes'].sum()
+        logger.info(f"Colunas descartadas: {descartadas}")
+        logger.info(
+            f"Memória da base: {memoria_antes / 1024 ** 2:.2f} MB -> {memoria_depois / 1024 ** 2:.2f} MB "
+            f"({(1 - memoria_depois / max(memoria_antes, 1)) * 100:.1f}% de redução)"
+        )
+        return df
+
+    @staticmethod
+    def _aplicar_se_valido(df: pd.DataFrame, col: str, convertido: pd.Series) -> bool:
+        invalidos = convertido.isna() & df[col].notna()
+        if invalidos.any():
+            logger.warning(f"Coluna '{col}' possui {int(invalidos.sum())} valores inválidos e será mantida como texto.")
+            return False
+        df[col] = convertido
+        return True
+
+    @staticmethod
+    def memoria(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Retorna o uso de memória (profundo) e o tipo de cada coluna do DataFrame.
+
+        Parâmetros:
+        -----------
+        df : pd.DataFrame
+            DataFrame a ser medido.
+
+        Retorna:
+        --------
+        pd.DataFrame
+            DataFrame indexado pelo nome da coluna, com as colunas 'tipo' e 'bytes'.
+        """
+        uso = df.memory_usage(deep=True, index=False)
+        return pd.DataFrame({'tipo': df.dtypes.astype(str), 'bytes': uso})
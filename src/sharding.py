@@ -0,0 +1,580 @@
+import os
+import time
+import glob
+import shutil
+import socket
+import sqlite3
+from contextlib import closing
+import threading
+import multiprocessing
+import pandas as pd
+
+from src.log import Logs
+from src.scheduling import Escalonamento
+import src.global_vars as gvars
+
+# Este módulo permite distribuir a geração dos extratos entre várias máquinas (ou processos).
+# O coordenador divide a base consolidada em shards por agência e administradora (grupos muito caros
+# são divididos em partes), com o custo de cada shard estimado pela quantidade de movimentações e
+# pelos tempos medidos em execuções anteriores (ver scheduling.py). Os shards são registrados em uma
+# fila SQLite com reservas temporárias (leases) e distribuídos entre os workers pela regra LPT: cada
+# worker processa primeiro os shards mais caros da sua parte e, quando ela acaba, rouba os maiores
+# shards pendentes do worker com mais carga restante. Assim que todos os shards de uma administradora
+# são concluídos, o worker que concluiu o último gera o ZIP da administradora e registra a liberação
+# na fila, sem esperar o restante da execução. Ao final, o coordenador consolida os totais, as falhas
+# e os resumos de todos os shards. Para uso entre máquinas, a pasta de shards deve estar em um
+# compartilhamento de rede que suporte o travamento de arquivos exigido pelo SQLite.
+
+logger = Logs.load_log(__name__)
+
+# Colunas acrescentadas à fila pelo planejamento LPT (criadas também em filas de versões anteriores)
+COLUNAS_PLANEJAMENTO = {
+    'agencia': 'TEXT',
+    'administradora': 'TEXT',
+    'slot': 'INTEGER NOT NULL DEFAULT 0',
+    'custo': 'REAL NOT NULL DEFAULT 0',
+    'contas': 'INTEGER',
+    'movimentos': 'INTEGER',
+    'segundos': 'REAL',
+}
+
+
+class ShardQueue:
+    """
+    Fila de shards persistida em SQLite, com reservas temporárias (leases) por worker.
+    Um shard reservado cujo lease expira (ex: worker travado ou máquina desligada) volta
+    a ficar disponível para outro worker.
+
+    Métodos
+    -------
+    limpar()
+        Remove todos os shards e liberações da fila.
+    adicionar(shard_id, arquivo, agencia, administradora, slot, custo, contas, movimentos)
+        Registra um shard pendente na fila.
+    reservar(worker_id, lease_segundos, slot) -> dict ou None
+        Reserva o shard mais caro da parte do worker ou, se ela acabou, do worker com mais carga restante.
+    renovar(shard_id, worker_id, lease_segundos) -> bool
+        Estende o lease de um shard em processamento e indica se ele ainda pertence ao worker.
+    concluir(shard_id, worker_id, gerados, falhas, segundos) -> bool
+        Marca o shard como concluído e indica se a administradora do shard foi liberada.
+    registrar_liberacao(agencia, administradora, worker_id) -> bool
+        Registra a liberação de uma administradora, se ainda não registrada.
+    cancelar_liberacao(agencia, administradora)
+        Desfaz a liberação de uma administradora cujo arquivo não pôde ser gerado.
+    registrar_erro(shard_id, worker_id, erro)
+        Devolve o shard à fila ou o marca como erro ao atingir o máximo de tentativas.
+    listar() -> list
+        Retorna o estado de todos os shards.
+    liberadas() -> list
+        Retorna as administradoras já liberadas (arquivo gerado).
+    """
+
+    def __init__(self, path_db: str):
+        self.path_db = path_db
+        os.makedirs(os.path.dirname(path_db) or '.', exist_ok=True)
+        with closing(self._conectar()) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS shards (
+                    shard_id TEXT PRIMARY KEY,
+                    arquivo TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pendente',
+                    worker_id TEXT,
+                    lease_expira REAL,
+                    tentativas INTEGER NOT NULL DEFAULT 0,
+                    gerados INTEGER,
+                    falhas INTEGER,
+                    erro TEXT
+                )
+            """)
+            existentes = {linha['name'] for linha in conn.execute("PRAGMA table_info(shards)")}
+            for coluna, tipo in COLUNAS_PLANEJAMENTO.items():
+                if coluna not in existentes:
+                    conn.execute(f"ALTER TABLE shards ADD COLUMN {coluna} {tipo}")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS liberacoes (
+                    agencia TEXT NOT NULL,
+                    administradora TEXT NOT NULL,
+                    worker_id TEXT,
+                    liberado_em REAL NOT NULL,
+                    PRIMARY KEY (agencia, administradora)
+                )
+            """)
+
+    def _conectar(self):
+        conn = sqlite3.connect(self.path_db, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def limpar(self):
+        with closing(self._conectar()) as conn:
+            conn.execute("DELETE FROM shards")
+            conn.execute("DELETE FROM liberacoes")
+
+    def adicionar(self, shard_id: str, arquivo: str, agencia: str = None, administradora: str = None,
+                  slot: int = 0, custo: float = 0.0, contas: int = None, movimentos: int = None):
+        with closing(self._conectar()) as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO shards
+                    (shard_id, arquivo, status, tentativas, agencia, administradora, slot, custo, contas, movimentos)
+                VALUES (?, ?, 'pendente', 0, ?, ?, ?, ?, ?, ?)
+                """,
+                (shard_id, arquivo, agencia, administradora, slot, custo, contas, movimentos)
+            )
+
+    def reservar(self, worker_id: str, lease_segundos: int = gvars.SHARD_LEASE_SEGUNDOS, slot: int = None):
+        """
+        Reserva um shard pendente (ou com lease expirado) para o worker: o mais caro da sua parte
+        (slot) ou, se ela acabou, o mais caro do slot com mais carga restante (roubo de trabalho).
+        Sem slot, o worker sempre rouba do slot com mais carga restante.
+        A transação é IMMEDIATE para que dois workers nunca reservem o mesmo shard.
+
+        Shards com lease expirado que já atingiram SHARD_MAX_TENTATIVAS não são mais reservados;
+        na mesma transação, eles são marcados como erro, para que o coletor os reporte.
+
+        Retorna:
+        --------
+        dict ou None
+            Dados do shard reservado, ou None se não houver shards disponíveis.
+        """
+        conn = self._conectar()
+        try:
+            agora = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                """
+                UPDATE shards
+                SET status = 'erro', lease_expira = NULL,
+                    erro = COALESCE(erro, 'Lease expirado em todas as tentativas (worker interrompido).')
+                WHERE status = 'processando' AND lease_expira < ? AND tentativas >= ?
+                """,
+                (agora, gvars.SHARD_MAX_TENTATIVAS)
+            )
+            shard = conn.execute(
+                """
+                WITH restante AS (
+                    SELECT slot, SUM(custo) AS carga FROM shards
+                    WHERE status IN ('pendente', 'processando')
+                    GROUP BY slot
+                )
+                SELECT s.shard_id, s.arquivo, s.tentativas, s.agencia, s.administradora, s.slot, s.custo
+                FROM shards s LEFT JOIN restante r ON r.slot = s.slot
+                WHERE (s.status = 'pendente' OR (s.status = 'processando' AND s.lease_expira < ?))
+                  AND s.tentativas < ?
+                ORDER BY (s.slot = ?) DESC, r.carga DESC, s.custo DESC, s.shard_id
+                LIMIT 1
+                """,
+                (agora, gvars.SHARD_MAX_TENTATIVAS, -1 if slot is None else slot)
+            ).fetchone()
+            if shard is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                """
+                UPDATE shards SET status = 'processando', worker_id = ?, lease_expira = ?, tentativas = tentativas + 1
+                WHERE shard_id = ?
+                """,
+                (worker_id, agora + lease_segundos, shard['shard_id'])
+            )
+            conn.execute("COMMIT")
+            return dict(shard)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def renovar(self, shard_id: str, worker_id: str, lease_segundos: int = gvars.SHARD_LEASE_SEGUNDOS) -> bool:
+        with closing(self._conectar()) as conn:
+            return conn.execute(
+                "UPDATE shards SET lease_expira = ? WHERE shard_id = ? AND worker_id = ? AND status = 'processando'",
+                (time.time() + lease_segundos, shard_id, worker_id)
+            ).rowcount == 1
+
+    def concluir(self, shard_id: str, worker_id: str, gerados: int, falhas: int, segundos: float = None) -> bool:
+        """
+        Marca o shard como concluído. Na mesma transação, verifica se todos os shards da sua
+        administradora foram concluídos; nesse caso, registra a liberação, de modo que apenas o
+        worker que concluiu o último shard gere o arquivo da administradora.
+
+        Retorna:
+        --------
+        bool
+            True se este worker deve gerar o arquivo da administradora do shard.
+        """
+        conn = self._conectar()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            atualizado = conn.execute(
+                """
+                UPDATE shards SET status = 'concluido', gerados = ?, falhas = ?, segundos = ?, lease_expira = NULL, erro = NULL
+                WHERE shard_id = ? AND worker_id = ?
+                """,
+                (gerados, falhas, segundos, shard_id, worker_id)
+            ).rowcount
+            shard = conn.execute("SELECT agencia, administradora FROM shards WHERE shard_id = ?", (shard_id,)).fetchone()
+            liberada = False
+            if atualizado and shard is not None and shard['agencia'] is not None:
+                restantes = conn.execute(
+                    "SELECT COUNT(*) FROM shards WHERE agencia = ? AND administradora = ? AND status != 'concluido'",
+                    (shard['agencia'], shard['administradora'])
+                ).fetchone()[0]
+                if restantes == 0:
+                    liberada = conn.execute(
+                        "INSERT OR IGNORE INTO liberacoes (agencia, administradora, worker_id, liberado_em) VALUES (?, ?, ?, ?)",
+                        (shard['agencia'], shard['administradora'], worker_id, time.time())
+                    ).rowcount == 1
+            conn.execute("COMMIT")
+            return liberada
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def registrar_liberacao(self, agencia: str, administradora: str, worker_id: str) -> bool:
+        with closing(self._conectar()) as conn:
+            return conn.execute(
+                "INSERT OR IGNORE INTO liberacoes (agencia, administradora, worker_id, liberado_em) VALUES (?, ?, ?, ?)",
+                (agencia, administradora, worker_id, time.time())
+            ).rowcount == 1
+
+    def cancelar_liberacao(self, agencia: str, administradora: str):
+        with closing(self._conectar()) as conn:
+            conn.execute("DELETE FROM liberacoes WHERE agencia = ? AND administradora = ?", (agencia, administradora))
+
+    def registrar_erro(self, shard_id: str, worker_id: str, erro: str):
+        with closing(self._conectar()) as conn:
+            conn.execute(
+                """
+                UPDATE shards
+                SET status = CASE WHEN tentativas >= ? THEN 'erro' ELSE 'pendente' END,
+                    lease_expira = NULL, erro = ?
+                WHERE shard_id = ? AND worker_id = ?
+                """,
+                (gvars.SHARD_MAX_TENTATIVAS, erro, shard_id, worker_id)
+            )
+
+    def listar(self) -> list:
+        with closing(self._conectar()) as conn:
+            return [dict(r) for r in conn.execute("SELECT * FROM shards ORDER BY shard_id")]
+
+    def liberadas(self) -> list:
+        with closing(self._conectar()) as conn:
+            return [dict(r) for r in conn.execute("SELECT * FROM liberacoes ORDER BY liberado_em")]
+
+
+class Sharding:
+    """
+    Coordenação da geração distribuída por agência e administradora.
+
+    Métodos
+    -------
+    criar_shards(contas: pd.DataFrame, pasta_shards: str, workers: int) -> int
+        Divide a base em shards planejados por custo (LPT) e os registra na fila.
+    executar_worker(pasta_shards: str, path_bases: str, worker_id: str, slot: int) -> int
+        Processa shards da fila até que não haja mais shards disponíveis, liberando cada
+        administradora concluída.
+    coletar(pasta_shards: str, path_bases: str) -> dict
+        Consolida os totais, as falhas e os resumos de todos os shards.
+    executar_local(contas: pd.DataFrame, workers: int, pasta_shards: str, path_bases: str) -> dict
+        Executa coordenador e workers como processos na máquina local.
+    """
+
+    @staticmethod
+    def _fila(pasta_shards: str) -> ShardQueue:
+        return ShardQueue(os.path.join(pasta_shards, "fila.db"))
+
+    @staticmethod
+    def criar_shards(contas: pd.DataFrame, pasta_shards: str = None, workers: int = None) -> int:
+        """
+        Divide a base consolidada em shards por agência e administradora (grupos caros em partes),
+        distribui os shards entre os workers pela regra LPT e os registra na fila.
+
+        Parâmetros:
+        -----------
+        contas : pd.DataFrame
+            Base consolidada gerada por DataFrameBuilder.create_cota_capital.
+        pasta_shards : str, opcional
+            Pasta dos shards e da fila. Por padrão, utiliza a variável global PATH_SHARDS.
+        workers : int, opcional
+            Quantidade de workers previstos. Padrão: variável global SHARD_WORKERS_PREVISTOS.
+
+        Retorna:
+        --------
+        int
+            Quantidade de shards criados.
+        """
+        pasta_shards = pasta_shards or gvars.PATH_SHARDS
+        os.makedirs(pasta_shards, exist_ok=True)
+        fila = Sharding._fila(pasta_shards)
+
+        # Descarta shards, falhas, resumos e PDFs não publicados de uma execução anterior
+        fila.limpar()
+        anteriores = ["*.pkl", "*_falhas.csv", "*_resumo.csv", "*.tmp"]
+        for arquivo in [a for padrao in anteriores for a in glob.glob(os.path.join(pasta_shards, padrao))]:
+            os.remove(arquivo)
+        for pasta in glob.glob(os.path.join(pasta_shards, "*.pdfs")):
+            shutil.rmtree(pasta, ignore_errors=True)
+
+        # Agência inválida vira o shard 'UAinvalida_NNNN': as contas falharão na geração e irão
+        # para o arquivo de falhas
+        plano = Escalonamento.particionar(contas, workers)
+        for numero, shard in enumerate(plano.itertuples(index=False)):
+            shard_id = f"UA{shard.agencia}_{numero:04d}"
+            arquivo = os.path.join(pasta_shards, f"{shard_id}.pkl")
+            contas.iloc[shard.posicoes].to_pickle(arquivo)
+            fila.adicionar(shard_id, arquivo, shard.agencia, shard.administradora, int(shard.slot),
+                           float(shard.custo), int(shard.contas), int(shard.movimentos))
+
+        logger.info(f"{len(plano)} shards criados em {pasta_shards} para {len(contas)} contas.")
+        return len(plano)
+
+    @staticmethod
+    def executar_worker(pasta_shards: str = None, path_bases: str = None, worker_id: str = None, slot: int = None) -> int:
+        """
+        Reserva e processa shards da fila até que não haja mais shards disponíveis: primeiro os
+        mais caros da parte do worker (slot), depois os roubados dos workers com mais carga. O
+        lease é renovado periodicamente enquanto o shard está em processamento. Ao concluir o
+        último shard de uma administradora, o worker gera o ZIP da administradora.
+
+        Os PDFs, as falhas e o resumo do shard são gravados em arquivos temporários do worker (os
+        PDFs em '<shard>.<worker>.pdfs' na pasta de shards) e só são publicados em path_bases se o
+        shard ainda pertencer a ele ao final: um worker cujo lease expirou (e cujo shard foi
+        reservado por outro) descarta os seus resultados sem sobrescrever os do novo dono.
+
+        Parâmetros:
+        -----------
+        pasta_shards : str, opcional
+            Pasta dos shards e da fila. Por padrão, utiliza a variável global PATH_SHARDS.
+        path_bases : str, opcional
+            Diretório base de saída. Por padrão, utiliza a variável global PATH_BASES.
+        worker_id : str, opcional
+            Identificador do worker. Por padrão, '<hostname>-<pid>'.
+        slot : int, opcional
+            Parte da distribuição LPT atribuída ao worker (0 a workers-1). Sem slot, o worker
+            apenas rouba shards do slot com mais carga restante.
+
+        Retorna:
+        --------
+        int
+            Quantidade de shards processados por este worker.
+        """
+        from src.report_generator import CotaCapital
+        from src.storage import ArmazenamentoLocal
+
+        pasta_shards = pasta_shards or gvars.PATH_SHARDS
+        path_bases = path_bases or gvars.PATH_BASES
+        worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        fila = Sharding._fila(pasta_shards)
+        lease = gvars.SHARD_LEASE_SEGUNDOS
+
+        processados = 0
+        while True:
+            shard = fila.reservar(worker_id, lease, slot)
+            if shard is None:
+                break
+
+            shard_id = shard['shard_id']
+            origem = "" if slot is None or shard['slot'] == slot else f", roubado do slot {shard['slot']}"
+            logger.info(f"Worker {worker_id}: processando shard {shard_id} (tentativa {shard['tentativas'] + 1}{origem}).")
+
+            # Renova o lease em segundo plano enquanto o shard é processado
+            parar = threading.Event()
+            def renovar_lease():
+                while not parar.wait(lease / 3):
+                    fila.renovar(shard_id, worker_id, lease)
+            renovador = threading.Thread(target=renovar_lease, daemon=True)
+            renovador.start()
+
+            arquivos = {
+                nome: os.path.join(pasta_shards, f"{shard_id}_{nome}.csv") for nome in ('falhas', 'resumo')
+            }
+            temporarios = {nome: f"{arquivo}.{worker_id}.tmp" for nome, arquivo in arquivos.items()}
+            pasta_pdfs = os.path.join(pasta_shards, f"{shard_id}.{worker_id}.pdfs")
+            try:
+                inicio = time.perf_counter()
+                contas = pd.read_pickle(shard['arquivo'])
+                pdfs = ArmazenamentoLocal(pasta_pdfs)
+                totais = CotaCapital.gerar_extratos_mensal(contas, path_bases, arquivo_falhas=temporarios['falhas'],
+                                                           armazenamento=pdfs)
+                totais['resumo'].reset_index().to_csv(temporarios['resumo'], index=False, encoding='utf-8-sig')
+                segundos = time.perf_counter() - inicio
+
+                # Renovar e verificar a posse na mesma operação: com o lease estendido, nenhum
+                # outro worker reserva o shard antes da conclusão
+                if not fila.renovar(shard_id, worker_id, lease):
+                    logger.warning(f"Worker {worker_id}: lease do shard {shard_id} perdido; resultados descartados.")
+                    continue
+                Sharding._publicar(pdfs, path_bases)
+                for nome, arquivo in arquivos.items():
+                    if os.path.exists(temporarios[nome]):
+                        os.replace(temporarios[nome], arquivo)
+                    elif os.path.exists(arquivo):
+                        os.remove(arquivo)  # falhas de uma tentativa anterior
+                if fila.concluir(shard_id, worker_id, totais['gerados'], totais['falhas'], segundos):
+                    Sharding._liberar(fila, path_bases, shard['agencia'], shard['administradora'], worker_id)
+                processados += 1
+            except Exception as e:
+                logger.error(f"Worker {worker_id}: erro no shard {shard_id}: {e}")
+                fila.registrar_erro(shard_id, worker_id, f"{type(e).__name__}: {e}")
+            finally:
+                parar.set()
+                renovador.join()
+                for temporario in temporarios.values():
+                    if os.path.exists(temporario):
+                        os.remove(temporario)
+                shutil.rmtree(pasta_pdfs, ignore_errors=True)
+
+        logger.info(f"Worker {worker_id}: nenhum shard disponível, {processados} processados.")
+        return processados
+
+    @staticmethod
+    def _publicar(pdfs, path_bases: str):
+        # Copia os PDFs do shard para o destino configurado; uma falha em qualquer arquivo faz o
+        # shard ser tentado novamente
+        from src.storage import Armazenamento
+
+        caminhos = pdfs.listar()
+        destino = Armazenamento.criar(path_bases)
+        destino.preparar_pastas({c.rsplit('/', 1)[0] for c in caminhos if '/' in c})
+        for caminho in caminhos:
+            destino.gravar(caminho, pdfs.ler(caminho))
+        destino.confirmar_ou_erro()
+
+    @staticmethod
+    def _liberar(fila: ShardQueue, path_bases: str, agencia: str, administradora: str, worker_id: str):
+        # Gera o ZIP da administradora concluída; em caso de erro, a liberação é desfeita para que
+        # o coletor tente novamente
+        from src.storage import Armazenamento
+
+        if agencia == 'invalida':
+            return
+        try:
+            arquivo = Armazenamento.criar(path_bases).compactar_administradora(f"UA{agencia}", administradora)
+            logger.info(f"Worker {worker_id}: administradora concluída, arquivo {arquivo} liberado.")
+        except Exception as e:
+            logger.error(f"Worker {worker_id}: erro ao gerar o arquivo de UA{agencia}/{administradora}: {e}")
+            fila.cancelar_liberacao(agencia, administradora)
+
+    @staticmethod
+    def coletar(pasta_shards: str = None, path_bases: str = None) -> dict:
+        """
+        Consolida os totais de todos os shards e junta os arquivos de falhas de cada shard
+        em PATH_BASES/ARQUIVO_FALHAS, permitindo o uso de CotaCapital.reprocessar_falhas.
+        Gera os arquivos das administradoras concluídas que não foram liberadas pelos workers
+        e acrescenta os tempos medidos dos shards ao histórico de custos.
+
+        Parâmetros:
+        -----------
+        pasta_shards : str, opcional
+            Pasta dos shards e da fila. Por padrão, utiliza a variável global PATH_SHARDS.
+        path_bases : str, opcional
+            Diretório base de saída. Por padrão, utiliza a variável global PATH_BASES.
+
+        Retorna:
+        --------
+        dict
+            Totais consolidados: 'gerados', 'falhas', 'arquivo_falhas', além de 'shards',
+            'shards_pendentes' (shards não concluídos) e 'carga_workers' (segundos medidos por worker).
+        """
+        from src.report_generator import CotaCapital
+        from src.run_summary import ResumoExecucao, CHAVE_RESUMO
+
+        pasta_shards = pasta_shards or gvars.PATH_SHARDS
+        path_bases = path_bases or gvars.PATH_BASES
+        fila = Sharding._fila(pasta_shards)
+        shards = fila.listar()
+
+        pendentes = [s['shard_id'] for s in shards if s['status'] != 'concluido']
+        for s in shards:
+            if s['status'] == 'erro':
+                logger.error(f"Shard {s['shard_id']} falhou após {s['tentativas']} tentativas: {s['erro']}")
+
+        # Administradoras concluídas cujo arquivo não foi gerado pelo worker (ex: erro na compactação)
+        liberadas = {(l['agencia'], l['administradora']) for l in fila.liberadas()}
+        por_administradora = {}
+        for s in shards:
+            if s['agencia'] is not None:
+                por_administradora.setdefault((s['agencia'], s['administradora']), []).append(s['status'])
+        for (agencia, administradora), status in sorted(por_administradora.items()):
+            if (agencia, administradora) not in liberadas and all(st == 'concluido' for st in status):
+                if fila.registrar_liberacao(agencia, administradora, "coletor"):
+                    Sharding._liberar(fila, path_bases, agencia, administradora, "coletor")
+
+        concluidos = [s for s in shards if s['status'] == 'concluido' and s['segundos']]
+        Escalonamento.registrar_historico(
+            [{'contas': s['contas'], 'movimentos': s['movimentos'], 'segundos': s['segundos']} for s in concluidos]
+        )
+        carga = {}
+        for s in concluidos:
+            carga[s['worker_id']] = round(carga.get(s['worker_id'], 0.0) + s['segundos'], 2)
+        if carga:
+            logger.info("Carga medida por worker (s): " + ", ".join(f"{w}: {c}" for w, c in sorted(carga.items())))
+
+        arquivos_falhas = sorted(glob.glob(os.path.join(pasta_shards, "*_falhas.csv")))
+        falhas = [pd.read_csv(f, dtype=str, encoding='utf-8-sig') for f in arquivos_falhas]
+        falhas = pd.concat(falhas, ignore_index=True).to_dict('records') if falhas else []
+        arquivo_falhas = CotaCapital.salvar_falhas(falhas, path_bases)
+
+        # Resumos parciais gravados por cada worker, somados em um único resumo da execução
+        resumos = [
+            pd.read_csv(f, dtype={'agencia': str, 'administradora': str}, encoding='utf-8-sig').set_index(CHAVE_RESUMO)
+            for f in sorted(glob.glob(os.path.join(pasta_shards, "*_resumo.csv")))
+        ]
+        resumo = ResumoExecucao.mesclar(resumos)
+        ResumoExecucao.registrar_log(resumo)
+        ResumoExecucao.salvar(resumo, path_bases)
+
+        totais = {
+            "gerados": sum(s['gerados'] or 0 for s in shards),
+            "falhas": len(falhas),
+            "arquivo_falhas": arquivo_falhas,
+            "shards": len(shards),
+            "shards_pendentes": pendentes,
+            "carga_workers": carga,
+        }
+        logger.info(
+            f"Coleta dos shards: {totais['gerados']} extratos gerados, {totais['falhas']} falhas, "
+            f"{len(shards) - len(pendentes)}/{len(shards)} shards concluídos."
+        )
+        return totais
+
+    @staticmethod
+    def executar_local(contas: pd.DataFrame, workers: int = 2, pasta_shards: str = None, path_bases: str = None) -> dict:
+        """
+        Cria os shards, executa os workers como processos na máquina local e coleta os resultados.
+
+        Parâmetros:
+        -----------
+        contas : pd.DataFrame
+            Base consolidada gerada por DataFrameBuilder.create_cota_capital.
+        workers : int, opcional
+            Quantidade de processos worker. Padrão: 2.
+        pasta_shards : str, opcional
+            Pasta dos shards e da fila. Por padrão, utiliza a variável global PATH_SHARDS.
+        path_bases : str, opcional
+            Diretório base de saída. Por padrão, utiliza a variável global PATH_BASES.
+
+        Retorna:
+        --------
+        dict
+            Totais consolidados, no mesmo formato de coletar.
+        """
+        pasta_shards = pasta_shards or gvars.PATH_SHARDS
+        path_bases = path_bases or gvars.PATH_BASES
+        Sharding.criar_shards(contas, pasta_shards, workers)
+
+        processos = [
+            multiprocessing.Process(
+                target=Sharding.executar_worker,
+                args=(pasta_shards, path_bases, f"{socket.gethostname()}-local{i}", i)
+            )
+            for i in range(workers)
+        ]
+        for p in processos:
+            p.start()
+        for p in processos:
+            p.join()
+
+        return Sharding.coletar(pasta_shards, path_bases)
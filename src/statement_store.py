@@ -0,0 +1,273 @@
+import os
+import hashlib
+import sqlite3
+import zipfile
+from contextlib import closing
+from datetime import datetime
+
+from src.log import Logs
+import src.global_vars as gvars
+
+# Este módulo mantém um repositório local e indexado dos extratos gerados. Cada PDF é gravado
+# uma única vez em uma pasta de blobs endereçada pelo seu hash (SHA-256), e um índice SQLite
+# relaciona (conta, agência, administradora, mês de emissão) ao hash do arquivo. Assim, o extrato
+# de uma conta em um mês é localizado com uma única consulta, arquivos idênticos não são
+# duplicados e o ZIP de qualquer agência/administradora pode ser reconstruído sem gerar os PDFs
+# novamente.
+
+logger = Logs.load_log(__name__)
+
+
+class RepositorioExtratos:
+    """
+    Repositório de extratos com índice SQLite e blobs endereçados por conteúdo.
+
+    Métodos
+    -------
+    __init__(pasta)
+        Abre (ou cria) o repositório na pasta informada.
+    adicionar(conta, agencia, administradora, mes_emissao, conteudo) -> str
+        Armazena um extrato e retorna o hash do conteúdo.
+    adicionar_varios(registros, leitor) -> int
+        Armazena vários extratos em uma única transação.
+    buscar(conta, mes_emissao, agencia, administradora) -> list
+        Retorna os registros de uma conta, com o caminho do blob de cada um.
+    obter(conta, mes_emissao, agencia, administradora) -> bytes ou None
+        Retorna o conteúdo do extrato de uma conta em um mês.
+    listar(agencia, administradora, mes_emissao) -> list
+        Retorna os registros de uma agência/administradora em um mês.
+    reconstruir_arquivo(agencia, administradora, mes_emissao, destino) -> str
+        Recria o ZIP de uma agência/administradora a partir do repositório.
+    remover_orfaos() -> int
+        Remove os blobs que não são mais referenciados pelo índice.
+    """
+
+    def __init__(self, pasta: str = None):
+        """
+        Parâmetros:
+        -----------
+        pasta : str, opcional
+            Pasta do repositório (índice e blobs). Padrão: variável global PATH_REPOSITORIO.
+        """
+        self.pasta = pasta or gvars.PATH_REPOSITORIO
+        self.path_db = os.path.join(self.pasta, "extratos.sqlite")
+        self.pasta_blobs = os.path.join(self.pasta, "blobs")
+        os.makedirs(self.pasta_blobs, exist_ok=True)
+        with closing(self._conectar()) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS extratos (
+                    conta TEXT NOT NULL,
+                    agencia TEXT NOT NULL,
+                    administradora TEXT NOT NULL,
+                    mes_emissao TEXT NOT NULL,
+                    hash TEXT NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    gerado_em TEXT NOT NULL,
+                    PRIMARY KEY (conta, agencia, administradora, mes_emissao)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_extratos_conta ON extratos (conta, mes_emissao)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_extratos_arquivo ON extratos (agencia, administradora, mes_emissao)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_extratos_hash ON extratos (hash)")
+
+    def _conectar(self):
+        conn = sqlite3.connect(self.path_db, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def caminho_blob(self, hash_conteudo: str) -> str:
+        return os.path.join(self.pasta_blobs, hash_conteudo[:2], f"{hash_conteudo}.pdf")
+
+    def _gravar_blob(self, conteudo: bytes) -> str:
+        hash_conteudo = hashlib.sha256(conteudo).hexdigest()
+        caminho = self.caminho_blob(hash_conteudo)
+        if not os.path.exists(caminho):
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            temporario = f"{caminho}.{os.getpid()}.tmp"
+            with open(temporario, 'wb') as f:
+                f.write(conteudo)
+            os.replace(temporario, caminho)
+        return hash_conteudo
+
+    def adicionar(self, conta: str, agencia: str, administradora: str, mes_emissao: str, conteudo: bytes) -> str:
+        """
+        Armazena o extrato de uma conta, substituindo o registro anterior da mesma chave.
+
+        Parâmetros:
+        -----------
+        conta, agencia, administradora : str
+            Chave da conta (agência com dois dígitos, ex: '01').
+        mes_emissao : str
+            Mês de emissão no formato 'AAAA-MM'.
+        conteudo : bytes
+            Conteúdo do PDF.
+
+        Retorna:
+        --------
+        str
+            Hash SHA-256 do conteúdo.
+        """
+        registro = {'conta': conta, 'agencia': agencia, 'administradora': administradora,
+                    'mes_emissao': mes_emissao, 'conteudo': conteudo}
+        self.adicionar_varios([registro])
+        return registro['hash']
+
+    def adicionar_varios(self, registros: list, leitor=None) -> int:
+        """
+        Armazena vários extratos: grava os blobs ainda inexistentes e atualiza o índice em uma
+        única transação.
+
+        Parâmetros:
+        -----------
+        registros : list
+            Dicionários com 'conta', 'agencia', 'administradora', 'mes_emissao' e o conteúdo do
+            PDF em 'conteudo' (bytes) ou 'arquivo' (caminho). O hash calculado é incluído em
+            cada dicionário, na chave 'hash'.
+        leitor : callable, opcional
+            Função que recebe o valor de 'arquivo' e retorna o conteúdo (ex: Armazenamento.ler).
+            Por padrão, 'arquivo' é lido como caminho local.
+
+        Retorna:
+        --------
+        int
+            Quantidade de registros armazenados.
+        """
+        if not registros:
+            return 0
+
+        gerado_em = datetime.now().isoformat(timespec='seconds')
+        linhas = []
+        for registro in registros:
+            conteudo = registro.get('conteudo')
+            if conteudo is None and leitor is not None:
+                conteudo = leitor(registro['arquivo'])
+            elif conteudo is None:
+                with open(registro['arquivo'], 'rb') as f:
+                    conteudo = f.read()
+            registro['hash'] = self._gravar_blob(conteudo)
+            linhas.append((
+                str(registro['conta']), str(registro['agencia']), str(registro['administradora']),
+                str(registro['mes_emissao']), registro['hash'], len(conteudo), gerado_em
+            ))
+
+        with closing(self._conectar()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR REPLACE INTO extratos (conta, agencia, administradora, mes_emissao, hash, tamanho, gerado_em) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                linhas
+            )
+            conn.execute("COMMIT")
+        return len(linhas)
+
+    def buscar(self, conta: str, mes_emissao: str = None, agencia: str = None, administradora: str = None) -> list:
+        """
+        Retorna os registros de uma conta, do mais recente para o mais antigo mês de emissão.
+
+        Parâmetros:
+        -----------
+        conta : str
+            Número da conta.
+        mes_emissao, agencia, administradora : str, opcionais
+            Filtros adicionais da chave.
+
+        Retorna:
+        --------
+        list
+            Dicionários com os campos do índice e o caminho do blob em 'arquivo'.
+        """
+        filtros = {'conta': conta, 'mes_emissao': mes_emissao, 'agencia': agencia, 'administradora': administradora}
+        return self._consultar(filtros, "mes_emissao DESC")
+
+    def obter(self, conta: str, mes_emissao: str, agencia: str = None, administradora: str = None):
+        """
+        Retorna o conteúdo do extrato de uma conta em um mês de emissão, ou None se não existir.
+        """
+        registros = self.buscar(conta, mes_emissao, agencia, administradora)
+        if not registros:
+            return None
+        if len(registros) > 1:
+            logger.warning(f"Conta {conta} possui {len(registros)} extratos em {mes_emissao}; retornando o mais recente.")
+            registros.sort(key=lambda r: r['gerado_em'], reverse=True)
+        with open(registros[0]['arquivo'], 'rb') as f:
+            return f.read()
+
+    def listar(self, agencia: str, administradora: str, mes_emissao: str) -> list:
+        """
+        Retorna os registros de uma agência/administradora em um mês de emissão, ordenados por conta.
+        """
+        filtros = {'agencia': agencia, 'administradora': administradora, 'mes_emissao': mes_emissao}
+        return self._consultar(filtros, "conta")
+
+    def _consultar(self, filtros: dict, ordem: str) -> list:
+        filtros = {k: str(v) for k, v in filtros.items() if v is not None}
+        where = " AND ".join(f"{coluna} = ?" for coluna in filtros) or "1 = 1"
+        with closing(self._conectar()) as conn:
+            linhas = conn.execute(
+                f"SELECT * FROM extratos WHERE {where} ORDER BY {ordem}", tuple(filtros.values())
+            ).fetchall()
+        return [dict(linha, arquivo=self.caminho_blob(linha['hash'])) for linha in linhas]
+
+    def reconstruir_arquivo(self, agencia: str, administradora: str, mes_emissao: str, destino: str = None) -> str:
+        """
+        Recria o ZIP de uma agência/administradora (mesmo conteúdo gerado por FileManager.zip_agency_folder)
+        a partir dos extratos do repositório, sem gerar os PDFs novamente.
+
+        Parâmetros:
+        -----------
+        agencia : str
+            Agência com dois dígitos (ex: '01').
+        administradora : str
+            Nome da administradora.
+        mes_emissao : str
+            Mês de emissão no formato 'AAAA-MM'.
+        destino : str, opcional
+            Caminho do ZIP. Padrão: PATH_BASES/UAXX/Extratos de Cota Capital/<administradora>.zip.
+
+        Retorna:
+        --------
+        str
+            Caminho do ZIP gerado.
+        """
+        registros = self.listar(agencia, administradora, mes_emissao)
+        if not registros:
+            raise Exception(f"Nenhum extrato no repositório para UA{agencia}/{administradora} em {mes_emissao}.")
+
+        destino = destino or os.path.join(
+            gvars.PATH_BASES, f"UA{agencia}", "Extratos de Cota Capital", f"{administradora}.zip"
+        )
+        os.makedirs(os.path.dirname(destino) or '.', exist_ok=True)
+        temporario = os.path.join(os.path.dirname(destino), f".{os.path.basename(destino)}.{os.getpid()}.tmp")
+        try:
+            with zipfile.ZipFile(temporario, 'w', zipfile.ZIP_DEFLATED) as zipf:
+                for registro in registros:
+                    zipf.write(registro['arquivo'], f"{registro['conta']}.pdf")
+            os.replace(temporario, destino)
+        except BaseException:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+        logger.info(f"ZIP reconstruído com {len(registros)} extratos: {destino}")
+        return destino
+
+    def remover_orfaos(self) -> int:
+        """
+        Remove os blobs que não são referenciados por nenhum registro do índice
+        (ex: versões substituídas de um extrato).
+
+        Retorna:
+        --------
+        int
+            Quantidade de blobs removidos.
+        """
+        with closing(self._conectar()) as conn:
+            referenciados = {linha['hash'] for linha in conn.execute("SELECT DISTINCT hash FROM extratos")}
+
+        removidos = 0
+        for raiz, _, arquivos in os.walk(self.pasta_blobs):
+            for arquivo in arquivos:
+                if arquivo.endswith('.pdf') and arquivo[:-4] not in referenciados:
+                    os.remove(os.path.join(raiz, arquivo))
+                    removidos += 1
+        logger.info(f"{removidos} blobs órfãos removidos do repositório.")
+        return removidos
@@ -0,0 +1,460 @@
+import io
+import os
+import uuid
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.log import Logs
+import src.global_vars as gvars
+
+# Este módulo abstrai o destino dos arquivos gerados (PDFs e ZIPs dos extratos). Os caminhos são
+# sempre relativos à raiz de saída e separados por '/', por exemplo
+# 'UA01/Extratos de Cota Capital/<administradora>/<conta>.pdf', independentemente do sistema
+# operacional. Há dois destinos:
+#   - ArmazenamentoLocal: disco local (ou pasta sincronizada, como o OneDrive). A árvore de pastas
+#     é criada uma única vez antes do lote e cada arquivo é gravado em um arquivo temporário na
+#     mesma pasta e renomeado para o nome final somente após o fsync, feito em lotes. Assim, uma
+#     falha no meio do lote nunca deixa um PDF parcialmente gravado no caminho final.
+#   - ArmazenamentoS3: bucket compatível com S3 (AWS, MinIO), com envio dos objetos em lotes
+#     paralelos. O cliente pode ser injetado; por padrão é criado com boto3 (dependência opcional).
+#     ClienteS3Local simula um bucket em uma pasta local, para testes sem servidor.
+
+logger = Logs.load_log(__name__)
+
+PASTA_EXTRATOS = "Extratos de Cota Capital"
+
+
+class Armazenamento:
+    """
+    Interface comum dos destinos de saída.
+
+    Métodos
+    -------
+    criar(raiz: str, tipo: str) -> Armazenamento
+        Cria o destino configurado (variável global ARMAZENAMENTO) para a raiz de saída informada.
+    preparar_pastas(caminhos: list)
+        Cria de uma vez as pastas que receberão os arquivos (apenas no disco local).
+    gravar(caminho: str, conteudo: bytes)
+        Agenda a gravação de um arquivo; ele só fica visível no caminho final após confirmar().
+    confirmar() -> dict
+        Conclui as gravações pendentes; retorna os caminhos cuja gravação falhou (e o erro de cada um).
+    confirmar_ou_erro()
+        Conclui as gravações pendentes e lança OSError se alguma falhar.
+    ler(caminho: str) -> bytes
+        Retorna o conteúdo de um arquivo.
+    listar(prefixo: str) -> list
+        Lista os arquivos sob um prefixo (caminhos relativos à raiz).
+    remover(caminho: str)
+        Remove um arquivo.
+    compactar_agencia(pasta_agencia: str, delete_original: bool)
+        Gera um ZIP por administradora da agência (ex: 'UA01').
+    compactar_administradora(pasta_agencia: str, administradora: str, delete_original: bool) -> str
+        Gera o ZIP de uma única administradora da agência.
+    compactar_todas(delete_original: bool)
+        Gera os ZIPs de todas as agências.
+    """
+
+    @staticmethod
+    def criar(raiz: str = None, tipo: str = None) -> 'Armazenamento':
+        """
+        Parâmetros:
+        -----------
+        raiz : str, opcional
+            Raiz de saída local. Padrão: variável global PATH_BASES. Nos destinos S3, subpastas de
+            PATH_BASES (ex: a pasta de um mês) viram subprefixos de S3_PREFIXO.
+        tipo : str, opcional
+            'local', 's3' ou 's3_local'. Padrão: variável global ARMAZENAMENTO.
+        """
+        raiz = raiz or gvars.PATH_BASES
+        tipo = tipo or gvars.ARMAZENAMENTO
+        if tipo == 'local':
+            return ArmazenamentoLocal(raiz)
+
+        relativo = os.path.relpath(raiz, gvars.PATH_BASES) if gvars.PATH_BASES else '.'
+        partes = [gvars.S3_PREFIXO.strip('/')]
+        if relativo != '.' and not relativo.startswith('..'):
+            partes.append(relativo.replace(os.sep, '/'))
+        prefixo = '/'.join(p for p in partes if p)
+        if tipo == 's3':
+            return ArmazenamentoS3(gvars.S3_BUCKET, prefixo)
+        if tipo == 's3_local':
+            return ArmazenamentoS3(gvars.S3_BUCKET, prefixo, cliente=ClienteS3Local(gvars.PATH_S3_LOCAL))
+        raise ValueError(f"Tipo de armazenamento desconhecido: {tipo}")
+
+    def preparar_pastas(self, caminhos: list):
+        pass
+
+    def gravar(self, caminho: str, conteudo: bytes):
+        raise NotImplementedError
+
+    def confirmar(self) -> dict:
+        return {}
+
+    def confirmar_ou_erro(self):
+        falhas = self.confirmar()
+        if falhas:
+            caminho, erro = next(iter(falhas.items()))
+            raise OSError(f"{len(falhas)} arquivo(s) não gravado(s). Ex: {caminho}: {erro}")
+
+    def ler(self, caminho: str) -> bytes:
+        raise NotImplementedError
+
+    def listar(self, prefixo: str = '') -> list:
+        raise NotImplementedError
+
+    def remover(self, caminho: str):
+        raise NotImplementedError
+
+    def compactar_agencia(self, pasta_agencia: str, delete_original: bool = False) -> list:
+        """
+        Gera '<UAXX>/Extratos de Cota Capital/<administradora>.zip' com os PDFs de cada
+        administradora da agência (mesma estrutura de FileManager.zip_agency_folder). O PDF
+        consolidado '<administradora>.pdf' (MODO_SAIDA 'consolidado') entra no ZIP da administradora.
+
+        Retorna:
+        --------
+        list
+            Caminhos dos ZIPs gerados.
+        """
+        prefixo = f"{pasta_agencia}/{PASTA_EXTRATOS}/"
+        por_administradora = {}
+        for caminho in self.listar(prefixo):
+            partes = caminho[len(prefixo):].split('/')
+            if len(partes) >= 2:
+                por_administradora.setdefault(partes[0], []).append(caminho)
+            elif partes[0].endswith('.pdf'):
+                por_administradora.setdefault(partes[0][:-len('.pdf')], []).append(caminho)
+
+        gerados = [self._compactar(prefixo, administradora, arquivos) for administradora, arquivos in por_administradora.items()]
+        self.confirmar_ou_erro()
+
+        if delete_original:
+            for arquivos in por_administradora.values():
+                for caminho in arquivos:
+                    self.remover(caminho)
+        return gerados
+
+    def compactar_administradora(self, pasta_agencia: str, administradora: str, delete_original: bool = False) -> str:
+        """
+        Gera '<UAXX>/Extratos de Cota Capital/<administradora>.zip' com os PDFs de uma única
+        administradora (e o seu PDF consolidado, se houver), para que o arquivo seja liberado assim
+        que todas as suas contas forem geradas.
+
+        Retorna:
+        --------
+        str
+            Caminho do ZIP gerado.
+        """
+        prefixo = f"{pasta_agencia}/{PASTA_EXTRATOS}/"
+        consolidado = f"{prefixo}{administradora}.pdf"
+        arquivos = self.listar(f"{prefixo}{administradora}/") + [c for c in self.listar(consolidado) if c == consolidado]
+        destino = self._compactar(prefixo, administradora, arquivos)
+        self.confirmar_ou_erro()
+
+        if delete_original:
+            for caminho in arquivos:
+                self.remover(caminho)
+        return destino
+
+    def _compactar(self, prefixo: str, administradora: str, arquivos: list) -> str:
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            for caminho in sorted(arquivos):
+                # PDFs individuais ficam sem a pasta da administradora; o consolidado mantém o próprio nome
+                nome = caminho[len(prefixo):]
+                if nome.startswith(f"{administradora}/"):
+                    nome = nome[len(administradora) + 1:]
+                zipf.writestr(nome, self.ler(caminho))
+        destino = f"{prefixo}{administradora}.zip"
+        self.gravar(destino, buffer.getvalue())
+        return destino
+
+    def compactar_todas(self, delete_original: bool = False) -> list:
+        agencias = sorted({c.split('/', 1)[0] for c in self.listar('') if c.startswith('UA') and '/' in c})
+        gerados = []
+        for agencia in agencias:
+            gerados.extend(self.compactar_agencia(agencia, delete_original))
+        return gerados
+
+
+class ArmazenamentoLocal(Armazenamento):
+    """
+    Destino em disco local, com gravação atômica (arquivo temporário + rename) e fsync em lotes.
+    """
+
+    def __init__(self, raiz: str, lote_fsync: int = None):
+        """
+        Parâmetros:
+        -----------
+        raiz : str
+            Pasta raiz de saída (ex: PATH_BASES).
+        lote_fsync : int, opcional
+            Quantidade de arquivos pendentes que dispara a confirmação automática. Padrão: LOTE_FSYNC.
+        """
+        self.raiz = raiz or '.'
+        self.lote_fsync = lote_fsync or gvars.LOTE_FSYNC
+        self._pendentes = []
+        self._falhas = {}
+        self._pastas_criadas = set()
+        self._lock = threading.Lock()
+
+    def caminho_local(self, caminho: str) -> str:
+        return os.path.join(self.raiz, *caminho.split('/'))
+
+    def preparar_pastas(self, caminhos: list):
+        """
+        Cria as pastas (relativas à raiz) que receberão os arquivos, uma única vez por pasta.
+        """
+        for pasta in set(caminhos) - self._pastas_criadas:
+            os.makedirs(self.caminho_local(pasta), exist_ok=True)
+            self._pastas_criadas.add(pasta)
+
+    def gravar(self, caminho: str, conteudo: bytes):
+        pasta = caminho.rsplit('/', 1)[0] if '/' in caminho else ''
+        if pasta not in self._pastas_criadas:
+            self.preparar_pastas([pasta])
+
+        final = self.caminho_local(caminho)
+        # Nome único por gravação: o mesmo caminho pode ser gravado mais de uma vez no mesmo lote
+        temporario = os.path.join(os.path.dirname(final), f".{os.path.basename(final)}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+        f = open(temporario, 'wb', buffering=1024 * 1024)
+        try:
+            f.write(conteudo)
+            f.flush()
+        except Exception:
+            f.close()
+            os.remove(temporario)
+            raise
+
+        with self._lock:
+            self._pendentes.append((f, temporario, final, caminho))
+            confirmar = len(self._pendentes) >= self.lote_fsync
+        if confirmar:
+            self._confirmar_pendentes()
+
+    def confirmar(self) -> dict:
+        """
+        Sincroniza em disco (fsync) cada arquivo temporário pendente e o renomeia para o caminho
+        final; em seguida sincroniza as pastas alteradas (quando o sistema permite). A falha de um
+        arquivo não afeta os demais.
+
+        Retorna:
+        --------
+        dict
+            Caminho -> mensagem de erro dos arquivos que não foram gravados desde a última chamada,
+            inclusive nas confirmações automáticas disparadas por gravar().
+        """
+        self._confirmar_pendentes()
+        with self._lock:
+            falhas, self._falhas = self._falhas, {}
+        return falhas
+
+    def _confirmar_pendentes(self):
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, []
+        if not pendentes:
+            return
+
+        pastas = set()
+        falhas = {}
+        for f, temporario, final, caminho in pendentes:
+            try:
+                try:
+                    os.fsync(f.fileno())
+                finally:
+                    f.close()
+                os.replace(temporario, final)
+                pastas.add(os.path.dirname(final))
+            except Exception as e:
+                logger.error(f"Erro ao gravar {caminho}: {type(e).__name__}: {e}")
+                falhas[caminho] = f"{type(e).__name__}: {e}"
+                if os.path.exists(temporario):
+                    os.remove(temporario)
+
+        if hasattr(os, 'O_DIRECTORY'):
+            for pasta in pastas:
+                fd = os.open(pasta, os.O_RDONLY | os.O_DIRECTORY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+        if falhas:
+            with self._lock:
+                self._falhas.update(falhas)
+
+    def ler(self, caminho: str) -> bytes:
+        with open(self.caminho_local(caminho), 'rb') as f:
+            return f.read()
+
+    def listar(self, prefixo: str = '') -> list:
+        caminhos = []
+        for raiz, _, arquivos in os.walk(self.raiz):
+            for arquivo in arquivos:
+                if arquivo.endswith('.tmp'):
+                    continue
+                relativo = os.path.relpath(os.path.join(raiz, arquivo), self.raiz).replace(os.sep, '/')
+                if relativo.startswith(prefixo):
+                    caminhos.append(relativo)
+        return sorted(caminhos)
+
+    def remover(self, caminho: str):
+        os.remove(self.caminho_local(caminho))
+
+    def compactar_agencia(self, pasta_agencia: str, delete_original: bool = False) -> list:
+        from src.file_management import FileManager
+
+        FileManager.zip_agency_folder(self.raiz, pasta_agencia, delete_original=delete_original)
+        pasta = os.path.join(self.raiz, pasta_agencia, PASTA_EXTRATOS)
+        return sorted(f"{pasta_agencia}/{PASTA_EXTRATOS}/{z}" for z in os.listdir(pasta) if z.endswith('.zip'))
+
+    def compactar_administradora(self, pasta_agencia: str, administradora: str, delete_original: bool = False) -> str:
+        from src.file_management import FileManager
+
+        pasta = os.path.join(self.raiz, pasta_agencia, PASTA_EXTRATOS)
+        consolidado = FileManager.list_consolidated(pasta).get(administradora)
+        FileManager.zip_folder(os.path.join(pasta, administradora), os.path.join(pasta, f"{administradora}.zip"),
+                               delete_original=delete_original, extra_files=[consolidado] if consolidado else None)
+        return f"{pasta_agencia}/{PASTA_EXTRATOS}/{administradora}.zip"
+
+    def compactar_todas(self, delete_original: bool = False) -> list:
+        from src.file_management import FileManager
+
+        FileManager.zip_all_folders(self.raiz, delete_original=delete_original)
+        return [c for c in self.listar('') if c.endswith('.zip')]
+
+
+class ArmazenamentoS3(Armazenamento):
+    """
+    Destino em bucket compatível com S3. Os objetos são enviados em lotes paralelos; cada
+    put_object é atômico, então não há objetos parcialmente gravados.
+    """
+
+    def __init__(self, bucket: str, prefixo: str = '', cliente=None, lote: int = None, max_paralelo: int = 8):
+        """
+        Parâmetros:
+        -----------
+        bucket : str
+            Nome do bucket.
+        prefixo : str, opcional
+            Prefixo das chaves (equivalente à raiz de saída).
+        cliente : opcional
+            Cliente com a interface do boto3 (put_object, get_object, list_objects_v2, delete_object).
+            Por padrão, boto3.client('s3') com o endpoint S3_ENDPOINT (ex: MinIO), se informado.
+        lote : int, opcional
+            Quantidade de objetos pendentes que dispara o envio. Padrão: LOTE_FSYNC.
+        max_paralelo : int, opcional
+            Envios simultâneos. Padrão: 8.
+        """
+        if cliente is None:
+            import boto3
+            cliente = boto3.client('s3', endpoint_url=gvars.S3_ENDPOINT or None)
+        self.cliente = cliente
+        self.bucket = bucket
+        self.prefixo = prefixo.strip('/')
+        self.lote = lote or gvars.LOTE_FSYNC
+        self.max_paralelo = max_paralelo
+        self._pendentes = []
+        self._falhas = {}
+        self._lock = threading.Lock()
+
+    def _chave(self, caminho: str) -> str:
+        return f"{self.prefixo}/{caminho}" if self.prefixo else caminho
+
+    def gravar(self, caminho: str, conteudo: bytes):
+        with self._lock:
+            self._pendentes.append((caminho, conteudo))
+            confirmar = len(self._pendentes) >= self.lote
+        if confirmar:
+            self._confirmar_pendentes()
+
+    def confirmar(self) -> dict:
+        """
+        Envia os objetos pendentes. Retorna caminho -> mensagem de erro dos objetos não enviados
+        desde a última chamada (inclusive nos envios automáticos disparados por gravar()).
+        """
+        self._confirmar_pendentes()
+        with self._lock:
+            falhas, self._falhas = self._falhas, {}
+        return falhas
+
+    def _confirmar_pendentes(self):
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, []
+        if not pendentes:
+            return
+        falhas = {}
+        with ThreadPoolExecutor(max_workers=self.max_paralelo) as executor:
+            futuros = [(caminho, executor.submit(self.cliente.put_object, Bucket=self.bucket, Key=self._chave(caminho), Body=conteudo))
+                       for caminho, conteudo in pendentes]
+            for caminho, futuro in futuros:
+                try:
+                    futuro.result()
+                except Exception as e:
+                    logger.error(f"Erro ao enviar {caminho}: {type(e).__name__}: {e}")
+                    falhas[caminho] = f"{type(e).__name__}: {e}"
+        if falhas:
+            with self._lock:
+                self._falhas.update(falhas)
+
+    def ler(self, caminho: str) -> bytes:
+        return self.cliente.get_object(Bucket=self.bucket, Key=self._chave(caminho))['Body'].read()
+
+    def listar(self, prefixo: str = '') -> list:
+        inicio = len(self.prefixo) + 1 if self.prefixo else 0
+        caminhos = []
+        argumentos = {'Bucket': self.bucket, 'Prefix': self._chave(prefixo)}
+        while True:
+            resposta = self.cliente.list_objects_v2(**argumentos)
+            caminhos.extend(obj['Key'][inicio:] for obj in resposta.get('Contents', []))
+            if not resposta.get('IsTruncated'):
+                break
+            argumentos['ContinuationToken'] = resposta['NextContinuationToken']
+        return sorted(caminhos)
+
+    def remover(self, caminho: str):
+        self.cliente.delete_object(Bucket=self.bucket, Key=self._chave(caminho))
+
+
+class ClienteS3Local:
+    """
+    Cliente que simula um bucket S3 (no estilo do MinIO) em uma pasta local, com a mesma
+    interface do boto3 usada por ArmazenamentoS3. Cada objeto é um arquivo em <pasta>/<bucket>/<chave>.
+    """
+
+    def __init__(self, pasta: str):
+        self.pasta = pasta
+
+    def _arquivo(self, bucket: str, chave: str) -> str:
+        return os.path.join(self.pasta, bucket, *chave.split('/'))
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes):
+        destino = self._arquivo(Bucket, Key)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        temporario = f"{destino}.{threading.get_ident()}.tmp"
+        with open(temporario, 'wb') as f:
+            f.write(Body)
+        os.replace(temporario, destino)
+        return {}
+
+    def get_object(self, Bucket: str, Key: str) -> dict:
+        with open(self._arquivo(Bucket, Key), 'rb') as f:
+            return {'Body': io.BytesIO(f.read())}
+
+    def list_objects_v2(self, Bucket: str, Prefix: str = '', **kwargs) -> dict:
+        raiz = os.path.join(self.pasta, Bucket)
+        chaves = []
+        for pasta, _, arquivos in os.walk(raiz):
+            for arquivo in arquivos:
+                if arquivo.endswith('.tmp'):
+                    continue
+                chave = os.path.relpath(os.path.join(pasta, arquivo), raiz).replace(os.sep, '/')
+                if chave.startswith(Prefix):
+                    chaves.append(chave)
+        return {'Contents': [{'Key': chave} for chave in sorted(chaves)], 'IsTruncated': False}
+
+    def delete_object(self, Bucket: str, Key: str):
+        arquivo = self._arquivo(Bucket, Key)
+        if os.path.exists(arquivo):
+            os.remove(arquivo)
+        return {}
@@ -0,0 +1,50 @@
+import os
+import json
+
+import pandas as pd
+import pytest
+
+import src.global_vars as gvars
+from src.fake_databricks import FakeDatabricks
+from src.schema import BaseSchema
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIMULACAO = os.path.join(RAIZ, 'docs', 'simulacao_retorno.json')
+
+
+def carregar_simulacao() -> pd.DataFrame:
+    """
+    Base de exemplo (docs/simulacao_retorno.json) no formato do merge entre contas e índice.
+    """
+    with open(SIMULACAO, encoding='utf-8') as f:
+        documento = json.load(f)
+    colunas = [c['name'] for c in documento['manifest']['schema']['columns']]
+    base = pd.DataFrame(documento['result']['data_array'], columns=colunas).rename(columns={'agencia': 'agência'})
+    base['administradora'] = 'ADM TESTE'
+    base['email'] = 'sindico@example.com'
+    return base
+
+
+@pytest.fixture
+def base_simulacao() -> pd.DataFrame:
+    return BaseSchema.otimizar(carregar_simulacao())
+
+
+@pytest.fixture
+def path_bases(tmp_path, monkeypatch):
+    monkeypatch.chdir(RAIZ)
+    monkeypatch.setattr(gvars, 'PATH_BASES', str(tmp_path))
+    monkeypatch.setattr(gvars, 'ARMAZENAMENTO', 'local')
+    return str(tmp_path)
+
+
+@pytest.fixture
+def databricks(monkeypatch):
+    """
+    Servidor local da API de statements (FakeDatabricks) configurado em DATABRICKS_ENDPOINT.
+    """
+    fake = FakeDatabricks(atraso=0)
+    monkeypatch.setattr(gvars, 'DATABRICKS_ENDPOINT', fake.iniciar())
+    monkeypatch.setattr(gvars, 'DATABRICKS_ESPERA_SEGUNDOS', 0.01)
+    yield fake
+    fake.parar()
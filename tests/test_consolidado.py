@@ -0,0 +1,90 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+import src.global_vars as gvars
+from src.report_generator import CotaCapital
+from src.run_summary import ResumoExecucao
+from src.storage import PASTA_EXTRATOS, Armazenamento
+
+pypdf = pytest.importorskip('pypdf')
+
+
+def _consolidado(path_bases, contas):
+    agencia = str(contas['agência'].iloc[0]).zfill(2)
+    return os.path.join(path_bases, f"UA{agencia}", PASTA_EXTRATOS, f"{contas['administradora'].iloc[0]}.pdf")
+
+
+def test_reprocessamento_consolidado_regera_o_pdf_da_administradora(base_simulacao, path_bases, monkeypatch):
+    contas = base_simulacao[base_simulacao['agência'] == base_simulacao['agência'].iloc[0]].head(3)
+    desenhar = CotaCapital.desenhar_extrato
+    conta_com_falha = contas['conta'].iloc[1]
+
+    def falhar_uma(c, row, PDF_CONFIG, perfil=None):
+        if row['conta'] == conta_com_falha:
+            raise OSError("fonte indisponível")
+        return desenhar(c, row, PDF_CONFIG, perfil)
+
+    with monkeypatch.context() as m:
+        m.setattr(CotaCapital, 'desenhar_extrato', staticmethod(falhar_uma))
+        totais = CotaCapital.gerar_extratos_consolidados(contas, path_bases)
+    ResumoExecucao.salvar(totais['resumo'], path_bases)
+    assert len(pypdf.PdfReader(_consolidado(path_bases, contas)).pages) == 2
+
+    totais = CotaCapital.reprocessar_falhas(path_bases, modo='consolidado', contas=contas)
+    assert totais['falhas'] == 0
+    assert not os.path.exists(os.path.join(path_bases, gvars.ARQUIVO_FALHAS))
+
+    reader = pypdf.PdfReader(_consolidado(path_bases, contas))
+    assert len(reader.pages) == 3
+    assert [m.title for m in reader.outline] == contas['conta'].tolist()
+    arquivos = [a for _, _, nomes in os.walk(path_bases) for a in nomes if a.endswith('.pdf')]
+    assert len(arquivos) == 1
+
+    resumo = ResumoExecucao.carregar(path_bases)
+    assert int(resumo['gerados'].sum()) == 3 and int(resumo['falhas'].sum()) == 0
+
+
+def test_contas_repetidas_tem_marcadores_distintos(base_simulacao, path_bases):
+    contas = base_simulacao.head(1)
+    contas = contas.loc[contas.index.repeat(2)]
+    CotaCapital.gerar_extratos_consolidados(contas, path_bases)
+
+    reader = pypdf.PdfReader(_consolidado(path_bases, contas))
+    assert [reader.get_destination_page_number(m) for m in reader.outline] == [0, 1]
+
+
+def test_consolidado_sem_paginas_remove_o_anterior(base_simulacao, path_bases, monkeypatch):
+    contas = base_simulacao[base_simulacao['agência'] == base_simulacao['agência'].iloc[0]].head(2)
+    CotaCapital.gerar_extratos_consolidados(contas, path_bases)
+    assert os.path.exists(_consolidado(path_bases, contas))
+
+    def falhar(c, row, PDF_CONFIG, perfil=None):
+        raise OSError("fonte indisponível")
+
+    monkeypatch.setattr(CotaCapital, 'desenhar_extrato', staticmethod(falhar))
+    totais = CotaCapital.gerar_extratos_consolidados(contas, path_bases)
+    assert totais['falhas'] == 2
+    assert not os.path.exists(_consolidado(path_bases, contas))
+
+
+@pytest.mark.parametrize('tipo', ['local', 's3_local'])
+def test_zip_inclui_o_pdf_consolidado(base_simulacao, path_bases, tmp_path, monkeypatch, tipo):
+    monkeypatch.setattr(gvars, 'PATH_S3_LOCAL', str(tmp_path / 's3'))
+    monkeypatch.setattr(gvars, 'S3_BUCKET', 'extratos')
+    contas = base_simulacao[base_simulacao['agência'] == base_simulacao['agência'].iloc[0]].head(2)
+    armazenamento = Armazenamento.criar(path_bases, tipo)
+    CotaCapital.gerar_extratos_consolidados(contas, path_bases, armazenamento)
+
+    agencia = f"UA{str(contas['agência'].iloc[0]).zfill(2)}"
+    administradora = contas['administradora'].iloc[0]
+    zips = armazenamento.compactar_todas(delete_original=True)
+
+    destino = f"{agencia}/{PASTA_EXTRATOS}/{administradora}.zip"
+    assert [z for z in zips if z.endswith('.zip')] == [destino]
+    with zipfile.ZipFile(io.BytesIO(armazenamento.ler(destino))) as zipf:
+        assert zipf.namelist() == [f"{administradora}.pdf"]
+        assert len(pypdf.PdfReader(io.BytesIO(zipf.read(f"{administradora}.pdf"))).pages) == 2
+    assert not [c for c in armazenamento.listar('') if c.endswith('.pdf')]
@@ -0,0 +1,88 @@
+import re
+import threading
+
+import pandas as pd
+import pytest
+
+import src.global_vars as gvars
+from src.data_management import ConsultaContas, Databricks, DataFrameBuilder
+from src.fake_databricks import FakeDatabricks
+
+
+def _indice(fake):
+    pos = {c: i for i, c in enumerate(fake.colunas)}
+    return pd.DataFrame({
+        'conta': [linha[pos['conta']] for linha in fake.linhas],
+        'agência': [int(linha[pos['agencia']]) for linha in fake.linhas],
+    })
+
+
+def test_particoes_por_agencia_em_lotes(databricks, monkeypatch):
+    monkeypatch.setattr(gvars, 'TAMANHO_LOTE_CONSULTA', 4)
+    index = _indice(databricks)
+    agencia_da_conta = dict(zip(index['conta'], index['agência']))
+    particoes = ConsultaContas.por_agencia(index, '2025-09:2025-10')
+    concluidos = []
+
+    accounts = DataFrameBuilder.get_accounts_data_particionado(particoes, max_paralelo=3, ao_concluir=concluidos.append)
+
+    assert sorted(accounts['conta']) == sorted(index['conta'])
+    assert accounts.columns.tolist() == particoes[0].colunas
+    assert sum(len(df) for df in concluidos) == len(accounts)
+
+    contas_enviadas = []
+    assert len(databricks.recebidos) == len(concluidos)
+    for statement, parametros in databricks.recebidos:
+        valores = {p['name']: p['value'] for p in parametros}
+        dias = [v for nome, v in valores.items() if re.fullmatch(r"e\d+", nome)]
+        assert f"data_emissao IN ({', '.join(f':e{i}' for i in range(61))})" in statement
+        assert (len(dias), dias[0], dias[-1]) == (61, '01/09/2025', '31/10/2025')
+        assert 'to_date' not in statement and 'date_format' not in statement
+        lote = [v for nome, v in valores.items() if re.fullmatch(r"c\d+", nome)]
+        assert 1 <= len(lote) <= 4
+        assert f"conta IN ({', '.join(f':c{i}' for i in range(len(lote)))})" in statement
+        assert len({agencia_da_conta[c] for c in lote}) == 1
+        contas_enviadas.extend(lote)
+    assert sorted(contas_enviadas) == sorted(index['conta'])
+
+
+def test_statement_pendente_consulta_o_status_ate_concluir(monkeypatch):
+    fake = FakeDatabricks(atraso=0.2)
+    monkeypatch.setattr(gvars, 'DATABRICKS_ENDPOINT', fake.iniciar())
+    monkeypatch.setattr(gvars, 'DATABRICKS_ESPERA_SEGUNDOS', 0.02)
+    try:
+        statement, parametros = ConsultaContas(mes_emissao='2025-09', contas=['00001-1']).montar()[0]
+        resposta = Databricks().sql_statements(statement, 5, parameters=parametros)
+    finally:
+        fake.parar()
+
+    assert resposta['status']['state'] == 'SUCCEEDED'
+    assert resposta['result']['colunas'][0] == ['00001-1']
+
+
+def test_cancelamento_cancela_o_statement_no_databricks(monkeypatch):
+    fake = FakeDatabricks(atraso=30)
+    monkeypatch.setattr(gvars, 'DATABRICKS_ENDPOINT', fake.iniciar())
+    monkeypatch.setattr(gvars, 'DATABRICKS_ESPERA_SEGUNDOS', 10)
+    cancelar = threading.Event()
+    threading.Timer(0.2, cancelar.set).start()
+    try:
+        with pytest.raises(Exception, match="cancelado"):
+            DataFrameBuilder.get_accounts_data_filtrado(ConsultaContas(mes_emissao='2025-09'), cancelar=cancelar)
+    finally:
+        fake.parar()
+
+    assert fake.total_statements == 1 and not fake.statements
+
+
+def test_mes_de_emissao_filtra_pela_coluna(databricks):
+    conta = databricks.linhas[0][databricks.colunas.index('conta')]
+    assert databricks.alterar(conta, {'data_emissao': '31/08/2025'}) == 1
+
+    statement, parametros = ConsultaContas(mes_emissao='2025-09').montar()[0]
+    resposta = Databricks().sql_statements(statement, 5, parameters=parametros)
+
+    assert resposta['manifest']['total_row_count'] == len(databricks.linhas) - 1
+    assert ConsultaContas.dias_emissao('2024-02')[-1] == '29/02/2024'
+    with pytest.raises(ValueError):
+        ConsultaContas.dias_emissao('2025-10:2025-09')
@@ -0,0 +1,54 @@
+import io
+import os
+import json
+
+import pandas as pd
+import pytest
+
+from src.data_management import Databricks
+
+SIMULACAO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'docs', 'simulacao_retorno.json')
+
+
+class _Resposta:
+    """Resposta mínima da API de statements (corpo em 'content' e em fluxo em 'raw')."""
+
+    def __init__(self, corpo: bytes):
+        self.content = corpo
+        self.raw = io.BytesIO(corpo)
+
+
+def _resposta_escalada(vezes: int) -> bytes:
+    with open(SIMULACAO, encoding='utf-8') as f:
+        documento = json.load(f)
+    documento['result']['data_array'] = documento['result']['data_array'] * vezes
+    documento['manifest']['total_row_count'] = len(documento['result']['data_array'])
+    return json.dumps(documento, ensure_ascii=False).encode('utf-8')
+
+
+def _frame(resposta: dict) -> pd.DataFrame:
+    nomes = [c['name'] for c in resposta['manifest']['schema']['columns']]
+    return pd.DataFrame(dict(zip(nomes, resposta['result']['colunas'])), columns=nomes)
+
+
+def test_fluxo_equivale_ao_json_completo():
+    corpo = _resposta_escalada(40)
+
+    em_fluxo = Databricks.decodificar_resposta(_Resposta(corpo))
+    completo = json.loads(corpo)
+    linhas = completo['result'].pop('data_array')
+    completo['result']['colunas'] = [list(coluna) for coluna in zip(*linhas)]
+
+    assert 'data_array' not in em_fluxo['result']
+    assert em_fluxo['manifest'] == completo['manifest']
+    assert len(em_fluxo['result']['colunas'][0]) == 150 * 40
+    pd.testing.assert_frame_equal(_frame(em_fluxo), _frame(completo))
+
+
+@pytest.mark.parametrize('ajuste', [lambda linha: linha[:-1], lambda linha: linha + ['extra']])
+def test_linha_fora_do_schema_e_rejeitada(ajuste):
+    documento = json.loads(_resposta_escalada(1))
+    documento['result']['data_array'][3] = ajuste(documento['result']['data_array'][3])
+
+    with pytest.raises(ValueError, match='linha 3'):
+        Databricks.decodificar_resposta(_Resposta(json.dumps(documento).encode('utf-8')))
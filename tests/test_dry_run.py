@@ -0,0 +1,52 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.dry_run import CHAVE_ESTRATO, ExecucaoTeste
+
+
+def test_amostra_limitada_por_estrato_e_reprodutivel(base_simulacao):
+    estratos = ExecucaoTeste.estratos(base_simulacao)
+    assert set(estratos['faixa']) == {'0', '1-5'}
+
+    posicoes = ExecucaoTeste.amostrar(estratos, por_estrato=2, semente=3)
+    assert posicoes.tolist() == ExecucaoTeste.amostrar(estratos, por_estrato=2, semente=3).tolist()
+
+    por_estrato = estratos.iloc[posicoes].groupby(CHAVE_ESTRATO).size()
+    populacao = estratos.groupby(CHAVE_ESTRATO).size()
+    assert por_estrato.index.equals(populacao.index)
+    assert (por_estrato == np.minimum(populacao, 2)).all()
+
+
+def test_projecao_aplica_o_custo_medido_a_populacao():
+    estratos = pd.DataFrame({
+        'agencia': ['01'] * 10 + ['02'] * 4,
+        'administradora': ['A'] * 10 + ['B'] * 4,
+        'faixa': ['0'] * 10 + ['0'] * 2 + ['21+'] * 2,
+        'movimentos': [0] * 12 + [30] * 2,
+    })
+    # Estrato (01, A, 0): uma conta gerada e uma falha; (02, B, 0) sem medida usa a média da faixa '0'
+    medidas = estratos.iloc[[0, 1, 12]].assign(
+        gerado=[True, False, True], segundos=[0.2, 0.0, 1.0], bytes=[100, 0, 5000]
+    )
+
+    projecao = ExecucaoTeste.projetar(estratos, medidas).set_index(CHAVE_ESTRATO)
+
+    assert projecao.loc[('01', 'A', '0')].tolist() == pytest.approx([10, 1.0, 500, 5.0])
+    assert projecao.loc[('02', 'B', '0')].tolist() == pytest.approx([2, 0.4, 200, 0.0])
+    assert projecao.loc[('02', 'B', '21+')].tolist() == pytest.approx([2, 2.0, 10000, 0.0])
+
+
+def test_execucao_de_teste_em_memoria(base_simulacao, tmp_path):
+    saida = tmp_path / 'teste.json'
+    relatorio = ExecucaoTeste.executar(base_simulacao, por_estrato=1, em_memoria=True, saida=str(saida))
+
+    assert json.loads(saida.read_text(encoding='utf-8')) == relatorio
+    assert relatorio['contas'] == len(base_simulacao)
+    assert relatorio['amostra'] == relatorio['estratos'] == 6
+    assert relatorio['medido']['falhas'] == 0 and relatorio['medido']['bytes'] > 0
+    assert sum(a['contas'] for a in relatorio['agencias'].values()) == len(base_simulacao)
+    assert relatorio['projecao']['bytes'] > relatorio['medido']['bytes']
+    assert relatorio['projecao']['falhas'] == 0
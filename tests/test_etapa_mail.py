@@ -0,0 +1,85 @@
+import os
+import sys
+import json
+import subprocess
+
+import numpy as np
+import pandas as pd
+
+from src.recipients import DiretorioDestinatarios
+from src.run_summary import ResumoExecucao
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _cache_da_base(base, path_bases, tmp_path):
+    base = base.copy()
+    base['email'] = np.where(np.arange(len(base)) % 2 == 0, 'a@example.com; B@example.com', 'c@example.org')
+    cache = str(tmp_path / 'destinatarios.json')
+    diretorio = DiretorioDestinatarios.obter(base, cache)
+    ResumoExecucao.salvar(ResumoExecucao.calcular(base, np.ones(len(base), dtype=bool)), path_bases)
+    return diretorio, cache
+
+
+def test_consultas_do_cache_equivalem_as_do_dataframe(base_simulacao, path_bases, tmp_path):
+    diretorio, cache = _cache_da_base(base_simulacao, path_bases, tmp_path)
+    linhas = DiretorioDestinatarios.carregar_linhas(cache)
+
+    assert DiretorioDestinatarios.destinatarios(linhas) == DiretorioDestinatarios.destinatarios(diretorio)
+    assert DiretorioDestinatarios.destinatarios(linhas, agencia='1') == DiretorioDestinatarios.destinatarios(diretorio, agencia='01')
+    assert DiretorioDestinatarios.lotes(linhas, 1) == DiretorioDestinatarios.lotes(diretorio, 1)
+    assert DiretorioDestinatarios.vinculos(linhas, ' B@example.com') == DiretorioDestinatarios.vinculos(diretorio, 'b@example.com')
+    assert ResumoExecucao.corpo_email(ResumoExecucao.carregar_linhas(path_bases)) == \
+        ResumoExecucao.corpo_email(ResumoExecucao.carregar(path_bases))
+
+
+def test_envio_com_cache_nao_importa_pandas(base_simulacao, path_bases, tmp_path):
+    _, cache = _cache_da_base(base_simulacao, path_bases, tmp_path)
+    envios = tmp_path / 'envios.json'
+    codigo = f"""
+import sys, json
+import app
+import src.global_vars as gv
+from src.email_sender import EmailSender
+gv.PATH_BASES = {path_bases!r}
+gv.PATH_CACHE_DESTINATARIOS = {cache!r}
+gv.SMTP_PORT = 25
+envios = []
+EmailSender.send_email = lambda self, to, remetente, assunto, corpo, html: envios.append(to)
+app.etapa_mail(por_agencia=True)
+json.dump({{'envios': envios, 'pandas': 'pandas' in sys.modules}}, open({str(envios)!r}, 'w'))
+"""
+    subprocess.run([sys.executable, '-c', codigo], cwd=RAIZ, check=True, capture_output=True,
+                   env={**os.environ, 'PYTHONPATH': RAIZ})
+
+    resultado = json.loads(envios.read_text())
+    assert resultado['envios'] and not resultado['pandas']
+
+
+def test_diretorio_separa_normaliza_e_descarta_invalidos():
+    contas = pd.DataFrame({
+        'agência': ['1', '1', '2', '2'],
+        'administradora': ['ADM A', 'ADM B', 'ADM A', 'ADM A'],
+        'email': ['a@example.com; B@Example.com ,c@example.org', 'invalido@, <d@example.com>',
+                  'a@example.com\tsem-arroba', None],
+    })
+
+    diretorio = DiretorioDestinatarios.construir(contas)
+
+    assert list(diretorio.itertuples(index=False, name=None)) == [
+        ('01', 'ADM A', 'a@example.com'), ('01', 'ADM A', 'b@example.com'), ('01', 'ADM A', 'c@example.org'),
+        ('01', 'ADM B', 'd@example.com'), ('02', 'ADM A', 'a@example.com'),
+    ]
+
+
+def test_lotes_por_agencia_sem_repetir_enderecos():
+    diretorio = pd.DataFrame([
+        ('01', 'ADM A', 'a@example.com'), ('01', 'ADM B', 'a@example.com'), ('01', 'ADM B', 'b@example.com'),
+        ('01', 'ADM B', 'c@example.com'), ('02', 'ADM C', 'a@example.com'),
+    ], columns=['agencia', 'administradora', 'email'])
+
+    assert DiretorioDestinatarios.lotes(diretorio, 2) == [
+        {'agencia': '01', 'administradoras': ['ADM A', 'ADM B'], 'destinatarios': ['a@example.com', 'b@example.com']},
+        {'agencia': '01', 'administradoras': ['ADM A', 'ADM B'], 'destinatarios': ['c@example.com']},
+        {'agencia': '02', 'administradoras': ['ADM C'], 'destinatarios': ['a@example.com']},
+    ]
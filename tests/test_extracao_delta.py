@@ -0,0 +1,91 @@
+import json
+
+import pandas as pd
+import pytest
+
+import src.global_vars as gvars
+from src.data_management import DataFrameBuilder
+
+
+@pytest.fixture
+def cache_contas(tmp_path, monkeypatch):
+    monkeypatch.setattr(gvars, 'PATH_CACHE_CONTAS', str(tmp_path / 'contas.pkl'))
+    monkeypatch.setattr(gvars, 'PATH_CACHE_WATERMARK', str(tmp_path / 'watermark.json'))
+    monkeypatch.setattr(gvars, 'DELTA_MARGEM_MINUTOS', 60)
+
+
+def _watermark():
+    with open(gvars.PATH_CACHE_WATERMARK, encoding='utf-8') as f:
+        return pd.Timestamp(json.load(f)['watermark'])
+
+
+def _por_chave(accounts):
+    return accounts.set_index(['conta', 'data_emissao'])
+
+
+def test_delta_aplica_alteracoes_inclusoes_e_remocoes(databricks, cache_contas):
+    inicial = DataFrameBuilder.get_accounts_data_delta('2025-09')
+    assert len(inicial) == len(databricks.linhas)
+    assert _watermark() == pd.to_datetime(inicial[gvars.COLUNA_ATUALIZACAO]).max()
+
+    databricks.alterar('00001-1', {'capital_social': '9999.99'})
+    databricks.adicionar({'conta': '99999-9', 'data_emissao': '08/09/2025', 'agencia': '01', 'capital_social': '1.0'})
+    databricks.remover('00002-2')
+
+    accounts = _por_chave(DataFrameBuilder.get_accounts_data_delta('2025-09'))
+    assert len(accounts) == len(inicial)
+    assert accounts.index.is_unique
+    assert accounts.loc[('00001-1', '08/09/2025'), 'capital_social'] == '9999.99'
+    assert ('99999-9', '08/09/2025') in accounts.index
+    assert '00002-2' not in accounts.index.get_level_values('conta')
+    assert _watermark() == pd.to_datetime(accounts[gvars.COLUNA_ATUALIZACAO]).max() > pd.to_datetime(inicial[gvars.COLUNA_ATUALIZACAO]).max()
+
+
+def test_correcao_atrasada_dentro_da_margem(databricks, cache_contas, monkeypatch):
+    DataFrameBuilder.get_accounts_data_delta('2025-09')
+    atrasada = (_watermark() - pd.Timedelta(minutes=30)).isoformat()
+    databricks.alterar('00003-3', {'capital_social': '1.23'}, atualizado_em=atrasada)
+
+    monkeypatch.setattr(gvars, 'DELTA_MARGEM_MINUTOS', 10)
+    accounts = _por_chave(DataFrameBuilder.get_accounts_data_delta('2025-09'))
+    assert accounts.loc[('00003-3', '08/09/2025'), 'capital_social'] != '1.23'
+
+    monkeypatch.setattr(gvars, 'DELTA_MARGEM_MINUTOS', 60)
+    accounts = _por_chave(DataFrameBuilder.get_accounts_data_delta('2025-09'))
+    assert accounts.loc[('00003-3', '08/09/2025'), 'capital_social'] == '1.23'
+
+
+def test_extracao_completa_ignora_o_cache(databricks, cache_contas):
+    DataFrameBuilder.get_accounts_data_delta('2025-09')
+    antiga = (_watermark() - pd.Timedelta(days=1)).isoformat()
+    databricks.alterar('00004-4', {'capital_social': '4.56'}, atualizado_em=antiga)
+
+    accounts = _por_chave(DataFrameBuilder.get_accounts_data_delta('2025-09'))
+    assert accounts.loc[('00004-4', '08/09/2025'), 'capital_social'] != '4.56'
+
+    accounts = _por_chave(DataFrameBuilder.get_accounts_data_delta('2025-09', completo=True))
+    assert accounts.loc[('00004-4', '08/09/2025'), 'capital_social'] == '4.56'
+
+
+def test_intervalo_de_meses_preserva_os_outros_meses_da_conta(databricks, cache_contas):
+    for conta in ('00001-1', '00002-2'):
+        databricks.adicionar({'conta': conta, 'data_emissao': '08/10/2025', 'agencia': '01', 'capital_social': '10.0'})
+    inicial = DataFrameBuilder.get_accounts_data_delta('2025-09:2025-10')
+
+    databricks.alterar('00001-1', {'capital_social': '11.0'}, data_emissao='08/10/2025')
+    databricks.remover('00002-2', data_emissao='08/09/2025')
+
+    accounts = _por_chave(DataFrameBuilder.get_accounts_data_delta('2025-09:2025-10'))
+    assert len(accounts) == len(inicial) - 1
+    assert accounts.loc[('00001-1', '08/10/2025'), 'capital_social'] == '11.0'
+    assert ('00001-1', '08/09/2025') in accounts.index
+    assert ('00002-2', '08/10/2025') in accounts.index
+    assert ('00002-2', '08/09/2025') not in accounts.index
+
+
+def test_filtro_de_contas_busca_as_novas_contas_do_indice(databricks, cache_contas):
+    inicial = DataFrameBuilder.get_accounts_data_delta('2025-09', contas=['00001-1', '00002-2'])
+    assert sorted(inicial['conta']) == ['00001-1', '00002-2']
+
+    accounts = DataFrameBuilder.get_accounts_data_delta('2025-09', contas=['00002-2', '00003-3'])
+    assert sorted(accounts['conta']) == ['00002-2', '00003-3']
@@ -0,0 +1,44 @@
+import os
+import zipfile
+
+import pytest
+
+from src.file_management import FileManager
+
+
+def _pasta_administradora(tmp_path):
+    pasta = tmp_path / 'UA01' / 'Extratos de Cota Capital' / 'ADM'
+    pasta.mkdir(parents=True)
+    (pasta / '00001-1.pdf').write_bytes(b'%PDF-1')
+    (pasta / '.00002-2.pdf.123.456.tmp').write_bytes(b'%PDF-parcial')
+    return pasta
+
+
+def test_zip_ignora_temporarios_e_nao_deixa_restos(tmp_path):
+    pasta = _pasta_administradora(tmp_path)
+    destino = pasta.parent / 'ADM.zip'
+
+    FileManager.zip_folder(str(pasta), str(destino))
+
+    with zipfile.ZipFile(destino) as zipf:
+        assert zipf.namelist() == ['00001-1.pdf']
+    assert not [n for n in os.listdir(pasta.parent) if n.endswith('.tmp')]
+
+
+def test_falha_na_compactacao_preserva_o_zip_anterior(tmp_path, monkeypatch):
+    pasta = _pasta_administradora(tmp_path)
+    destino = pasta.parent / 'ADM.zip'
+    FileManager.zip_folder(str(pasta), str(destino))
+    anterior = destino.read_bytes()
+
+    (pasta / '00003-3.pdf').write_bytes(b'%PDF-3')
+
+    def falhar(self, *args, **kwargs):
+        raise OSError("disco cheio")
+
+    monkeypatch.setattr(zipfile.ZipFile, 'write', falhar)
+    with pytest.raises(OSError):
+        FileManager.zip_folder(str(pasta), str(destino))
+
+    assert destino.read_bytes() == anterior
+    assert not [n for n in os.listdir(pasta.parent) if n.endswith('.tmp')]
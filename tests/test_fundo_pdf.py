@@ -0,0 +1,55 @@
+import io
+
+import pytest
+
+import src.global_vars as gvars
+from src.pdf_config import PDF_CONFIG, PERFIS_PDF
+from src.report_generator import CotaCapital
+
+
+def _renderizar(contas, perfil):
+    buffer = io.BytesIO()
+    c = CotaCapital.novo_canvas(buffer, PDF_CONFIG, perfil)
+    for _, row in contas.iterrows():
+        CotaCapital.desenhar_extrato(c, row, PDF_CONFIG, perfil)
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize('perfil', list(PERFIS_PDF))
+def test_fundo_em_cache_equivale_ao_drawimage(base_simulacao, path_bases, monkeypatch, perfil):
+    monkeypatch.setattr(gvars, 'ARMAZENAR_EXTRATOS', True)
+    contas = base_simulacao.head(3)
+
+    monkeypatch.setattr(CotaCapital, '_fundos', {})
+    monkeypatch.setattr(CotaCapital, '_fundo_em_cache', True)
+    com_cache = _renderizar(contas, perfil)
+    monkeypatch.setattr(CotaCapital, '_fundo_em_cache', False)
+    monkeypatch.setattr(CotaCapital, '_fundos', {})
+    sem_cache = _renderizar(contas, perfil)
+
+    # O drawImage com ImageReader nomeia a imagem de outra forma; imagens e texto são os mesmos
+    pypdf = pytest.importorskip('pypdf')
+    paginas = [pypdf.PdfReader(io.BytesIO(pdf)).pages for pdf in (com_cache, sem_cache)]
+    for pagina_cache, pagina in zip(*paginas):
+        assert _imagens(pagina_cache) == _imagens(pagina)
+        assert pagina_cache.extract_text() == pagina.extract_text()
+    assert len(paginas[0]) == len(paginas[1]) == len(contas)
+
+def _imagens(pagina):
+    xobjects = pagina['/Resources']['/XObject']
+    return sorted(xobjects[nome].get_object().get_data() for nome in xobjects)
+
+
+def test_cache_incompativel_volta_ao_drawimage(base_simulacao, path_bases, monkeypatch):
+    monkeypatch.setattr(gvars, 'ARMAZENAR_EXTRATOS', True)
+    monkeypatch.setattr(CotaCapital, '_fundos', {})
+    monkeypatch.setattr(CotaCapital, '_fundo_em_cache', True)
+    monkeypatch.setattr(CotaCapital, '_copiar_xobject', staticmethod(lambda *_: 1 / 0))
+
+    pdf = _renderizar(base_simulacao.head(2), None)
+
+    assert not CotaCapital._fundo_em_cache
+    pypdf = pytest.importorskip('pypdf')
+    assert all(_imagens(pagina) for pagina in pypdf.PdfReader(io.BytesIO(pdf)).pages)
@@ -0,0 +1,78 @@
+import os
+import glob
+import json
+
+import pandas as pd
+
+import src.global_vars as gvars
+from src.period_range import ExtratosPeriodo
+
+
+def _contas(datas):
+    return pd.DataFrame({
+        'conta': ['1', '2'],
+        'data_emissao': datas,
+        'capital_social': [100.0, 50.0],
+        'movimentacao': [0.0, 0.0],
+        'tipo_valor_data_movimentacao': [None, None],
+        'administradora': ['ADM TESTE', 'ADM TESTE'],
+    })
+
+
+def test_meses_sinteticos_repetem_o_dia_de_emissao():
+    base = ExtratosPeriodo.montar_base_mensal(_contas(['08/01/2025', '31/01/2025']), '2025-01:2025-03')
+    emissao = base.set_index(['conta', 'mes_emissao'])['data_emissao']
+
+    assert emissao[('1', '2025-02')] == '08/02/2025'
+    assert emissao[('1', '2025-03')] == '08/03/2025'
+    assert emissao[('2', '2025-02')] == '28/02/2025'
+    assert emissao[('2', '2025-03')] == '31/03/2025'
+
+
+def test_meses_sinteticos_com_datas_datetime():
+    datas = pd.to_datetime(['2025-01-08', '2025-01-31'])
+    base = ExtratosPeriodo.montar_base_mensal(_contas(datas), '2025-01:2025-02')
+    emissao = base.set_index(['conta', 'mes_emissao'])['data_emissao']
+
+    assert emissao[('1', '2025-02')] == pd.Timestamp('2025-02-08')
+    assert emissao[('2', '2025-02')] == pd.Timestamp('2025-02-28')
+
+
+def test_saldo_inicial_igual_ao_final_do_mes_anterior():
+    def movimento(valor, data):
+        return {"tipo_movimento": "CAPITAL INTEG.POR SUBSCRICAO", "valor_transacao": str(valor), "data_transacao": data}
+
+    contas = pd.DataFrame({
+        'conta': ['1', '1', '2'],
+        'data_emissao': ['08/01/2025', '08/03/2025', '08/02/2025'],
+        'capital_social': [100.0, 125.0, 40.0],
+        'movimentacao': [10.0, 20.0, 0.0],
+        'tipo_valor_data_movimentacao': [
+            json.dumps([movimento(10.0, '15/12/2024')]),
+            # A movimentação de janeiro aparece apenas no registro de março e entra no extrato de fevereiro
+            json.dumps([movimento(5.0, '20/01/2025'), movimento(20.0, '10/02/2025')]),
+            None,
+        ],
+        'administradora': ['ADM TESTE'] * 3,
+    })
+
+    base = ExtratosPeriodo.montar_base_mensal(contas, '2025-01:2025-04').sort_values(['conta', 'mes_emissao'])
+
+    for _, meses in base.groupby('conta'):
+        final = pd.to_numeric(meses['capital_social'])
+        inicial = final - pd.to_numeric(meses['movimentacao'])
+        assert inicial.iloc[1:].round(2).tolist() == final.iloc[:-1].round(2).tolist()
+    saldos = base.set_index(['conta', 'mes_emissao'])['capital_social'].astype(float)
+    assert saldos[('1', '2025-02')] == 105.0 and saldos[('1', '2025-04')] == 125.0
+    assert saldos[('2', '2025-04')] == 40.0
+
+
+def test_gerar_segue_o_modo_de_saida(base_simulacao, path_bases, monkeypatch):
+    monkeypatch.setattr(gvars, 'MODO_SAIDA', 'consolidado')
+
+    totais = ExtratosPeriodo.gerar(base_simulacao.head(10), '2025-09:2025-10', workers=1)
+
+    assert totais['gerados'] == 20 and totais['falhas'] == 0
+    for mes in ('2025-09', '2025-10'):
+        assert glob.glob(os.path.join(path_bases, mes, "UA*", "*", "ADM TESTE.pdf"))
+        assert not glob.glob(os.path.join(path_bases, mes, "UA*", "*", "ADM TESTE", "*.pdf"))
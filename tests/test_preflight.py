@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+import src.global_vars as gvars
+from src.preflight import ValidacaoBase
+
+
+def _movimentos(*valores):
+    return json.dumps([
+        {"tipo_movimento": "CAPITAL INTEG.POR SUBSCRICAO", "valor_transacao": str(v), "data_transacao": "15/08/2025"}
+        for v in valores
+    ])
+
+
+def _base_com_defeitos(base):
+    base = base.head(6).copy()
+    base['tipo_valor_data_movimentacao'] = base['tipo_valor_data_movimentacao'].astype(object)
+    # Conta 0: soma das movimentações diferente de 'movimentacao'
+    base.loc[0, ['movimentacao', 'tipo_valor_data_movimentacao']] = [30.0, _movimentos(20.0, 5.0)]
+    # Conta 1: movimentação negativa, com a soma conferindo
+    base.loc[1, ['movimentacao', 'tipo_valor_data_movimentacao']] = [-10.0, _movimentos(-10.0)]
+    # Conta 3 repete a conta 2 na mesma agência e administradora, no mesmo mês
+    base.loc[3, ['conta', 'agência']] = base.loc[2, ['conta', 'agência']].to_numpy()
+    return base
+
+
+def test_cada_defeito_aparece_na_sua_verificacao(base_simulacao, tmp_path):
+    base = _base_com_defeitos(base_simulacao)
+    conciliacao = {'somente_indice': ['99999-9'], 'somente_databricks': 2}
+    saida = tmp_path / 'validacao.json'
+
+    relatorio = ValidacaoBase.validar(base, saida=str(saida), conciliacao=conciliacao)
+
+    assert json.loads(saida.read_text(encoding='utf-8')) == relatorio
+    erros, avisos = relatorio['erros'], relatorio['avisos']
+    assert erros['soma_divergente'] == {'quantidade': 1, 'contas': [base.loc[0, 'conta']]}
+    assert erros['conta_duplicada'] == {'quantidade': 2, 'contas': [base.loc[2, 'conta']] * 2}
+    assert avisos['valor_negativo'] == {'quantidade': 1, 'contas': [base.loc[1, 'conta']]}
+    assert avisos['somente_indice'] == {'quantidade': 1, 'contas': ['99999-9']}
+    assert relatorio['somente_databricks'] == 2
+    assert all(not r['quantidade'] for nome, r in erros.items() if nome not in ('soma_divergente', 'conta_duplicada'))
+    assert relatorio['contas_com_erro'] == 3 and relatorio['bloqueante']
+
+
+def test_base_sem_defeitos_nao_bloqueia(base_simulacao, monkeypatch):
+    monkeypatch.setattr(gvars, 'BLOQUEAR_RENDER_COM_ERROS', True)
+    relatorio = ValidacaoBase.validar(base_simulacao, saida='', conciliacao={})
+
+    assert relatorio['contas_com_erro'] == 0 and not relatorio['bloqueante']
+    ValidacaoBase.bloquear_se_necessario(relatorio)
+
+
+def test_erros_bloqueiam_apenas_com_a_opcao_ativa(base_simulacao, monkeypatch):
+    relatorio = ValidacaoBase.validar(_base_com_defeitos(base_simulacao), saida='', conciliacao={})
+
+    monkeypatch.setattr(gvars, 'BLOQUEAR_RENDER_COM_ERROS', True)
+    with pytest.raises(Exception, match='conta_duplicada, soma_divergente'):
+        ValidacaoBase.bloquear_se_necessario(relatorio)
+
+    monkeypatch.setattr(gvars, 'BLOQUEAR_RENDER_COM_ERROS', False)
+    ValidacaoBase.bloquear_se_necessario(relatorio)
+
+
+def test_conciliacao_lida_do_arquivo_ao_lado_da_base(base_simulacao, tmp_path, monkeypatch):
+    monkeypatch.setattr(gvars, 'PATH_CACHE_CONCILIACAO', str(tmp_path / 'conciliacao.json'))
+    ValidacaoBase.salvar_conciliacao({'somente_indice': ['99999-9'], 'somente_databricks': 0}, len(base_simulacao))
+
+    relatorio = ValidacaoBase.validar(base_simulacao, saida='')
+    assert relatorio['avisos']['somente_indice']['contas'] == ['99999-9']
+    assert not base_simulacao.attrs
+
+    # Conciliação de outra base (quantidade de linhas diferente) é ignorada
+    relatorio = ValidacaoBase.validar(base_simulacao.head(10), saida='')
+    assert 'somente_indice' not in relatorio['avisos']
+
+
+def test_duplicidade_pela_chave_do_arquivo_de_saida(base_simulacao):
+    base = base_simulacao.head(4).copy()
+    base[['agência', 'data_emissao']] = base[['agência', 'data_emissao']].astype(object)
+    base['conta'] = base.loc[0, 'conta']
+    # Mesma conta em outra agência e em outro mês gravam arquivos diferentes
+    base.loc[1, 'agência'] = '02'
+    base.loc[2, 'data_emissao'] = '08/10/2025'
+    # Agência sem o zero à esquerda grava o mesmo arquivo UA01/<administradora>/<conta>.pdf
+    base.loc[[0, 3], 'agência'] = ['01', '1']
+    base.loc[3, 'data_emissao'] = '20/09/2025'
+
+    relatorio = ValidacaoBase.validar(base, saida='', conciliacao={})
+
+    assert relatorio['erros']['conta_duplicada']['quantidade'] == 2
+    relatorio = ValidacaoBase.validar(base.drop(index=3), saida='', conciliacao={})
+    assert relatorio['erros']['conta_duplicada']['quantidade'] == 0
@@ -0,0 +1,86 @@
+import io
+import os
+import json
+import time
+import zipfile
+import urllib.error
+import urllib.request
+
+import pytest
+
+from src.data_management import DataFrameBuilder
+from src.render_service import ServicoExtratos
+from src.report_generator import CotaCapital
+
+
+def _get(url):
+    with urllib.request.urlopen(url, timeout=30) as resposta:
+        return resposta.status, resposta.headers['Content-Type'], resposta.read()
+
+
+def _post(url, corpo=None):
+    dados = json.dumps(corpo or {}).encode('utf-8')
+    requisicao = urllib.request.Request(url, data=dados, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(requisicao, timeout=30) as resposta:
+        return resposta.status, resposta.headers['Content-Type'], resposta.read()
+
+
+@pytest.fixture
+def servico(base_simulacao, path_bases, monkeypatch):
+    # O serviço ativa o cache do fundo entre documentos; restaurado ao fim do teste
+    monkeypatch.setattr(CotaCapital, '_fundo_em_cache', CotaCapital._fundo_em_cache)
+    monkeypatch.setattr(CotaCapital, '_fundos', {})
+    path_base = os.path.join(path_bases, 'base.pkl')
+    DataFrameBuilder.salvar_base(base_simulacao.head(5), path_base)
+
+    servico = ServicoExtratos(path_base, intervalo_recarga=0.05)
+    url = servico.iniciar(porta=0)
+    yield servico, url, path_base
+    servico.parar()
+
+
+def test_extrato_individual_e_lote(servico, base_simulacao):
+    _, url, _ = servico
+    contas = base_simulacao['conta'].astype(str).head(3).tolist()
+
+    status, tipo, pdf = _get(f"{url}/extrato/{contas[0]}")
+    assert status == 200 and tipo == 'application/pdf' and pdf.startswith(b'%PDF')
+
+    status, tipo, conteudo = _post(f"{url}/extratos", {'contas': contas + ['99999-9']})
+    assert status == 200 and tipo == 'application/zip'
+    with zipfile.ZipFile(io.BytesIO(conteudo)) as zf:
+        assert sorted(zf.namelist()) == sorted([f"{c}.pdf" for c in contas] + ['falhas.json'])
+        assert list(json.loads(zf.read('falhas.json'))) == ['99999-9']
+        assert all(zf.read(f"{c}.pdf").startswith(b'%PDF') for c in contas)
+
+    _, _, corpo = _get(f"{url}/status")
+    assert json.loads(corpo)['extratos_gerados'] == 4
+
+
+def test_conta_inexistente_retorna_404(servico):
+    _, url, _ = servico
+    with pytest.raises(urllib.error.HTTPError) as erro:
+        _get(f"{url}/extrato/99999-9")
+    assert erro.value.code == 404
+    assert '99999-9' in json.loads(erro.value.read())['erro']
+
+
+def test_base_recarregada_quando_o_cache_muda(servico, base_simulacao):
+    _, url, path_base = servico
+    nova = base_simulacao['conta'].astype(str).iloc[10]
+    with pytest.raises(urllib.error.HTTPError):
+        _get(f"{url}/extrato/{nova}")
+
+    DataFrameBuilder.salvar_base(base_simulacao.head(20), path_base)
+    versao = os.path.getmtime(path_base) + 10
+    os.utime(path_base, (versao, versao))
+    limite = time.monotonic() + 10
+    while json.loads(_get(f"{url}/status")[2])['contas'] != 20 and time.monotonic() < limite:
+        time.sleep(0.05)
+
+    status, _, pdf = _get(f"{url}/extrato/{nova}")
+    assert status == 200 and pdf.startswith(b'%PDF')
+
+    DataFrameBuilder.salvar_base(base_simulacao.head(2), path_base)
+    status, _, corpo = _post(f"{url}/recarregar")
+    assert status == 200 and json.loads(corpo)['contas'] == 2
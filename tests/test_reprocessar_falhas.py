@@ -0,0 +1,47 @@
+import os
+
+import pandas as pd
+import pytest
+
+import src.global_vars as gvars
+from src.report_generator import CotaCapital
+
+pypdf = pytest.importorskip('pypdf')
+
+
+def _texto(pdf):
+    return ''.join(pagina.extract_text() for pagina in pypdf.PdfReader(pdf).pages)
+
+
+def test_data_emissao_aceita_timestamp_e_textos():
+    esperado = pd.Timestamp('2025-09-08')
+    assert CotaCapital.data_emissao(esperado) == esperado
+    assert CotaCapital.data_emissao('08/09/2025') == esperado
+    assert CotaCapital.data_emissao('2025-09-08') == esperado
+    with pytest.raises(ValueError):
+        CotaCapital.data_emissao('setembro')
+
+
+def test_reprocessamento_mantem_periodo_e_emissao(base_simulacao, path_bases, monkeypatch):
+    contas = base_simulacao.head(1)
+    assert pd.api.types.is_datetime64_any_dtype(contas['data_emissao'])
+
+    def falhar(row, path_bases, armazenamento=None):
+        raise OSError("disco cheio")
+
+    with monkeypatch.context() as m:
+        m.setattr(CotaCapital, 'gerar_extrato_conta', staticmethod(falhar))
+        totais = CotaCapital.gerar_extratos_mensal(contas, path_bases)
+    assert totais['falhas'] == 1
+
+    falhas = pd.read_csv(totais['arquivo_falhas'], dtype=str, encoding='utf-8-sig')
+    assert falhas.loc[0, 'data_emissao'] == '08/09/2025'
+
+    totais = CotaCapital.reprocessar_falhas(path_bases)
+    assert totais['gerados'] == 1 and totais['falhas'] == 0
+    assert not os.path.exists(os.path.join(path_bases, gvars.ARQUIVO_FALHAS))
+
+    _, pdf = CotaCapital.caminho_extrato(contas.iloc[0], path_bases)
+    texto = _texto(pdf)
+    assert '01/08/2025 a 31/08/2025' in texto
+    assert 'EMISSAO: 08/09/2025' in texto
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.run_summary import ResumoExecucao
+
+
+def test_resumo_por_agencia_soma_apenas_os_gerados(base_simulacao):
+    gerados = np.arange(len(base_simulacao)) % 3 != 0
+    tamanhos = np.where(gerados, 1000, 0)
+
+    resumo = ResumoExecucao.calcular(base_simulacao, gerados, tamanhos)
+
+    agencias = base_simulacao['agência'].astype(str).str.zfill(2)
+    assert resumo['contas'].groupby(level='agencia').sum().to_dict() == agencias.value_counts().to_dict()
+    assert int(resumo['gerados'].sum()) == int(gerados.sum())
+    assert int(resumo['falhas'].sum()) == int((~gerados).sum())
+    assert int(resumo['bytes'].sum()) == 1000 * int(gerados.sum())
+    assert resumo['capital_social'].sum() == pytest.approx(base_simulacao.loc[gerados, 'capital_social'].sum())
+    assert resumo['movimentacao'].sum() == pytest.approx(base_simulacao.loc[gerados, 'movimentacao'].sum())
+    assert int(resumo['movimentos'].sum()) == int(ResumoExecucao.quantidade_movimentos(base_simulacao)[gerados].sum())
+
+
+def test_resumos_parciais_sao_aditivos(base_simulacao):
+    gerados = np.arange(len(base_simulacao)) % 4 != 1
+    completo = ResumoExecucao.calcular(base_simulacao, gerados)
+    metade = len(base_simulacao) // 2
+
+    parciais = [
+        ResumoExecucao.calcular(base_simulacao.iloc[:metade], gerados[:metade]),
+        None,
+        ResumoExecucao.calcular(base_simulacao.iloc[metade:], gerados[metade:]),
+    ]
+    pd.testing.assert_frame_equal(ResumoExecucao.mesclar(parciais), completo)
+
+
+def test_reprocessamento_converte_falhas_em_gerados(base_simulacao):
+    gerados = np.arange(len(base_simulacao)) % 5 != 0
+    anterior = ResumoExecucao.calcular(base_simulacao, gerados)
+    reprocessado = ResumoExecucao.calcular(base_simulacao[~gerados], np.ones(int((~gerados).sum()), dtype=bool))
+
+    resumo = ResumoExecucao.descontar_reprocessamento(anterior, reprocessado)
+    pd.testing.assert_frame_equal(resumo, ResumoExecucao.calcular(base_simulacao, np.ones(len(base_simulacao), dtype=bool)),
+                                  check_dtype=False)
+
+
+def test_resumo_gravado_em_csv_e_json(base_simulacao, path_bases):
+    resumo = ResumoExecucao.calcular(base_simulacao, np.ones(len(base_simulacao), dtype=bool))
+    ResumoExecucao.salvar(resumo, path_bases)
+
+    pd.testing.assert_frame_equal(ResumoExecucao.carregar(path_bases), resumo, check_dtype=False)
+    linhas = ResumoExecucao.carregar_linhas(path_bases)
+    assert [(l['agencia'], l['gerados']) for l in linhas] == \
+        [(agencia, int(g)) for (agencia, _), g in resumo['gerados'].items()]
+    corpo = ResumoExecucao.corpo_email(linhas)
+    assert f"<b>{len(base_simulacao)}</b>" in corpo and "UA01" in corpo
+
+
+def test_corpo_email_escapa_o_nome_da_administradora(base_simulacao):
+    contas = base_simulacao.head(2).copy()
+    contas['administradora'] = 'A & B <LTDA>'
+    resumo = ResumoExecucao.calcular(contas, np.ones(len(contas), dtype=bool))
+
+    corpo = ResumoExecucao.corpo_email(resumo)
+    assert "<td>A &amp; B &lt;LTDA&gt;</td>" in corpo and "<LTDA>" not in corpo
@@ -0,0 +1,69 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.scheduling import Escalonamento
+
+
+def _base(tamanhos):
+    """
+    Base sintética: tamanhos[(agência, administradora)] = lista com a quantidade de movimentações de cada conta.
+    """
+    linhas = []
+    for (agencia, administradora), movimentos in tamanhos.items():
+        for quantidade in movimentos:
+            movimento = {"tipo_movimento": "X", "valor_transacao": "1.0", "data_transacao": "01/08/2025"}
+            linhas.append({
+                'conta': f"{len(linhas):05d}-0", 'agência': agencia, 'administradora': administradora,
+                'tipo_valor_data_movimentacao': json.dumps([movimento] * quantidade),
+            })
+    return pd.DataFrame(linhas)
+
+
+def test_coeficientes_ajustados_pelo_historico(tmp_path):
+    path = str(tmp_path / 'historico.json')
+    Escalonamento.registrar_historico([
+        {'contas': c, 'movimentos': m, 'segundos': 0.01 * c + 0.001 * m}
+        for c, m in ((10, 0), (10, 100), (50, 20), (100, 1000))
+    ], path)
+
+    por_conta, por_movimento = Escalonamento.coeficientes(path)
+    assert por_conta == pytest.approx(0.01) and por_movimento == pytest.approx(0.001)
+
+
+def test_cada_conta_em_um_unico_shard_e_carga_dentro_do_limite():
+    rng = np.random.default_rng(7)
+    tamanhos = {('01', 'ADM PESADA'): list(rng.integers(50, 200, size=200))}
+    for agencia in ('01', '02', '03'):
+        for adm in ('ADM A', 'ADM B', 'ADM C'):
+            tamanhos[(agencia, adm)] = list(rng.integers(0, 20, size=int(rng.integers(1, 30))))
+    contas = _base(tamanhos)
+    workers = 4
+
+    shards = Escalonamento.particionar(contas, workers=workers, coeficientes=(0.01, 0.001), custo_minimo=0.1)
+
+    posicoes = np.concatenate(shards['posicoes'].to_numpy())
+    assert sorted(posicoes) == list(range(len(contas)))
+    assert shards['contas'].sum() == len(contas)
+    assert (shards.groupby(['agencia', 'administradora'])['parte'].nunique().loc[('01', 'ADM PESADA')]) > 1
+    for _, shard in shards.iterrows():
+        grupo = contas.iloc[shard['posicoes']]
+        assert set(grupo['administradora']) == {shard['administradora']}
+
+    custos = Escalonamento.custos(contas, (0.01, 0.001))
+    assert shards['custo'].sum() == pytest.approx(custos.sum())
+    assert shards['custo'].is_monotonic_decreasing
+    # Limite de Graham para atribuição gulosa: carga média + (1 - 1/m) x maior shard
+    carga = shards.groupby('slot')['custo'].sum()
+    assert sorted(carga.index) == list(range(workers))
+    assert carga.max() <= custos.sum() / workers + (1 - 1 / workers) * shards['custo'].max() + 1e-9
+
+
+def test_lpt_atribui_ao_worker_menos_carregado():
+    slots = Escalonamento.distribuir_lpt([7, 5, 4, 3, 3, 2], 2)
+
+    assert slots.tolist() == [0, 1, 1, 0, 1, 0]
+    cargas = np.bincount(slots, weights=[7, 5, 4, 3, 3, 2])
+    assert cargas.tolist() == [12.0, 12.0]
@@ -0,0 +1,84 @@
+import os
+import glob
+import json
+import sqlite3
+from contextlib import closing
+
+import src.global_vars as gvars
+from src.report_generator import CotaCapital
+from src.sharding import ShardQueue, Sharding
+
+
+def _expirar(path_db, shard_id):
+    with closing(sqlite3.connect(path_db)) as conn:
+        conn.execute("UPDATE shards SET lease_expira = 0 WHERE shard_id = ?", (shard_id,))
+        conn.commit()
+
+
+def test_shard_travado_no_maximo_de_tentativas_vira_erro(tmp_path, monkeypatch):
+    monkeypatch.setattr(gvars, 'SHARD_MAX_TENTATIVAS', 2)
+    fila = ShardQueue(str(tmp_path / 'fila.db'))
+    fila.adicionar('UA01_0000', 'UA01_0000.pkl', '01', 'ADM')
+
+    for worker in ('w1', 'w2'):
+        assert fila.reservar(worker)['shard_id'] == 'UA01_0000'
+        _expirar(fila.path_db, 'UA01_0000')
+
+    assert fila.reservar('w3') is None
+    shard, = fila.listar()
+    assert shard['status'] == 'erro' and shard['erro']
+
+
+def test_worker_que_perdeu_o_lease_descarta_os_resultados(base_simulacao, path_bases, tmp_path, monkeypatch):
+    pasta_shards = str(tmp_path / 'shards')
+    Sharding.criar_shards(base_simulacao.head(1), pasta_shards, workers=1)
+    fila = Sharding._fila(pasta_shards)
+    shard_id = fila.listar()[0]['shard_id']
+    gerar = CotaCapital.gerar_extratos_mensal
+
+    def gerar_e_perder_o_lease(contas, path_bases, arquivo_falhas=None, armazenamento=None):
+        totais = gerar(contas, path_bases, arquivo_falhas, armazenamento)
+        _expirar(fila.path_db, shard_id)
+        assert fila.reservar('outro')['shard_id'] == shard_id
+        return totais
+
+    monkeypatch.setattr(CotaCapital, 'gerar_extratos_mensal', staticmethod(gerar_e_perder_o_lease))
+    assert Sharding.executar_worker(pasta_shards, path_bases, 'lento') == 0
+
+    shard, = fila.listar()
+    assert shard['status'] == 'processando' and shard['worker_id'] == 'outro'
+    assert not glob.glob(os.path.join(pasta_shards, "*.pdfs"))
+    assert not glob.glob(os.path.join(pasta_shards, "*.pdfs"))
+    assert not glob.glob(os.path.join(path_bases, "**", "*.pdf"), recursive=True)
+
+
+def test_worker_publica_resumo_ao_concluir(base_simulacao, path_bases, tmp_path):
+    pasta_shards = str(tmp_path / 'shards')
+    Sharding.criar_shards(base_simulacao.head(2), pasta_shards, workers=1)
+
+    assert Sharding.executar_worker(pasta_shards, path_bases, 'w1') >= 1
+    assert all(s['status'] == 'concluido' for s in Sharding._fila(pasta_shards).listar())
+    assert glob.glob(os.path.join(pasta_shards, "*_resumo.csv"))
+    assert not glob.glob(os.path.join(pasta_shards, "*.tmp"))
+
+
+def test_executar_local_gera_cada_conta_uma_vez(base_simulacao, path_bases, tmp_path, monkeypatch):
+    monkeypatch.setattr(gvars, 'PATH_HISTORICO_CUSTO', str(tmp_path / 'historico.json'))
+    pasta_shards = str(tmp_path / 'shards')
+
+    totais = Sharding.executar_local(base_simulacao, workers=2, pasta_shards=pasta_shards, path_bases=path_bases)
+
+    shards = Sharding._fila(pasta_shards).listar()
+    assert totais['gerados'] == len(base_simulacao) and totais['falhas'] == 0 and not totais['shards_pendentes']
+    assert all(s['status'] == 'concluido' and s['tentativas'] == 1 for s in shards)
+    assert sum(s['contas'] for s in shards) == len(base_simulacao)
+    assert len({s['worker_id'] for s in shards}) == 2
+
+    pdfs = glob.glob(os.path.join(path_bases, "UA*", "*", "*", "*.pdf"))
+    assert sorted(os.path.basename(p)[:-len('.pdf')] for p in pdfs) == sorted(base_simulacao['conta'].astype(str))
+    assert len(glob.glob(os.path.join(path_bases, "UA*", "*", "*.zip"))) == base_simulacao['agência'].nunique()
+    assert not glob.glob(os.path.join(pasta_shards, "*.pdfs"))
+
+    with open(os.path.join(path_bases, f"{gvars.ARQUIVO_RESUMO}.json"), encoding='utf-8') as f:
+        resumo = json.load(f)
+    assert resumo['totais']['gerados'] == len(base_simulacao)
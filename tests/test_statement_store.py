@@ -0,0 +1,19 @@
+import os
+
+import src.global_vars as gvars
+from src.report_generator import CotaCapital
+from src.statement_store import RepositorioExtratos
+
+
+def test_renderizacoes_identicas_compartilham_blob(base_simulacao, path_bases, tmp_path, monkeypatch):
+    monkeypatch.setattr(gvars, 'ARMAZENAR_EXTRATOS', True)
+    monkeypatch.setattr(gvars, 'PATH_REPOSITORIO', str(tmp_path / 'repositorio'))
+    contas = base_simulacao.head(1)
+
+    CotaCapital.gerar_extratos_mensal(contas, os.path.join(path_bases, 'primeira'))
+    CotaCapital.gerar_extratos_mensal(contas, os.path.join(path_bases, 'segunda'))
+
+    repositorio = RepositorioExtratos()
+    blobs = [arquivo for _, _, arquivos in os.walk(repositorio.pasta_blobs) for arquivo in arquivos]
+    assert len(blobs) == 1
+    assert len(repositorio.buscar(contas.iloc[0]['conta'])) == 1
@@ -0,0 +1,48 @@
+import os
+
+import pandas as pd
+
+import src.global_vars as gvars
+from src.report_generator import CotaCapital
+from src.storage import ArmazenamentoLocal
+
+
+def _pdfs(path_bases):
+    return sorted(a for _, _, nomes in os.walk(path_bases) for a in nomes if a.endswith('.pdf'))
+
+
+def _temporarios(path_bases):
+    return [a for _, _, nomes in os.walk(path_bases) for a in nomes if a.endswith('.tmp')]
+
+
+def test_mesmo_caminho_duas_vezes_no_lote(base_simulacao, path_bases):
+    contas = base_simulacao.head(6)
+    contas = contas.iloc[[0, 0, 1, 2, 3, 4, 5]]
+
+    totais = CotaCapital.gerar_extratos_mensal(contas, path_bases, armazenamento=ArmazenamentoLocal(path_bases, lote_fsync=4))
+
+    assert totais['gerados'] == 7 and totais['falhas'] == 0
+    assert _pdfs(path_bases) == sorted(f"{c}.pdf" for c in contas['conta'].unique())
+    assert not _temporarios(path_bases)
+
+
+def test_falha_ao_confirmar_um_arquivo_vai_para_as_falhas_da_conta(base_simulacao, path_bases, monkeypatch):
+    contas = base_simulacao.head(6)
+    conta_com_falha = contas['conta'].iloc[1]
+    substituir = os.replace
+
+    def falhar_um(origem, destino):
+        if os.path.basename(destino) == f"{conta_com_falha}.pdf":
+            raise OSError("disco cheio")
+        return substituir(origem, destino)
+
+    monkeypatch.setattr(os, 'replace', falhar_um)
+    totais = CotaCapital.gerar_extratos_mensal(contas, path_bases, armazenamento=ArmazenamentoLocal(path_bases, lote_fsync=4))
+
+    assert totais['gerados'] == 5 and totais['falhas'] == 1
+    assert _pdfs(path_bases) == sorted(f"{c}.pdf" for c in contas['conta'] if c != conta_com_falha)
+    assert not _temporarios(path_bases)
+    falhas = pd.read_csv(os.path.join(path_bases, gvars.ARQUIVO_FALHAS), dtype=str)
+    assert falhas['conta'].tolist() == [conta_com_falha]
+    assert 'disco cheio' in falhas['erro'].iloc[0]
+    assert int(totais['resumo']['falhas'].sum()) == 1